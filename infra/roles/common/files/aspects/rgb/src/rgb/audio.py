@@ -0,0 +1,228 @@
+"""
+In-process audio analysis: spectra and onset/beat notes from an audio source, put straight onto a ControlLoop's event
+queue, in place of the Spectrum messages published over MQTT by a separate analysis container.
+"""
+
+import logging
+import os
+import threading
+import time
+import wave
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from rgb.events import Event
+from rgb.messages import Spectrum
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+SAMPLE_DTYPES = {1: np.uint8, 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+
+
+class WavSource:
+    """
+    A WAV file as blocks of block_size mono float32 samples in [-1, 1]. With realtime, blocks are paced to the file's
+    sample rate, as a live input would deliver them; with loop, the file repeats.
+    """
+
+    def __init__(self, path: str, block_size: int = 512, realtime: bool = True, loop: bool = False):
+        self.path = path
+        self.block_size = block_size
+        self.realtime = realtime
+        self.loop = loop
+        with wave.open(path, "rb") as w:
+            self.sample_rate = w.getframerate()
+            self.channels = w.getnchannels()
+            self.sample_width = w.getsampwidth()
+        if self.sample_width not in SAMPLE_DTYPES:
+            raise ValueError(f"Unsupported sample width {self.sample_width} bytes in {path}")
+
+    def _to_mono(self, data: bytes) -> np.ndarray:
+        samples = np.frombuffer(data, dtype=SAMPLE_DTYPES[self.sample_width]).astype(np.float32)
+        if self.sample_width == 1:
+            # 8 bit WAV is unsigned
+            samples -= 128
+        samples /= float(1 << (8 * self.sample_width - 1))
+        return samples.reshape(-1, self.channels).mean(axis=1)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        t0 = time.monotonic()
+        samples_read = 0
+        while True:
+            with wave.open(self.path, "rb") as w:
+                while True:
+                    data = w.readframes(self.block_size)
+                    if not data:
+                        break
+                    block = self._to_mono(data)
+                    samples_read += len(block)
+                    if self.realtime:
+                        delay = t0 + samples_read / self.sample_rate - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                    yield block
+            if not self.loop:
+                return
+
+
+class AudioAnalyzer:
+    """
+    Runs over consecutive blocks of (typically hop_size) audio samples, keeping the last fft_size samples in a ring
+    buffer. For each block it produces a Spectrum of the Hann-windowed FFT summed into bands log-spaced from fmin to
+    fmax, each scaled from floor_db (0) to 0 dBFS (1), plus a note_on when an onset or beat is detected (and its
+    note_off note_s later).
+
+    Onsets are peaks in spectral flux (the summed rise in band levels) above onset_sensitivity times its mean over the
+    last second. Beats are bass energy (the bands below beat_hz) above beat_sensitivity times its mean over the last
+    second. Each has a refractory period, so one hit isn't reported twice.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        hop_size: int = 512,
+        fft_size: int = 2048,
+        bands: int = 150,
+        fmin: float = 30.0,
+        fmax: float = 16000.0,
+        floor_db: float = -60.0,
+        onset_note: int = 60,
+        beat_note: int = 36,
+        onset_sensitivity: float = 2.0,
+        beat_sensitivity: float = 1.4,
+        beat_hz: float = 150.0,
+        note_s: float = 0.1,
+        spectrum_index: int = 0,
+    ):
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        self.floor_db = floor_db
+        self.onset_note = onset_note
+        self.beat_note = beat_note
+        self.onset_sensitivity = onset_sensitivity
+        self.beat_sensitivity = beat_sensitivity
+        self.note_s = note_s
+        self.spectrum_index = spectrum_index
+
+        # Written twice, at i and i + fft_size, so the last fft_size samples are always a contiguous view
+        self.ring = np.zeros(2 * fft_size, dtype=np.float32)
+        self.head = 0
+        self.window = np.hanning(fft_size).astype(np.float32)
+        # So that a full scale sine peaks at 0 dB
+        self.scale = 2.0 / self.window.sum()
+
+        # FFT bins [band_lo, band_hi) of each band; at least one each, so low bands narrower than a bin repeat it
+        edges = np.geomspace(fmin, min(fmax, sample_rate / 2), bands + 1) * fft_size / sample_rate
+        bins = fft_size // 2 + 1
+        self.band_lo = np.clip(np.floor(edges[:-1]).astype(np.intp), 0, bins - 1)
+        self.band_hi = np.clip(np.maximum(np.floor(edges[1:]).astype(np.intp), self.band_lo + 1), 1, bins)
+        self.bass_bands = max(1, int(np.searchsorted(edges[1:], beat_hz * fft_size / sample_rate)))
+
+        self.t = 0.0
+        self.levels = np.zeros(bands, dtype=np.float32)
+        history = max(4, int(round(sample_rate / hop_size)))
+        self.flux_history: Deque[float] = deque(maxlen=history)
+        self.bass_history: Deque[float] = deque(maxlen=history)
+        self.last_onset = -np.inf
+        self.last_beat = -np.inf
+        # (t, note) of note_offs due
+        self.pending_offs: List[Tuple[float, int]] = []
+        self.onsets = 0
+        self.beats = 0
+
+    def _write(self, block: np.ndarray):
+        block = block[-self.fft_size :]
+        indices = (self.head + np.arange(len(block))) % self.fft_size
+        self.ring[indices] = block
+        self.ring[indices + self.fft_size] = block
+        self.head = (self.head + len(block)) % self.fft_size
+
+    def spectrum(self) -> np.ndarray:
+        samples = self.ring[self.head : self.head + self.fft_size]
+        power = np.abs(np.fft.rfft(samples * self.window) * self.scale) ** 2
+        cumulative = np.concatenate(([0.0], np.cumsum(power)))
+        band_power = (cumulative[self.band_hi] - cumulative[self.band_lo]) / (self.band_hi - self.band_lo)
+        db = 10 * np.log10(band_power + 1e-12)
+        return np.clip(1.0 - db / self.floor_db, 0.0, 1.0).astype(np.float32)
+
+    @staticmethod
+    def _note(message_type: str, note: int, velocity: int) -> Dict:
+        return {"type": message_type, "time": 0, "note": note, "velocity": velocity, "channel": 0}
+
+    def _detect(self, value: float, history: Deque[float], sensitivity: float, last: float, refractory_s: float):
+        # Velocity of a detection, or None
+        mean = np.mean(history) if history else 0.0
+        history.append(value)
+        if len(history) < history.maxlen // 4 or self.t - last < refractory_s or value <= sensitivity * mean + 1e-3:
+            return None
+        return int(np.clip(64 * value / (sensitivity * mean + 1e-3), 1, 127))
+
+    def process(self, block: np.ndarray) -> List[Event]:
+        self._write(block)
+        self.t += len(block) / self.sample_rate
+        levels = self.spectrum()
+        flux = float(np.maximum(levels - self.levels, 0.0).sum())
+        self.levels = levels
+        events: List[Event] = [Spectrum(index=self.spectrum_index, state=levels)]
+
+        self.pending_offs.sort()
+        while self.pending_offs and self.pending_offs[0][0] <= self.t:
+            (_, note) = self.pending_offs.pop(0)
+            events.append(AudioAnalyzer._note("note_off", note, 0))
+
+        onset = self._detect(flux, self.flux_history, self.onset_sensitivity, self.last_onset, 0.1)
+        if onset is not None:
+            self.last_onset = self.t
+            self.onsets += 1
+            events.append(AudioAnalyzer._note("note_on", self.onset_note, onset))
+            self.pending_offs.append((self.t + self.note_s, self.onset_note))
+        bass = float(np.mean(levels[: self.bass_bands] ** 2))
+        beat = self._detect(bass, self.bass_history, self.beat_sensitivity, self.last_beat, 0.25)
+        if beat is not None:
+            self.last_beat = self.t
+            self.beats += 1
+            events.append(AudioAnalyzer._note("note_on", self.beat_note, beat))
+            self.pending_offs.append((self.t + self.note_s, self.beat_note))
+        return events
+
+
+class AudioAnalysis:
+    """
+    Analyzes a source (an iterable of sample blocks with a sample_rate, such as WavSource) on a background thread,
+    handing each event to put, typically ControlLoop.put_event. Spectra are numpy arrays, never serialized.
+    """
+
+    def __init__(self, source, put: Callable[[Event], None], **analyzer_args):
+        self.source = source
+        self.put = put
+        analyzer_args.setdefault("hop_size", getattr(source, "block_size", 512))
+        self.analyzer = AudioAnalyzer(source.sample_rate, **analyzer_args)
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def _run(self):
+        try:
+            for block in self.source:
+                if self._stop.is_set():
+                    return
+                for event in self.analyzer.process(block):
+                    self.put(event)
+            log.info(f"Audio source {self.source} ended")
+        except Exception:
+            log.exception(f"Audio analysis of {self.source} failed")
+
+    def start(self) -> "AudioAnalysis":
+        self._worker = threading.Thread(target=self._run, name="audio-analysis", daemon=True)
+        self._worker.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def join(self, timeout: Optional[float] = None):
+        if self._worker is not None:
+            self._worker.join(timeout)
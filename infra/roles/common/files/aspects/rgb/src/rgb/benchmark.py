@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from rgb.controlloop import ControlLoop
+from rgb.form import audio_spectrogram, basenoise, cells, gravity, orbit, stars, sustainobject, timer, voronoi_diagram
+from rgb.form.baseform import BaseForm
+from rgb.messages import Spectrum
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+# (width, height), matching MATRIX_WIDTH x MATRIX_HEIGHT
+MATRIX_SIZES = [(32, 64), (64, 64), (128, 128), (256, 64)]
+
+FORM_FACTORIES: Dict[str, Callable[[Tuple[int, int]], BaseForm]] = {
+    "VerticalNotes": sustainobject.VerticalNotes,
+    "VerticalKeys": sustainobject.VerticalKeys,
+    "VerticalWaves": sustainobject.VerticalWaves,
+    "RandomVerticalWaveReverseSlowDarkerLows": sustainobject.RandomVerticalWaveReverseSlowDarkerLows,
+    "RandomWaveShape": sustainobject.RandomWaveShape,
+    "RandomSolidShape": sustainobject.RandomSolidShape,
+    "RandomOutlineCircle": sustainobject.RandomOutlineCircle,
+    "RandomWord": sustainobject.RandomWord,
+    "RandomJapaneseWord": sustainobject.RandomJapaneseWord,
+    "RandomIcon": sustainobject.RandomIcon,
+    "TextStars": sustainobject.TextStars,
+    "TextSparkles": sustainobject.TextSparkles,
+    "Gravity": lambda dimensions: gravity.Gravity(dimensions, 0.006),
+    "GravityKeys": lambda dimensions: gravity.GravityKeys(dimensions, 0.006),
+    "GravityKeysMultiNozzle": lambda dimensions: gravity.GravityKeysMultiNozzle(dimensions, 0.006),
+    "Orbit": lambda dimensions: orbit.Orbit(dimensions, fast_forward_scale=60 * 60 * 24 * 30),
+    "VoronoiDiagram": voronoi_diagram.VoronoiDiagram,
+    "ValueVoronoiDiagram": voronoi_diagram.ValueVoronoiDiagram,
+    "BaseNoise": basenoise.BaseNoise,
+    "WhispNoise": basenoise.WhispNoise,
+    "HueNoise": basenoise.HueNoise,
+    "Stars": stars.Stars,
+    "Cells": cells.Cells,
+    "CellsRun": cells.CellsRun,
+    "AudioSpectrogram": audio_spectrogram.AudioSpectrogram,
+    "AudioWaterfall": audio_spectrogram.AudioWaterfall,
+    "Timer": timer.Timer,
+}
+
+
+def sustain(value: int) -> Dict:
+    return {"type": "control_change", "time": 0, "control": 64, "value": value, "channel": 0}
+
+
+def spectrum(frame: int) -> Spectrum:
+    # Deterministic, slowly moving spectrum so AudioSpectrogram and AudioWaterfall have something to draw
+    return Spectrum(index=0, state=[(np.sin(frame / 7 + band / 11) + 1) / 2 for band in range(150)])
+
+
+# Frame index -> events delivered before that frame is stepped. Modeled on tests/test_all.py, denser so that
+# several notes are held at once (which is where the sustain forms spend their time).
+SCRIPTED_EVENTS: Dict[int, List[Union[Dict, NamedTuple]]] = {
+    10: [{"type": "note_on", "note": 42, "velocity": 105}],
+    20: [{"type": "note_on", "note": 43, "velocity": 105}, {"type": "note_on", "note": 55, "velocity": 90}],
+    30: [sustain(127)],
+    40: [{"type": "note_on", "note": 44, "velocity": 105}, {"type": "note_on", "note": 60, "velocity": 70}],
+    50: [{"type": "note_on", "note": 45, "velocity": 105}, {"type": "note_on", "note": 72, "velocity": 127}],
+    60: [sustain(0)],
+    90: [{"type": "note_off", "note": 42, "velocity": 105}, {"type": "note_off", "note": 55, "velocity": 90}],
+    100: [{"type": "note_off", "note": 43, "velocity": 105}],
+    110: [{"type": "note_off", "note": 44, "velocity": 105}, {"type": "note_off", "note": 60, "velocity": 70}],
+    120: [{"type": "note_off", "note": 45, "velocity": 105}, {"type": "note_off", "note": 72, "velocity": 127}],
+}
+TIMELINE_LENGTH = 150
+
+
+def events_for_frame(frame: int) -> List[Union[Dict, NamedTuple]]:
+    index = frame % TIMELINE_LENGTH
+    acc = list(SCRIPTED_EVENTS.get(index, []))
+    if index % 4 == 0:
+        acc.append(spectrum(frame))
+    return acc
+
+
+def dispatch(form: BaseForm, event: Union[Dict, NamedTuple]):
+    # Mirrors ControlLoop.dispatch: dicts are MIDI, NamedTuples go through form.handlers.
+    if isinstance(event, dict):
+        form.midi_handler(event)
+        return
+    try:
+        form.handlers[type(event).__name__][event.index](event.state)
+    except (AttributeError, KeyError):
+        log.debug(f"No handler for {event} on {form}")
+
+
+def reset_dials(value: float = 0.5):
+    # BaseForm._dials is class-level, so a previous form's run would otherwise leak into the next.
+    for i in range(len(BaseForm._dials)):
+        BaseForm._dials[i] = value
+
+
+@dataclass
+class BenchmarkResult:
+    form: str
+    width: int
+    height: int
+    frames: int = 0
+    construct_ms: float = 0.0
+    mean_ms: float = 0.0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    p99_ms: float = 0.0
+    max_ms: float = 0.0
+    # Sustainable frame rate at the p95 step time, and its ratio to ControlLoop.max_hz (>1.0 means we keep up)
+    p95_fps: float = 0.0
+    headroom: float = 0.0
+    peak_memory_bytes: int = 0
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.form}@{self.width}x{self.height}"
+
+
+def drive(form: BaseForm, frames: int, step_dt: float, warmup: int, samples: Optional[np.ndarray] = None):
+    # Step form through the scripted timeline, recording each step time after warmup into samples
+    for frame in range(-warmup, frames):
+        for event in events_for_frame(frame):
+            dispatch(form, event)
+        form._instrumented_step(step_dt)
+        if samples is not None and frame >= 0:
+            samples[frame] = form.last_step_dt
+
+
+def benchmark_form(
+    name: str,
+    factory: Callable[[Tuple[int, int]], BaseForm],
+    dimensions: Tuple[int, int],
+    frames: int,
+    max_hz: float = ControlLoop.DEFAULT_MAX_HZ,
+    warmup: int = 5,
+    memory_frames: int = 30,
+) -> BenchmarkResult:
+    """
+    Step times are taken with tracemalloc off, as tracing slows every allocation; peak memory comes from a second,
+    traced pass over a fresh form (construction plus warmup and memory_frames steps).
+    """
+    result = BenchmarkResult(form=name, width=dimensions[0], height=dimensions[1])
+    step_dt = 1 / max_hz
+    samples = np.zeros(frames, dtype=np.float64)
+    try:
+        reset_dials()
+        t_construct = time.perf_counter()
+        form = factory(dimensions)
+        result.construct_ms = (time.perf_counter() - t_construct) * 1000
+        drive(form, frames, step_dt, warmup, samples)
+
+        reset_dials()
+        tracemalloc.start()
+        try:
+            drive(factory(dimensions), memory_frames, step_dt, warmup)
+            _, result.peak_memory_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as e:
+        log.exception(f"Benchmark of {name} at {dimensions} failed")
+        result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    samples_ms = samples * 1000
+    result.frames = frames
+    result.mean_ms = float(np.mean(samples_ms))
+    (result.p50_ms, result.p95_ms, result.p99_ms) = (float(x) for x in np.percentile(samples_ms, [50, 95, 99]))
+    result.max_ms = float(np.max(samples_ms))
+    result.p95_fps = 1000 / result.p95_ms if result.p95_ms > 0 else float("inf")
+    result.headroom = result.p95_fps / max_hz
+    return result
+
+
+@dataclass
+class BenchmarkRun:
+    created: str
+    python: str
+    machine: str
+    max_hz: float
+    frames: int
+    results: List[BenchmarkResult] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+    @staticmethod
+    def load(path: str) -> "BenchmarkRun":
+        with open(path, "r") as f:
+            d = json.load(f)
+        d["results"] = [BenchmarkResult(**r) for r in d["results"]]
+        return BenchmarkRun(**d)
+
+
+def run(
+    form_names: Sequence[str], sizes: Sequence[Tuple[int, int]], frames: int, max_hz: float = ControlLoop.DEFAULT_MAX_HZ
+) -> BenchmarkRun:
+    benchmark_run = BenchmarkRun(
+        created=datetime.datetime.utcnow().isoformat(),
+        python=sys.version.split()[0],
+        machine=f"{platform.system()} {platform.machine()} {platform.node()}",
+        max_hz=max_hz,
+        frames=frames,
+    )
+    for name in form_names:
+        for dimensions in sizes:
+            result = benchmark_form(name, FORM_FACTORIES[name], dimensions, frames=frames, max_hz=max_hz)
+            log.info(
+                f"{result.key}: p50 {result.p50_ms:.2f}ms p95 {result.p95_ms:.2f}ms p99 {result.p99_ms:.2f}ms "
+                f"headroom {result.headroom:.2f}x peak {result.peak_memory_bytes / 1024:.0f}KiB"
+                + (f" ERROR {result.error}" if result.error else "")
+            )
+            benchmark_run.results.append(result)
+    return benchmark_run
+
+
+def find_regressions(current: BenchmarkRun, baseline: BenchmarkRun, tolerance: float) -> List[str]:
+    """
+    Compare p95 step time and peak memory against a previous run. Returns a human readable line per regression.
+    """
+    previous = {r.key: r for r in baseline.results if r.error is None}
+    acc = []
+    for r in current.results:
+        if r.error is not None:
+            acc.append(f"{r.key} failed: {r.error}")
+            continue
+        if r.key not in previous:
+            continue
+        b = previous[r.key]
+        if r.p95_ms > b.p95_ms * (1 + tolerance):
+            acc.append(f"{r.key} p95 {b.p95_ms:.2f}ms -> {r.p95_ms:.2f}ms")
+        if r.peak_memory_bytes > b.peak_memory_bytes * (1 + tolerance):
+            acc.append(f"{r.key} peak memory {b.peak_memory_bytes} -> {r.peak_memory_bytes}")
+    return acc
+
+
+def parse_size(s: str) -> Tuple[int, int]:
+    width, height = s.lower().split("x")
+    return (int(width), int(height))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless step-time benchmark for rgb forms.")
+    parser.add_argument("--forms", nargs="*", default=list(FORM_FACTORIES.keys()), choices=list(FORM_FACTORIES.keys()))
+    parser.add_argument("--sizes", nargs="*", type=parse_size, default=MATRIX_SIZES, help="WIDTHxHEIGHT, e.g. 32x64")
+    parser.add_argument("--frames", type=int, default=2 * TIMELINE_LENGTH)
+    parser.add_argument("--max-hz", type=float, default=ControlLoop.DEFAULT_MAX_HZ)
+    parser.add_argument("--output", default="benchmark.json", help="Where to write the JSON results.")
+    parser.add_argument("--baseline", default=None, help="A previous --output to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed fractional slowdown vs. baseline.")
+    args = parser.parse_args(argv)
+
+    benchmark_run = run(args.forms, args.sizes, frames=args.frames, max_hz=args.max_hz)
+    with open(args.output, "w") as f:
+        f.write(benchmark_run.to_json())
+    log.info(f"Wrote {len(benchmark_run.results)} results to {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(benchmark_run, BenchmarkRun.load(args.baseline), args.tolerance)
+        for line in regressions:
+            log.warning(f"Regression: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,54 +1,64 @@
 import datetime
 from rgb.parameter_tuner import ParameterTuner
 from rgb.form.baseform import BaseForm
+from rgb.form.registry import FormRegistry
 
 import json
 import logging
-import multiprocessing
-from multiprocessing import connection
 import os
 import time
 from json.decoder import JSONDecodeError
-from typing import Dict, Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Union
 
 from rgb.imaqt import IMAQT
 from rgb.display.basedisplay import BaseDisplay
+from rgb.display.threaded import ThreadedDisplay
+from rgb.events import Event, EventQueue, coalesce, coalesce_key
+from rgb.latency import LatencyTracer, Trace
 from rgb.messages import Button, Dial, Spectrum, Switch
-from rgb.utilities import loopwait
+from rgb.scheduler import FrameScheduler
+from rgb import wire
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
 
 
 class ControlLoop:
-    def __init__(self, display: BaseDisplay, forms: Iterable[BaseForm]):
-        self.max_hz = 60
-        self.display = display
-
-        self.clicker_receiver_cxn: Optional[connection.Connection] = None
-        self.clicker_sender_cxn: Optional[connection.Connection] = None
-        self.midi_receiver_cxn: Optional[connection.Connection] = None
-        self.midi_sender_cxn: Optional[connection.Connection] = None
+
+    DEFAULT_MAX_HZ = 60
+    # How often blocking_loop logs frame pacing statistics
+    STATS_INTERVAL_S = 60
+
+    def __init__(
+        self,
+        display: BaseDisplay,
+        forms: Union[FormRegistry, Iterable[BaseForm]],
+        pipelined: bool = False,
+        overrun_policy: str = "drop",
+        tracer: Optional[LatencyTracer] = None,
+    ):
+        self.max_hz = ControlLoop.DEFAULT_MAX_HZ
+        self.scheduler = FrameScheduler(self.max_hz, policy=overrun_policy)
+        # Pipelined: the display is driven from its own thread, so stepping the next frame overlaps with showing this one.
+        self.pipelined = pipelined
+        self.display = ThreadedDisplay(display) if pipelined else display
+
+        # Filled from the MQTT thread, drained once per frame
+        self.events = EventQueue()
+        # Input-to-output latency of each event, logged with the frame pacing statistics
+        self.tracer = tracer
         self.brightness = 1.0
 
-        self.forms = forms
+        # A FormRegistry constructs forms as they're selected; forms already constructed are all kept
+        self.forms = forms if isinstance(forms, FormRegistry) else FormRegistry.of(forms)
 
         self.form_index = 0
 
     def initialize_mqtt(self):
-        #                         ⬅
-        (self.clicker_receiver_cxn, self.clicker_sender_cxn) = multiprocessing.Pipe(duplex=False)
-        #                         ⬅
-        (self.midi_receiver_cxn, self.midi_sender_cxn) = multiprocessing.Pipe(duplex=False)
-
         def button_callback(client, userdata, msg):
             decoded = msg.payload.decode("utf-8")
             log.debug(f"Button callback invoked with message: {decoded}")
 
-            if not self.clicker_sender_cxn:
-                log.warning("No sender connection in button_callback")
-                return
-
             try:
                 o = json.loads(decoded)
             except JSONDecodeError as e:
@@ -57,16 +67,16 @@ class ControlLoop:
 
             if o["message"] == "button":
                 log.info(f"Got button press: {o}")
-                self.clicker_sender_cxn.send(Button(index=o["index"], state=o["state"]))
+                self.put_event(Button(index=o["index"], state=o["state"]))
             elif o["message"] == "switch":
                 log.info(f"Got switch change: {o}")
-                self.clicker_sender_cxn.send(Switch(index=o["index"], state=o["state"]))
+                self.put_event(Switch(index=o["index"], state=o["state"]))
             elif o["message"] == "dial":
-                log.info(f"Got dial change: {o}")
-                self.clicker_sender_cxn.send(Dial(index=o["index"], state=o["state"]))
+                log.debug(f"Got dial change: {o}")
+                self.put_event(Dial(index=o["index"], state=o["state"]))
             elif o["message"] == "spectrum":
-                log.info(f"Got dial change: {o}")
-                self.clicker_sender_cxn.send(Spectrum(index=o["index"], state=o["state"]))
+                log.debug(f"Got spectrum: {o}")
+                self.put_event(Spectrum(index=o["index"], state=o["state"]))
             else:
                 log.warning(f"Unrecognized message {o}")
 
@@ -74,22 +84,29 @@ class ControlLoop:
             decoded = msg.payload.decode("utf-8")
             log.debug(f"Midi callback invoked with message: {decoded}")
 
-            if not self.midi_sender_cxn:
-                log.warning("No sender connection in midi_callback")
-                return
-
             try:
                 o = json.loads(decoded)
             except JSONDecodeError as e:
                 log.info("Failed to parse JSON; aborting. Message: {decoded}", e)
                 return
-            self.midi_sender_cxn.send(o)
-            latency = (
-                f"(Latency {datetime.datetime.utcnow() - datetime.datetime.fromisoformat(o['midi_read_time'])})"
-                if "midi_read_time" in o
-                else ""
-            )
-            log.debug(f"Received MIDI control message: {o} {latency}")
+            self.put_event(o)
+            if log.isEnabledFor(logging.DEBUG):
+                latency = (
+                    f"(Latency {datetime.datetime.utcnow() - datetime.datetime.fromisoformat(o['midi_read_time'])})"
+                    if "midi_read_time" in o
+                    else ""
+                )
+                log.debug(f"Received MIDI control message: {o} {latency}")
+
+        def binary_callback(client, userdata, msg):
+            try:
+                event = wire.decode(msg.payload)
+            except ValueError as e:
+                log.info(f"Failed to decode binary message on {msg.topic}; aborting. {e}")
+                return
+            self.put_event(event)
+            if log.isEnabledFor(logging.DEBUG) and isinstance(event, dict):
+                log.debug(f"Received MIDI control message: {event} (Latency {wire.latency_s(event) * 1000:.1f} ms)")
 
         self.handlers = {
             "Button": {
@@ -107,18 +124,20 @@ class ControlLoop:
         ima.client.message_callback_add(button_topic, button_callback)
         midi_topic = os.environ["MIDI_CONTROL_TOPIC"]
         ima.client.message_callback_add(midi_topic, midi_callback)
+        # Publishers choose the encoding by topic: JSON on the topics above, rgb.wire structs on these
+        binary_topics = [
+            os.environ.get("CONTROL_TOPIC_BINARY", button_topic + wire.BINARY_TOPIC_SUFFIX),
+            os.environ.get("MIDI_CONTROL_TOPIC_BINARY", midi_topic + wire.BINARY_TOPIC_SUFFIX),
+        ]
+        for topic in binary_topics:
+            ima.client.message_callback_add(topic, binary_callback)
         ima.connect()
-        ima.client.subscribe(button_topic)
-        ima.client.subscribe(midi_topic)
-
-    @property
-    def max_dt(self):
-        # +1 to prevent
-        return 1 / (self.max_hz + 1)
+        for topic in [button_topic, midi_topic, *binary_topics]:
+            ima.client.subscribe(topic)
 
     @property
-    def form(self):
-        return self.forms[self.form_index]
+    def form(self) -> BaseForm:
+        return self.forms.get(self.form_index)
 
     def first_form(self):
         # So all sync to same form
@@ -169,46 +188,78 @@ class ControlLoop:
         #     log.info(f"Set max_hz to {self.max_hz}")
         pass
 
-    def blocking_loop(self):
+    def dispatch(self, event: Event):
+        if isinstance(event, dict):
+            # If form midi handler goes first, then a pad strike that is also a valid key press does not induce that form's key's effect.
+            self.form.midi_handler(event)
+            self.midi_handler(event)
+            return
 
-        log.info(f"Running {self.form} at maximum {self.max_hz} Hz...")
+        message_type = type(event).__name__
+        log.debug(f"{message_type} -> {event.index}, {event.state}")
+        for target in (self, self.form):
+            try:
+                target.handlers[message_type][event.index](event.state)
+            except (AttributeError, KeyError):
+                log.debug(f"No handler for {event} on {target}")
+                continue
+            else:
+                # If a handler succeeds, break.
+                log.debug(f"Handler succeeded for {target}")
+                break
+
+    def put_event(self, event: Event):
+        # From the MQTT thread
+        self.events.put(event, self.tracer.received(event) if self.tracer is not None else None)
+
+    def poll_inputs(self) -> List[Trace]:
+        # Everything queued since the last frame, with superseded dial and control values dropped
+        batch = coalesce(self.events.drain_traced(), key=lambda pair: coalesce_key(pair[0]))
+        traces = [trace for (_, trace) in batch if trace is not None]
+        if traces:
+            self.tracer.dequeued(traces)
+        for (event, _) in batch:
+            self.dispatch(event)
+        return traces
+
+    def run_frame(self, elapsed: float):
+        # Inputs are handled before stepping, so they show up in this frame rather than the next.
+        traces = self.poll_inputs()
+        image = self.form._instrumented_step(elapsed)
+        self.display.report_step(self.form.last_step_dt)
+        if traces:
+            self.tracer.rendered(traces)
+            self.display.display_then(image, lambda: self.tracer.displayed(traces))
+        else:
+            self.display.display(image)
 
-        t_start = time.time()
-        t_last = t_start
+    def unthrottled_loop(self, frames: int, dt: Optional[float] = None):
+        """
+        Run frames frames as fast as they render, each stepping the form by dt (1 / max_hz by default) as if paced. For
+        profiling and CI, typically with a HeadlessDisplay.
+        """
+        dt = dt if dt is not None else 1 / self.max_hz
+        for _ in range(frames):
+            self.run_frame(dt)
 
-        while True:
+    def blocking_loop(self):
 
-            # TODO After?
-            t_last, total_elapsed_since_last_frame = loopwait(t_last, self.max_dt)
+        log.info(f"Running {self.form} at maximum {self.max_hz} Hz{' (pipelined)' if self.pipelined else ''}...")
 
-            image = self.form._instrumented_step(total_elapsed_since_last_frame)
-            self.display.display(image)
+        t_stats = time.monotonic()
 
-            if self.midi_receiver_cxn:
-                while self.midi_receiver_cxn.poll(0):
-                    value = self.midi_receiver_cxn.recv()
-                    log.info(f"midi_receiver_cxn received: {value}")
-                    # If form midi handler goes first, then a pad strike that is also a valid key press does not induce that form's key's effect.
-                    self.form.midi_handler(value)
-                    self.midi_handler(value)
-
-            if self.clicker_receiver_cxn:
-                while self.clicker_receiver_cxn.poll(0):
-                    value = self.clicker_receiver_cxn.recv()
-                    log.info(f"clicker_receiver_cxn received: {value}")
-
-                    message_type = type(value).__name__
-                    index = value.index
-                    state = value.state
-
-                    log.info(f"{message_type} -> {index}, {state}")
-                    for target in (self, self.form):
-                        try:
-                            target.handlers[message_type][index](state)
-                        except KeyError as e:
-                            log.debug(f"No handler for {value} on {target}")
-                            continue
-                        else:
-                            # If a handler succeeds, break.
-                            log.debug(f"Handler succeeded for {target}")
-                            break
+        while True:
+            if self.scheduler.max_hz != self.max_hz:
+                self.scheduler.max_hz = self.max_hz
+            tick = self.scheduler.wait()
+            self.form.quality = tick.quality
+            # Catch-up substeps advance the form without being shown
+            for dt in tick.steps[:-1]:
+                self.form._instrumented_step(dt)
+            self.run_frame(tick.steps[-1])
+
+            if time.monotonic() - t_stats > ControlLoop.STATS_INTERVAL_S:
+                log.info(f"Frame pacing: {self.scheduler.stats()}")
+                if self.tracer is not None:
+                    log.info(f"Input latency: {self.tracer.report()}")
+                t_stats = time.monotonic()
@@ -1,16 +1,94 @@
-
-
 import logging
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple, Union
+from collections import deque
+from typing import Callable, Deque, NamedTuple, Optional, Tuple
 
 import numpy as np
-from PIL import Image
+from rgb.framebuffer import Frame
 import os
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
 
+
+class Rect(NamedTuple):
+    # Half-open pixel bounds: [x0, x1) x [y0, y1)
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+
+    @property
+    def width(self) -> int:
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> int:
+        return self.y1 - self.y0
+
+    @property
+    def area(self) -> int:
+        return self.width * self.height
+
+    def slices(self) -> Tuple[slice, slice]:
+        # For indexing (H, W, ...) arrays
+        return (slice(self.y0, self.y1), slice(self.x0, self.x1))
+
+
+def changed_rect(previous: np.ndarray, current: np.ndarray) -> Optional[Rect]:
+    """
+    Bounding box of the pixels that differ between two (H, W, C) frames of the same shape, or None if they're equal.
+    """
+    changed = (previous != current).reshape(current.shape[0], current.shape[1], -1).any(axis=2)
+    rows = np.flatnonzero(changed.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(changed.any(axis=0))
+    return Rect(int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+
+
+class FrameDiff:
+    """
+    Remembers the frames a display has sent, to tell it whether (and where) the next one differs.
+
+    buffers is how many frames back the display's back buffer is: 1 when it draws into what is on screen, 2 when it
+    double buffers and draws into the frame before last.
+    """
+
+    def __init__(self, buffers: int = 1):
+        self.buffers = buffers
+        self.sent: Deque[np.ndarray] = deque(maxlen=buffers)
+        self.frames_skipped = 0
+
+    def reset(self):
+        self.sent.clear()
+
+    def dirty(self, arr: np.ndarray) -> Optional[Rect]:
+        """
+        None if arr is what is already shown, otherwise the region of the back buffer to redraw (all of it, when its
+        contents are unknown).
+        """
+        full = Rect(0, 0, arr.shape[1], arr.shape[0])
+        if not self.sent or self.sent[-1].shape != arr.shape:
+            return full
+        if np.array_equal(self.sent[-1], arr):
+            self.frames_skipped += 1
+            return None
+        if len(self.sent) < self.buffers:
+            return full
+        # The back buffer holds the oldest frame sent
+        return changed_rect(self.sent[0], arr)
+
+    def commit(self, arr: np.ndarray):
+        # Reuse the buffer about to fall out of the history, rather than allocating each frame
+        if len(self.sent) == self.buffers and self.sent[0].shape == arr.shape and self.sent[0].dtype == arr.dtype:
+            buffer = self.sent.popleft()
+            np.copyto(buffer, arr)
+        else:
+            buffer = arr.copy()
+        self.sent.append(buffer)
+
+
 class BaseDisplay(ABC):
 
     width: int
@@ -20,9 +98,20 @@ class BaseDisplay(ABC):
     def __init__(self, dimensions: Tuple[int, int]):
         self.width = dimensions[0]
         self.height = dimensions[1]
+        self.frame_diff = FrameDiff()
 
     @abstractmethod
-    def display(self, image: Union[Image.Image, np.ndarray], override_brightness: Optional[float] = None):
+    def display(self, image: Frame, override_brightness: Optional[float] = None):
+        pass
+
+    def report_step(self, step_dt: float):
+        # Called by the control loop with the wall time of each form step, for displays that show it
         pass
-    
 
+    def display_then(self, image: Frame, on_displayed: Callable[[], None]):
+        """
+        display(), then on_displayed once the frame is on the output. Displays that show frames asynchronously call it
+        when they have.
+        """
+        self.display(image)
+        on_displayed()
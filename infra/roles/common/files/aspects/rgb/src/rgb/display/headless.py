@@ -0,0 +1,172 @@
+import logging
+import os
+import struct
+import time
+from typing import BinaryIO, Callable, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+from rgb.display.basedisplay import BaseDisplay
+from rgb.framebuffer import Frame, frame_array
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+# Raw recordings: this header, then per frame a little-endian float64 timestamp (seconds since the first frame)
+# followed by the frame's height * width * 3 bytes.
+RAW_MAGIC = b"RGBR"
+RAW_HEADER = struct.Struct("<4sHH")
+RAW_TIMESTAMP = struct.Struct("<d")
+
+RECORDING_FORMATS = {".raw": "raw", ".npz": "npz", ".png": "png", ".apng": "png"}
+
+
+def raw_record_dtype(width: int, height: int) -> np.dtype:
+    return np.dtype([("t", "<f8"), ("frame", "u1", (height, width, 3))])
+
+
+def read_raw(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    with open(path, "rb") as f:
+        (magic, width, height) = RAW_HEADER.unpack(f.read(RAW_HEADER.size))
+    if magic != RAW_MAGIC:
+        raise ValueError(f"{path} is not a raw recording")
+    if os.path.getsize(path) == RAW_HEADER.size:
+        # No frames; memmap can't map nothing
+        records = np.zeros(0, dtype=raw_record_dtype(width, height))
+        return (records["t"], records["frame"])
+    records = np.memmap(path, dtype=raw_record_dtype(width, height), mode="r", offset=RAW_HEADER.size)
+    return (records["t"], records["frame"])
+
+
+def read_recording(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (timestamps, frames) of a HeadlessDisplay recording, in any of its formats. Raw recordings are memory-mapped.
+
+    Animated PNGs store durations in whole milliseconds, and PIL merges identical consecutive frames when writing
+    them, so those come back with coarser timestamps and possibly fewer frames.
+    """
+    fmt = RECORDING_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt == "raw":
+        return read_raw(path)
+    elif fmt == "npz":
+        with np.load(path) as data:
+            return (data["timestamps"], data["frames"])
+    elif fmt == "png":
+        frames, timestamps, t = [], [], 0.0
+        with Image.open(path) as im:
+            for i in range(getattr(im, "n_frames", 1)):
+                im.seek(i)
+                frames.append(np.asarray(im.convert("RGB")))
+                timestamps.append(t)
+                t += im.info.get("duration", 0) / 1000
+        return (np.array(timestamps), np.stack(frames))
+    else:
+        raise ValueError(f"Unknown recording format for {path}, expected one of {tuple(RECORDING_FORMATS)}")
+
+
+class HeadlessDisplay(BaseDisplay):
+    """
+    A display with no output device, for profiling, comparing renders between versions and running the control loop
+    in CI.
+
+    The most recent capacity frames, and the time each was shown, are kept in a preallocated ring buffer. With
+    record_to, every frame is also streamed to a file, its format chosen by extension (see RECORDING_FORMATS). Raw
+    is written as frames arrive; npz and animated PNG are written from a raw spool when the display is closed.
+    """
+
+    def __init__(
+        self,
+        dimensions: Tuple[int, int],
+        capacity: int = 600,
+        record_to: Optional[str] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        super().__init__(dimensions)
+        self.capacity = capacity
+        self.clock = clock
+        self.ring = np.zeros((capacity, self.height, self.width, 3), dtype=np.uint8)
+        self.ring_timestamps = np.zeros(capacity, dtype=np.float64)
+        self.frames_displayed = 0
+        self.t0: Optional[float] = None
+
+        self.record_to = record_to
+        self.record_format: Optional[str] = None
+        self._spool_path: Optional[str] = None
+        self._spool: Optional[BinaryIO] = None
+        if record_to is not None:
+            self.record_format = RECORDING_FORMATS.get(os.path.splitext(record_to)[1].lower())
+            if self.record_format is None:
+                raise ValueError(
+                    f"Unknown recording format for {record_to}, expected one of {tuple(RECORDING_FORMATS)}"
+                )
+            self._spool_path = record_to if self.record_format == "raw" else f"{record_to}.partial"
+            self._spool = open(self._spool_path, "wb")
+            self._spool.write(RAW_HEADER.pack(RAW_MAGIC, self.width, self.height))
+
+    def display(self, image: Frame):
+        now = self.clock()
+        if self.t0 is None:
+            self.t0 = now
+        arr = frame_array(image)
+        slot = self.frames_displayed % self.capacity
+        self.ring[slot] = arr
+        self.ring_timestamps[slot] = now - self.t0
+        self.frames_displayed += 1
+        if self._spool is not None:
+            self._spool.write(RAW_TIMESTAMP.pack(now - self.t0))
+            self._spool.write(self.ring[slot].data)
+
+    def _order(self) -> np.ndarray:
+        # Ring slots, oldest first
+        count = min(self.frames_displayed, self.capacity)
+        return (np.arange(self.frames_displayed - count, self.frames_displayed)) % self.capacity
+
+    def frames(self) -> np.ndarray:
+        """
+        The frames still held, oldest first. A copy.
+        """
+        return self.ring[self._order()]
+
+    def timestamps(self) -> np.ndarray:
+        """
+        Seconds since the first frame, of each of frames().
+        """
+        return self.ring_timestamps[self._order()]
+
+    def last_frame(self) -> Optional[np.ndarray]:
+        if self.frames_displayed == 0:
+            return None
+        return self.ring[(self.frames_displayed - 1) % self.capacity]
+
+    def close(self):
+        if self._spool is None:
+            return
+        self._spool.close()
+        self._spool = None
+        if self.record_format == "raw":
+            return
+        (timestamps, frames) = read_raw(self._spool_path)
+        if self.record_format == "npz":
+            np.savez_compressed(self.record_to, timestamps=np.array(timestamps), frames=np.array(frames))
+        elif len(frames) > 0:
+            # Each frame lasts until the next is shown; the last, as long as the one before it
+            durations = np.diff(timestamps, append=timestamps[-1] + (np.diff(timestamps[-2:]).sum() or 1 / 60))
+            # PIL only appends images given as a list, so animated PNG suits clips rather than whole shows
+            images = [Image.fromarray(frame) for frame in frames]
+            images[0].save(
+                self.record_to,
+                format="PNG",
+                save_all=True,
+                append_images=images[1:],
+                duration=[max(1, int(round(d * 1000))) for d in durations],
+                loop=0,
+            )
+        del timestamps, frames
+        os.remove(self._spool_path)
+        log.info(f"Recorded {self.frames_displayed} frames to {self.record_to}")
+
+    def __enter__(self) -> "HeadlessDisplay":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
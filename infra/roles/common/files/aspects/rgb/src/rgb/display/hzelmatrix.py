@@ -1,13 +1,14 @@
      
-from rgb.display.basedisplay import BaseDisplay
+from rgb.display.basedisplay import BaseDisplay, FrameDiff
 import logging 
 from rgb.hzel_samplebase import SampleBaseMatrixFactory
 import logging
 from abc import ABC, abstractmethod
-from typing import Tuple, Union
+from typing import Tuple
 
 import numpy as np
 from PIL import Image
+from rgb.framebuffer import Frame, frame_array
 from rgbmatrix import FrameCanvas, RGBMatrix
 import sys
 
@@ -35,14 +36,16 @@ class HzelMatrix(BaseDisplay):
         # for explanation
         # Explanation: https://github.com/hzeller/rpi-rgb-led-matrix/blob/dfc27c15c224a92496034a39512a274744879e86/bindings/python/samples/rotating-block-generator.py#L42
         self.offset_canvas: FrameCanvas = self.matrix.CreateFrameCanvas()
-        
-    def display(self, image: Union[Image.Image, np.ndarray]):
-        if isinstance(image, np.ndarray):
-            log.debug("Casting image to PIL PhotoImage")
-            pil_image = Image.fromarray(image)
-        elif isinstance(image, Image.Image):
-            pil_image = image
-        else: 
-            raise ValueError(f"Invalid type for {image}")
-        self.offset_canvas.SetImage(pil_image)
+        # SwapOnVSync alternates two canvases, so the one drawn into holds the frame before last
+        self.frame_diff = FrameDiff(buffers=2)
+
+    def display(self, image: Frame):
+        arr = frame_array(image)
+        rect = self.frame_diff.dirty(arr)
+        if rect is None:
+            # The panel keeps refreshing the front canvas on its own
+            return
+        region = Image.fromarray(np.ascontiguousarray(arr[rect.slices()]))
+        self.offset_canvas.SetImage(region, rect.x0, rect.y0)
         self.offset_canvas = self.matrix.SwapOnVSync(self.offset_canvas)
+        self.frame_diff.commit(arr)
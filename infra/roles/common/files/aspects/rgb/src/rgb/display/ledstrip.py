@@ -1,12 +1,14 @@
 
 from rgb.display.basedisplay import BaseDisplay
-from numpy.core.fromnumeric import shape
+from rgb.framebuffer import Frame, frame_array
+from rgb.utilities import gamma_lut, pack_colors
+import ctypes
 import logging
-from typing import Tuple, Union
-from rpi_ws281x import PixelStrip, Color
+from typing import Optional, Tuple
+from rpi_ws281x import PixelStrip
+import _rpi_ws281x as ws
 
 import numpy as np
-from PIL import Image
 
 import atexit 
 import os
@@ -16,7 +18,7 @@ logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
 
 class LedStrip(BaseDisplay):
 
-    def __init__(self, dimensions: Tuple[int, int], led_pin: int=18, led_brightness: int=255, skip_first_n: int=0):
+    def __init__(self, dimensions: Tuple[int, int], led_pin: int=18, led_brightness: int=255, skip_first_n: int=0, gamma: float=1.0, brightness: float=1.0):
         super().__init__(dimensions)
         if dimensions[1] != 1:
             raise ValueError("Height (2nd dimension) of RGB Strip must be 1.")
@@ -25,6 +27,8 @@ class LedStrip(BaseDisplay):
         self.dimensions = dimensions
         # If present, don't illuminate the first n values
         self.skip_first_n: int = skip_first_n
+        # Applied in software as frames are packed; led_brightness is the strip's own (hardware) scaling.
+        self.lut: Optional[np.ndarray] = None if gamma == 1.0 and brightness == 1.0 else gamma_lut(gamma, brightness)
 
         # GPIO pin connected to the pixels (18 uses PWM!).
         # GPIO pin connected to the pixels (10 uses SPI /dev/spidev0.0).
@@ -43,33 +47,44 @@ class LedStrip(BaseDisplay):
         self.rgb_strip.begin()
         atexit.register(lambda: self.clear())
 
-        self.height = self.rgb_strip.numPixels()
-        
+        # height stays 1, as the frame is (1, width, 3): the strip's own length is kept apart
+        self.pixel_count: int = self.rgb_strip.numPixels()
+        self.leds_address: Optional[int] = self._leds_address()
+
+    def _leds_address(self) -> Optional[int]:
+        # The channel's ws2811_led_t buffer, allocated by begin(), so frames can be copied in with one memmove.
+        try:
+            return int(ws.ws2811_channel_t_leds_get(self.rgb_strip._channel))
+        except (AttributeError, TypeError) as e:
+            log.warning(f"No direct access to the LED buffer ({e}), writing LEDs one at a time.")
+            return None
+
+    def write(self, packed: np.ndarray):
+        packed = np.ascontiguousarray(packed, dtype=np.uint32)
+        if self.leds_address is not None:
+            ctypes.memmove(self.leds_address, packed.ctypes.data, packed.nbytes)
+        else:
+            for i, color in enumerate(packed.tolist()):
+                ws.ws2811_led_set(self.rgb_strip._channel, i, color)
+        self.rgb_strip.show()
+
     def clear(self):
         # If you ever want to direct-display:
         # import numpy as np; from rgb.display.ledstrip import LedStrip;
         # a = LedStrip((100,1), 10, 0)
         # a.display(np.tile(np.array((255,255,255)), (100, 1)))
-        for i in range(self.rgb_strip.numPixels()):
-            self.rgb_strip.setPixelColor(i, Color(0,0,0))
-        self.rgb_strip.show()
+        self.write(np.zeros(self.pixel_count, dtype=np.uint32))
+        self.frame_diff.reset()
 
     
-    def display(self, image: Union[Image.Image, np.ndarray]):
-        if isinstance(image, np.ndarray):
-            arr = image
-        elif isinstance(image, Image.Image):
-            arr = np.array([image.getpixel((i,0)) for i in range(image.width)])
-        else:
-            raise ValueError(f"Invalid type @ display: {type(image)}")
-        for i in range(self.skip_first_n, self.height):
-            rgb = arr[i]
-            self.rgb_strip.setPixelColor(
-                i, 
-                Color(
-                    int(rgb[0]),
-                    int(rgb[1]),
-                    int(rgb[2])
-                )
-            )
-        self.rgb_strip.show()
\ No newline at end of file
+    def display(self, image: Frame):
+        # (1, width, 3), as forms render it, or already (width, 3)
+        arr = frame_array(image).reshape(-1, 3)
+        arr = arr[: self.pixel_count]
+        # The whole strip is clocked out on every show(), so only unchanged frames (not regions) can be skipped
+        if self.frame_diff.dirty(arr) is None:
+            return
+        packed = pack_colors(arr, self.lut)
+        packed[: self.skip_first_n] = 0
+        self.write(packed)
+        self.frame_diff.commit(arr)
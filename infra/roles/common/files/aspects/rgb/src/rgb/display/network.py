@@ -0,0 +1,229 @@
+"""
+Wire format: one datagram per band of whole rows, so that a lost datagram costs a band rather than a frame.
+
+    magic (4s) version (B) encoding (B) sequence (I) width (H) height (H) row (H) rows (H) | payload
+
+in network byte order. The payload is the band's rows * width pixels:
+
+    RAW:   rows * width * 3 bytes of RGB.
+    RLE:   runs of (count (H), r, g, b), 5 bytes each.
+    DELTA: RLE of the band XORed with the same band of the previous frame (sequence - 1). Mostly-static frames are a
+           few long runs of zeros. Only applied by a receiver that has that previous band.
+"""
+
+import logging
+import os
+import socket
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+from rgb.display.basedisplay import BaseDisplay
+from rgb.framebuffer import Frame, frame_array
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+
+MAGIC = b"RGBF"
+VERSION = 1
+HEADER = struct.Struct("!4sBBIHHHH")
+
+RAW = 0
+RLE = 1
+DELTA = 2
+ENCODINGS = {"raw": (RAW,), "rle": (RAW, RLE), "delta": (RAW, RLE, DELTA)}
+
+RUN = np.dtype([("count", ">u2"), ("r", "u1"), ("g", "u1"), ("b", "u1")])
+MAX_RUN = 0xFFFF
+
+# Ethernet MTU, less IPv4 and UDP headers: datagrams no larger than this are never fragmented on the LAN
+DEFAULT_DATAGRAM_BYTES = 1472
+DEFAULT_PORT = 6454
+
+
+def encode_rle(pixels: np.ndarray) -> bytes:
+    """
+    (n, 3) uint8 -> runs of identical pixels. n is at most MAX_RUN, so no run overflows its count.
+    """
+    packed = (pixels[:, 0].astype(np.uint32) << 16) | (pixels[:, 1].astype(np.uint32) << 8) | pixels[:, 2]
+    starts = np.flatnonzero(np.concatenate(([True], packed[1:] != packed[:-1])))
+    counts = np.diff(np.append(starts, len(packed)))
+    runs = np.empty(len(starts), dtype=RUN)
+    runs["count"] = counts
+    runs["r"], runs["g"], runs["b"] = pixels[starts, 0], pixels[starts, 1], pixels[starts, 2]
+    return runs.tobytes()
+
+
+def decode_rle(payload: bytes, n: int) -> np.ndarray:
+    runs = np.frombuffer(payload, dtype=RUN)
+    counts = runs["count"].astype(np.intp)
+    if counts.sum() != n:
+        raise ValueError(f"RLE payload covers {counts.sum()} pixels, expected {n}")
+    colors = np.stack([runs["r"], runs["g"], runs["b"]], axis=-1)
+    return np.repeat(colors, counts, axis=0)
+
+
+def sequence_newer(a: int, b: int) -> bool:
+    # a is after b, allowing for wrap-around of the 32 bit counter
+    return 0 < (a - b) % (1 << 32) < (1 << 31)
+
+
+class UdpStreamDisplay(BaseDisplay):
+    """
+    Streams frames to a FrameReceiver (see mainreceiver.py) over UDP, so a stronger machine can render for panel
+    nodes that only display.
+
+    Each band is sent in whichever of the allowed encodings is smallest. Every keyframe_interval frames, deltas are
+    withheld, so a receiver that has lost datagrams recovers within that many frames.
+    """
+
+    def __init__(
+        self,
+        dimensions: Tuple[int, int],
+        host: str,
+        port: int = DEFAULT_PORT,
+        compression: str = "delta",
+        keyframe_interval: int = 60,
+        max_datagram_bytes: int = DEFAULT_DATAGRAM_BYTES,
+    ):
+        super().__init__(dimensions)
+        if compression not in ENCODINGS:
+            raise ValueError(f"Unknown compression {compression}, expected one of {tuple(ENCODINGS)}")
+        self.address = (host, port)
+        self.encodings = ENCODINGS[compression]
+        self.keyframe_interval = keyframe_interval
+        # Raw is the fallback for every band, so bands are sized for it
+        self.band_rows = max(1, min((max_datagram_bytes - HEADER.size) // (self.width * 3), MAX_RUN // self.width))
+        self.sequence = 0
+        self.bytes_sent = 0
+        self.previous: Optional[np.ndarray] = None
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def encode(self, arr: np.ndarray, keyframe: bool) -> List[bytes]:
+        datagrams = []
+        for row in range(0, self.height, self.band_rows):
+            band = arr[row : row + self.band_rows]
+            rows = band.shape[0]
+            pixels = band.reshape(-1, 3)
+            candidates = [(RAW, pixels.tobytes())]
+            if RLE in self.encodings:
+                candidates.append((RLE, encode_rle(pixels)))
+            if DELTA in self.encodings and not keyframe and self.previous is not None:
+                delta = np.bitwise_xor(pixels, self.previous[row : row + rows].reshape(-1, 3))
+                candidates.append((DELTA, encode_rle(delta)))
+            (encoding, payload) = min(candidates, key=lambda c: len(c[1]))
+            header = HEADER.pack(MAGIC, VERSION, encoding, self.sequence, self.width, self.height, row, rows)
+            datagrams.append(header + payload)
+        return datagrams
+
+    def display(self, image: Frame):
+        arr = np.ascontiguousarray(frame_array(image))
+        keyframe = self.sequence % self.keyframe_interval == 0
+        for datagram in self.encode(arr, keyframe):
+            self.bytes_sent += self.sock.sendto(datagram, self.address)
+        if self.previous is None or self.previous.shape != arr.shape:
+            self.previous = arr.copy()
+        else:
+            np.copyto(self.previous, arr)
+        self.sequence = (self.sequence + 1) % (1 << 32)
+
+    def close(self):
+        self.sock.close()
+
+
+class FrameReceiver:
+    """
+    Reassembles frames streamed by a UdpStreamDisplay and shows them on a local display. A frame is shown once its
+    last band arrives, or, if that was lost, when the next frame begins. Bands lost in between keep their previous
+    contents.
+    """
+
+    def __init__(self, display: BaseDisplay, host: str = "0.0.0.0", port: int = DEFAULT_PORT):
+        self.display = display
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.frame = np.zeros((display.height, display.width, 3), dtype=np.uint8)
+        # Sequence number each row was last written at, for checking deltas apply to what we hold
+        self.row_sequence = np.full(display.height, -1, dtype=np.int64)
+        # Frame being assembled, and whether it has been shown
+        self.sequence: Optional[int] = None
+        self.shown = True
+        self.frames_displayed = 0
+        self.bands_received = 0
+        self.bands_discarded = 0
+
+    @property
+    def port(self) -> int:
+        return self.sock.getsockname()[1]
+
+    def _show(self):
+        self.display.display(self.frame)
+        self.frames_displayed += 1
+        self.shown = True
+
+    def handle(self, datagram: bytes):
+        try:
+            (magic, version, encoding, sequence, width, height, row, rows) = HEADER.unpack_from(datagram)
+        except struct.error:
+            self.bands_discarded += 1
+            return
+        if magic != MAGIC or version != VERSION or (width, height) != (self.display.width, self.display.height):
+            log.debug(f"Discarding datagram for {magic} v{version} {width}x{height}")
+            self.bands_discarded += 1
+            return
+        if self.sequence is not None and sequence != self.sequence:
+            if not sequence_newer(sequence, self.sequence):
+                # Reordered, from a frame we've moved past
+                self.bands_discarded += 1
+                return
+            if not self.shown:
+                self._show()
+        if sequence != self.sequence:
+            self.sequence = sequence
+            self.shown = False
+
+        n = rows * width
+        payload = datagram[HEADER.size :]
+        band = self.frame[row : row + rows]
+        try:
+            if encoding == RAW:
+                band[...] = np.frombuffer(payload, dtype=np.uint8).reshape(rows, width, 3)
+            elif encoding == RLE:
+                band[...] = decode_rle(payload, n).reshape(rows, width, 3)
+            elif encoding == DELTA:
+                if np.any(self.row_sequence[row : row + rows] != (sequence - 1) % (1 << 32)):
+                    # The frame it's relative to never fully arrived; wait for a keyframe
+                    self.bands_discarded += 1
+                    return
+                np.bitwise_xor(band, decode_rle(payload, n).reshape(rows, width, 3), out=band)
+            else:
+                raise ValueError(f"Unknown encoding {encoding}")
+        except ValueError as e:
+            log.debug(f"Discarding malformed band at row {row}: {e}")
+            self.bands_discarded += 1
+            return
+        self.row_sequence[row : row + rows] = sequence
+        self.bands_received += 1
+        if row + rows == height:
+            self._show()
+
+    def receive(self, timeout: Optional[float] = None) -> bool:
+        """
+        Handle one datagram. Returns False if none arrived within timeout.
+        """
+        self.sock.settimeout(timeout)
+        try:
+            datagram = self.sock.recv(1 << 16)
+        except socket.timeout:
+            return False
+        self.handle(datagram)
+        return True
+
+    def serve_forever(self):
+        log.info(f"Receiving frames on port {self.port}")
+        while True:
+            self.receive()
+
+    def close(self):
+        self.sock.close()
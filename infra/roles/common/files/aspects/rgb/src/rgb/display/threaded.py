@@ -0,0 +1,135 @@
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+from rgb.display.basedisplay import BaseDisplay
+from rgb.framebuffer import Frame, frame_array
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+
+class ThreadedDisplay(BaseDisplay):
+    """
+    Runs another display's (blocking) output on a worker thread, so that the next frame can be rendered while the
+    previous one is transferred to the panel.
+
+    Frames are copied into one of a fixed pool of buffers (two, by default: double buffering) and handed to the worker
+    through a bounded queue. When every buffer is in use, display() either replaces the frame still waiting to be shown
+    (drop_stale, the default: the panel always gets the newest frame, and rendering never waits on it) or blocks until
+    the worker frees one.
+    """
+
+    def __init__(self, inner: BaseDisplay, buffers: int = 2, drop_stale: bool = True):
+        super().__init__((inner.width, inner.height))
+        if buffers < 2:
+            raise ValueError("ThreadedDisplay needs at least two buffers, one to render into and one to show.")
+        self.inner = inner
+        self.drop_stale = drop_stale
+        self.frames_displayed = 0
+        self.frames_dropped = 0
+        # Wall time, in seconds, of the inner display's most recent display()
+        self.last_display_dt = 0.0
+
+        self._buffers: List[Optional[np.ndarray]] = [None] * buffers
+        # Called once each buffer's frame has been shown. A dropped frame's callbacks carry over to the one that replaces it.
+        self._on_displayed: List[List[Callable[[], None]]] = [[] for _ in range(buffers)]
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for i in range(buffers):
+            self._free.put(i)
+        self._ready: "queue.Queue[Optional[int]]" = queue.Queue(maxsize=buffers)
+        self._error: Optional[BaseException] = None
+        self._worker = threading.Thread(target=self._run, name=f"{type(inner).__name__}-display", daemon=True)
+        self._worker.start()
+
+    def __getattr__(self, name: str):
+        # Anything display-specific (e.g. HzelMatrix.matrix, for brightness) is the inner display's
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def report_step(self, step_dt: float):
+        self.inner.report_step(step_dt)
+
+    def _run(self):
+        while True:
+            index = self._ready.get()
+            if index is None:
+                return
+            (on_displayed, self._on_displayed[index]) = (self._on_displayed[index], [])
+            try:
+                t = time.perf_counter()
+                self.inner.display(self._buffers[index])
+                self.last_display_dt = time.perf_counter() - t
+                self.frames_displayed += 1
+                for callback in on_displayed:
+                    callback()
+            except Exception as e:
+                log.exception(f"{self.inner} failed to display a frame")
+                self._error = e
+            finally:
+                self._free.put(index)
+
+    def _acquire(self) -> int:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        if self.drop_stale:
+            try:
+                index = self._ready.get_nowait()
+                self.frames_dropped += 1
+                return index
+            except queue.Empty:
+                # Every buffer but this one is on the panel; it's about to be freed.
+                pass
+        return self._free.get()
+
+    def display(self, image: Frame):
+        self._enqueue(image, None)
+
+    def display_then(self, image: Frame, on_displayed: Callable[[], None]):
+        self._enqueue(image, on_displayed)
+
+    def _enqueue(self, image: Frame, on_displayed: Optional[Callable[[], None]]):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        if not self._worker.is_alive():
+            raise RuntimeError("ThreadedDisplay is closed.")
+        arr = frame_array(image)
+        index = self._acquire()
+        buffer = self._buffers[index]
+        if buffer is None or buffer.shape != arr.shape or buffer.dtype != arr.dtype:
+            buffer = self._buffers[index] = np.empty_like(arr)
+        # Forms may reuse (and keep writing to) the array they return, so the worker gets its own copy.
+        np.copyto(buffer, arr)
+        if on_displayed is not None:
+            self._on_displayed[index].append(on_displayed)
+        self._ready.put(index)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued frame has been shown. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._free.qsize() < len(self._buffers):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        if self._worker.is_alive():
+            self._ready.put(None)
+            self._worker.join(timeout)
+
+    def __enter__(self) -> "ThreadedDisplay":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
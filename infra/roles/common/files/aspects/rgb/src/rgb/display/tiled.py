@@ -0,0 +1,112 @@
+import logging
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from rgb.display.basedisplay import BaseDisplay
+from rgb.display.threaded import ThreadedDisplay
+from rgb.framebuffer import Frame, frame_array
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+
+class Tile:
+    """
+    A physical output and where its pixels come from: xs and ys, each shaped (display.height, display.width), are the
+    canvas coordinates shown at each of the display's pixels, or -1 to leave one dark.
+    """
+
+    def __init__(self, display: BaseDisplay, xs: np.ndarray, ys: np.ndarray):
+        xs, ys = np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp)
+        if xs.shape != (display.height, display.width) or ys.shape != xs.shape:
+            raise ValueError(
+                f"Tile mapping is {xs.shape}, but {type(display).__name__} is {(display.height, display.width)}"
+            )
+        self.display = display
+        self.xs = xs
+        self.ys = ys
+
+    @staticmethod
+    def region(display: BaseDisplay, x0: int, y0: int, flip_x: bool = False, flip_y: bool = False) -> "Tile":
+        """
+        The display shows the canvas rectangle of its own size with its top-left corner at (x0, y0), mirrored as
+        mounted.
+        """
+        ys, xs = np.mgrid[y0 : y0 + display.height, x0 : x0 + display.width]
+        if flip_x:
+            xs = xs[:, ::-1]
+        if flip_y:
+            ys = ys[::-1]
+        return Tile(display, xs, ys)
+
+    @staticmethod
+    def serpentine(display: BaseDisplay, x0: int, y0: int, width: int, height: int) -> "Tile":
+        """
+        A strip zigzagged across a width x height canvas rectangle: left to right along the first row, right to left
+        along the next, and so on. LEDs past the end of the rectangle are left dark.
+        """
+        ys, xs = np.mgrid[y0 : y0 + height, x0 : x0 + width]
+        xs[1::2] = xs[1::2, ::-1]
+        count = display.width * display.height
+        flat_xs = np.full(count, -1, dtype=np.intp)
+        flat_ys = np.full(count, -1, dtype=np.intp)
+        n = min(count, width * height)
+        flat_xs[:n] = xs.ravel()[:n]
+        flat_ys[:n] = ys.ravel()[:n]
+        shape = (display.height, display.width)
+        return Tile(display, flat_xs.reshape(shape), flat_ys.reshape(shape))
+
+
+class TiledDisplay(BaseDisplay):
+    """
+    One logical canvas split across several physical outputs (panels, strips, or a mix). Each tile's pixels are
+    gathered from the frame through a precomputed index table, then handed to that tile's own worker thread (a
+    ThreadedDisplay), so that transfers to every output run in parallel rather than one after another in the render
+    loop.
+    """
+
+    def __init__(self, dimensions: Tuple[int, int], tiles: Sequence[Tile], threaded: bool = True):
+        super().__init__(dimensions)
+        self.tiles: List[Tile] = list(tiles)
+        self.outputs: List[BaseDisplay] = [ThreadedDisplay(t.display) if threaded else t.display for t in self.tiles]
+        # Flat (row-major) canvas indices per tile pixel; dark pixels point at a black pixel appended to the canvas
+        dark = self.width * self.height
+        self._indices: List[np.ndarray] = []
+        for tile in self.tiles:
+            lit = tile.xs >= 0
+            if np.any(lit & ((tile.xs >= self.width) | (tile.ys < 0) | (tile.ys >= self.height))):
+                raise ValueError(f"{type(tile.display).__name__} tile maps outside the {dimensions} canvas")
+            self._indices.append(np.where(lit, tile.ys * self.width + tile.xs, dark))
+        self._canvas = np.zeros((dark + 1, 3), dtype=np.uint8)
+        self._gathered = [np.empty(index.shape + (3,), dtype=np.uint8) for index in self._indices]
+
+    def display(self, image: Frame):
+        arr = frame_array(image)
+        if arr.shape != (self.height, self.width, 3):
+            raise ValueError(f"Frame is {arr.shape}, but the tiled canvas is {(self.height, self.width, 3)}")
+        if self.frame_diff.dirty(arr) is None:
+            return
+        # Last row stays black
+        self._canvas[:-1].reshape(self.height, self.width, 3)[...] = arr
+        for index, gathered, output in zip(self._indices, self._gathered, self.outputs):
+            np.take(self._canvas, index, axis=0, out=gathered)
+            output.display(gathered)
+        self.frame_diff.commit(arr)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every tile has shown the last frame. Returns False on timeout.
+        """
+        return all(output.flush(timeout) for output in self.outputs if isinstance(output, ThreadedDisplay))
+
+    def close(self):
+        for output in self.outputs:
+            if isinstance(output, ThreadedDisplay):
+                output.close()
+
+    def __enter__(self) -> "TiledDisplay":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
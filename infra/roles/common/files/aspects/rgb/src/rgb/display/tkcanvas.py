@@ -1,37 +1,78 @@
 from tkinter import NW, Canvas, Tk
-from typing import Tuple, Union
+from typing import Optional, Tuple
+import time
 
 import numpy as np
 from PIL import Image, ImageTk
 from rgb.display.basedisplay import BaseDisplay
+from rgb.framebuffer import Frame, frame_array
 import logging
 
 log = logging.getLogger(__name__)
 
 
+def upscale(arr: np.ndarray, scale: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Nearest-neighbour (h, w, 3) -> (h * scale, w * scale, 3), in one broadcast write into out (allocated if None).
+    """
+    (h, w, c) = arr.shape
+    if out is None:
+        out = np.empty((h * scale, w * scale, c), dtype=arr.dtype)
+    out.reshape(h, scale, w, scale, c)[...] = arr[:, np.newaxis, :, np.newaxis, :]
+    return out
+
+
 class TkCanvas(BaseDisplay):
-    def __init__(self, dimensions: Tuple[int, int]):
+
+    # Seconds between overlay text updates, and the smoothing of the rates it shows
+    OVERLAY_INTERVAL_S = 0.25
+    SMOOTHING = 0.1
+
+    def __init__(self, dimensions: Tuple[int, int], canvas_scale: int = 6, overlay: bool = True):
         super().__init__(dimensions)
         self.matrix_width = dimensions[0]
         self.matrix_height = dimensions[1]
-        self.canvas_scale = 6
+        self.canvas_scale = canvas_scale
         self.root = Tk()
         self.canvas = Canvas(
             self.root, width=self.matrix_width * self.canvas_scale, height=self.matrix_height * self.canvas_scale
         )
         self.canvas.pack()
+        # One image and one canvas item for the life of the window; frames are pasted into them
+        self.scaled = np.zeros((self.matrix_height * canvas_scale, self.matrix_width * canvas_scale, 3), dtype=np.uint8)
+        self.photo = ImageTk.PhotoImage(Image.fromarray(self.scaled))
+        self.image_item = self.canvas.create_image(0, 0, anchor=NW, image=self.photo)
+        self.overlay_item = (
+            self.canvas.create_text(4, 4, anchor=NW, fill="white", font=("TkFixedFont", 9)) if overlay else None
+        )
+
+        self.frame_dt: Optional[float] = None
+        self.step_dt: Optional[float] = None
+        self._t_last_frame: Optional[float] = None
+        self._t_last_overlay = 0.0
+
+    def report_step(self, step_dt: float):
+        self.step_dt = step_dt if self.step_dt is None else self.step_dt + TkCanvas.SMOOTHING * (step_dt - self.step_dt)
+
+    def _update_overlay(self):
+        now = time.perf_counter()
+        if self._t_last_frame is not None:
+            dt = now - self._t_last_frame
+            self.frame_dt = dt if self.frame_dt is None else self.frame_dt + TkCanvas.SMOOTHING * (dt - self.frame_dt)
+        self._t_last_frame = now
+        if self.overlay_item is None or now - self._t_last_overlay < TkCanvas.OVERLAY_INTERVAL_S:
+            return
+        self._t_last_overlay = now
+        fps = f"{1 / self.frame_dt:5.1f} fps" if self.frame_dt else "  --- fps"
+        step = f"step {self.step_dt * 1000:5.2f} ms" if self.step_dt is not None else ""
+        self.canvas.itemconfigure(self.overlay_item, text=f"{fps}  {step}")
 
-    def display(self, image: Union[Image.Image, np.ndarray]):
-        if isinstance(image, np.ndarray):
-            log.debug("Casting image to PIL PhotoImage")
-            pil_image = Image.fromarray(image)
-        elif isinstance(image, Image.Image):
-            pil_image = image
-        else:
-            raise ValueError(f"Invalid type for {image}")
-        pil_image_larger = pil_image.resize(
-            (self.matrix_width * self.canvas_scale, self.matrix_height * self.canvas_scale), resample=0
-        ).transpose(Image.FLIP_TOP_BOTTOM)
-        pi = ImageTk.PhotoImage(pil_image_larger)
-        self.canvas.create_image(0, 0, anchor=NW, image=pi)
+    def display(self, image: Frame):
+        arr = frame_array(image)
+        if self.frame_diff.dirty(arr) is not None:
+            self.frame_diff.commit(arr)
+            # Flipped as a view; the upscale is the only pass over the frame before Tk's
+            upscale(arr[::-1], self.canvas_scale, out=self.scaled)
+            self.photo.paste(Image.fromarray(self.scaled))
+        self._update_overlay()
         self.canvas.update()
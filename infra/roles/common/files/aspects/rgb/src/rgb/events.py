@@ -0,0 +1,91 @@
+import logging
+import os
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, NamedTuple, Optional, Tuple, Union
+
+from rgb.messages import Dial, Spectrum
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+# MIDI messages are dicts (mido's msg.dict()); clicker messages are the NamedTuples of rgb.messages
+Event = Union[Dict, NamedTuple]
+
+# Sustain pedal. A control change, but on/off: a press and release within one frame must both be seen.
+SUSTAIN_CONTROL = 64
+
+
+class EventQueue:
+    """
+    Hands events from the MQTT callback thread to the render loop, in process.
+
+    deque.append and deque.popleft are atomic, so neither side takes a lock, and nothing is pickled. The loop drains
+    the queue once per frame; draining stops at what was queued when it started, so a flood of input can't keep a
+    frame from rendering.
+
+    Each event may be queued with a trace (see rgb.latency), which drain_traced() hands back alongside it.
+    """
+
+    def __init__(self):
+        self._events: Deque[Tuple[Event, Any]] = deque()
+        self.events_received = 0
+
+    def put(self, event: Event, trace: Any = None):
+        self._events.append((event, trace))
+        self.events_received += 1
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def drain(self) -> List[Event]:
+        return [event for (event, _) in self.drain_traced()]
+
+    def drain_traced(self) -> List[Tuple[Event, Any]]:
+        batch = []
+        for _ in range(len(self._events)):
+            try:
+                batch.append(self._events.popleft())
+            except IndexError:
+                break
+        return batch
+
+
+def coalesce_key(event: Event) -> Optional[Hashable]:
+    """
+    Events with the same key set the same continuous value, so only the latest of them in a batch matters. None for
+    events that must all be delivered (notes, buttons, switches, the sustain pedal).
+    """
+    if isinstance(event, dict):
+        message_type = event.get("type")
+        if message_type == "control_change" and event.get("control") != SUSTAIN_CONTROL:
+            return ("control_change", event.get("channel"), event.get("control"))
+        elif message_type in ("pitchwheel", "aftertouch"):
+            return (message_type, event.get("channel"))
+        elif message_type == "polytouch":
+            return (message_type, event.get("channel"), event.get("note"))
+        return None
+    elif isinstance(event, (Dial, Spectrum)):
+        return (type(event).__name__, event.index)
+    return None
+
+
+def coalesce(batch: List[Any], key: Callable[[Any], Optional[Hashable]] = coalesce_key) -> List[Any]:
+    """
+    Drop every event superseded by a later one with the same coalesce_key. Survivors keep their order, so a control's
+    latest value lands where it was last set relative to notes.
+
+    key extracts the coalesce key of batches of something other than bare events, such as (event, trace) pairs.
+    """
+    seen = set()
+    kept = []
+    for event in reversed(batch):
+        event_key = key(event)
+        if event_key is not None:
+            if event_key in seen:
+                continue
+            seen.add(event_key)
+        kept.append(event)
+    kept.reverse()
+    if len(kept) < len(batch):
+        log.debug(f"Coalesced {len(batch)} events to {len(kept)}")
+    return kept
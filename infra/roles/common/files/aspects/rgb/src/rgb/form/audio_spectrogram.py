@@ -1,45 +1,37 @@
 #!/usr/bin/env python
 
-import colorsys
-from rgb.constants import MIDI_DIAL_MAX
-import json
 import logging
-import math
 import os
-import random
-import time
-from dataclasses import dataclass
-from random import randrange
-from typing import Dict, List, Set, Tuple
-import datetime
+from typing import List, Optional, Tuple
+
 import numpy as np
 
-from PIL import Image
 from rgb.form.baseform import BaseForm
-
-from rgb.messages import Dial
-from rgb.utilities import clamp, clamped_add, clamped_subtract
+from rgb.framebuffer import Frame
+from rgb.utilities import hsv_to_rgb_array
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
 
 
 class AudioSpectrogram(BaseForm):
-    def state_handler(self, spectrum: List[float]):
-        log.warning(f"Max State: {max(spectrum)}")
-        if self.state:
-            self.state = [clamped_add(x, y * self.gain) for x, y in zip(spectrum, self.state)]
-        else:
-            self.state = [min(1.0, x) for x in spectrum]
+    """
+    The latest spectrum, one horizontal stripe per band, decaying between Spectrum messages. Dials 0 and 1 pick the
+    range of bands shown, dial 2 the decay rate and dial 3 how much of the previous spectrum each message keeps.
+    """
+
+    BANDS = 150
+    # Stripes cycle through this many hues, so neighbouring bands are told apart
+    HUES = 12
 
     def __init__(self, dimensions: Tuple[int, int]):
-        self.decay_per_s = 2.0
-        (self.matrix_width, self.matrix_height) = dimensions
-        self.last_observed_lo_dial = 0
-        self.last_observed_hi_dial = 127
-        self.gain = 1.0
-        self.state = [random.random() for i in range(150)]
+        super().__init__(dimensions)
+        self.state = np.random.random(AudioSpectrogram.BANDS).astype(np.float32)
         self.handlers = {"Spectrum": {0: self.state_handler}}
+        # Band shown on each row, and that row's color at full value; rebuilt when the band range changes
+        self._row_key: Optional[Tuple[int, int, int]] = None
+        self._row_bands = np.zeros(self.matrix_height, dtype=np.intp)
+        self._row_rgb = np.zeros((self.matrix_height, 3), dtype=np.float32)
 
     @property
     def last_observed_lo_dial(self):
@@ -57,29 +49,72 @@ class AudioSpectrogram(BaseForm):
     def gain(self):
         return BaseForm.dials(3) * 2
 
-    def step(self, dt) -> Image.Image:
-        decay = dt * self.decay_per_s
-        self.state = [clamped_subtract(x, decay) for x in self.state]
+    def state_handler(self, spectrum: List[float]):
+        spectrum = np.asarray(spectrum, dtype=np.float32)
+        if spectrum.size == 0:
+            log.debug("Ignoring empty spectrum")
+            return
+        log.debug(f"Max State: {spectrum.max(initial=0.0)}")
+        if spectrum.shape == self.state.shape:
+            self.state *= self.gain
+            self.state += spectrum
+        else:
+            self.state = spectrum.copy()
+        np.clip(self.state, 0.0, 1.0, out=self.state)
+
+    def band_range(self) -> Tuple[int, int]:
+        # [lo, hi) of the bands shown, from dials 0 and 1 in either order, and at least one band
+        n = len(self.state)
+        (lo, hi) = sorted(int(round(dial * n)) for dial in (self.last_observed_lo_dial, self.last_observed_hi_dial))
+        if lo == hi:
+            (lo, hi) = (min(lo, n - 1), min(lo, n - 1) + 1)
+        return (lo, hi)
+
+    def _update_row_map(self):
+        (lo, hi) = self.band_range()
+        key = (lo, hi, len(self.state))
+        if key == self._row_key:
+            return
+        self._row_key = key
+        # Bands are split evenly over the rows, highest band at the top row. Bands left with no rows aren't shown.
+        edges = np.linspace(0, self.matrix_height, hi - lo + 1).astype(np.intp)
+        position = np.searchsorted(edges, np.arange(self.matrix_height), side="right") - 1
+        self._row_bands = hi - 1 - position
+        self._row_rgb = hsv_to_rgb_array((position % AudioSpectrogram.HUES) / AudioSpectrogram.HUES, 1.0, 1.0)
+
+    def row_colors(self) -> np.ndarray:
+        # (height, 3) uint8, the color of each row for the current state
+        self._update_row_map()
+        return (255 * self.state[self._row_bands, np.newaxis] * self._row_rgb).astype(np.uint8)
+
+    def step(self, dt) -> Frame:
+        self.state -= dt * self.decay_per_s
+        np.maximum(self.state, 0.0, out=self.state)
         return self._render(dt)
 
-    def _render(self, dt) -> Image.Image:
-        img = np.zeros((self.matrix_height, self.matrix_width, 3), dtype=np.uint8)
-        effective_lo = min(self.last_observed_lo_dial, self.last_observed_hi_dial)
-        effective_hi = max(self.last_observed_lo_dial, self.last_observed_hi_dial)
-        if effective_lo == effective_hi:
-            # Prevent both occupying same spot
-            effective_hi += 1
-        effective_span = effective_hi - effective_lo
-        xs = np.linspace(start=0, stop=self.matrix_height, num=effective_span + 1, endpoint=True, dtype=np.uint8)
-        for index, v in enumerate(reversed(self.state[effective_lo:effective_hi])):
-            lo = xs[index]
-            hi = xs[index + 1]
-            if hi - lo == 0:
-                continue
-            x = index % 12
-            hue = x / 12
-            rgb = colorsys.hsv_to_rgb(hue, 1.0, v)
-            pixel = (np.uint8(255 * rgb[0]), np.uint8(255 * rgb[1]), np.uint8(255 * rgb[2]))
-            img[lo:hi, :, :] = np.tile(pixel, (hi - lo, self.matrix_width, 1))
-
-        return Image.fromarray(img)  # .transpose(Image.FLIP_TOP_BOTTOM)
+    def _render(self, dt) -> Frame:
+        np.copyto(self.framebuffer.array, self.row_colors()[:, np.newaxis, :])
+        return self.framebuffer
+
+
+class AudioWaterfall(AudioSpectrogram):
+    """
+    AudioSpectrogram's stripes as a column per frame, scrolling left, so the panel shows the last width frames.
+
+    Columns are written twice into a ring twice the panel's width, at head and head + width, so the last width columns
+    are always one slice of the ring, ending at the newest: each frame is a single copy of that slice into the
+    framebuffer, with no roll.
+    """
+
+    def __init__(self, dimensions: Tuple[int, int]):
+        super().__init__(dimensions)
+        self.ring = np.zeros((self.matrix_height, 2 * self.matrix_width, 3), dtype=np.uint8)
+        self.head = 0
+
+    def _render(self, dt) -> Frame:
+        colors = self.row_colors()
+        self.ring[:, self.head] = colors
+        self.ring[:, self.head + self.matrix_width] = colors
+        np.copyto(self.framebuffer.array, self.ring[:, self.head + 1 : self.head + 1 + self.matrix_width])
+        self.head = (self.head + 1) % self.matrix_width
+        return self.framebuffer
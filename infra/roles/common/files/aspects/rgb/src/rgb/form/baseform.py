@@ -1,10 +1,9 @@
 from rgb.constants import MIDI_DIAL_MAX
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, Tuple, Union
+from typing import Dict, Optional, Tuple
 import time
-import numpy as np
-from PIL import Image
+from rgb.framebuffer import Frame, FrameBuffer
 import os
 
 log = logging.getLogger(__name__)
@@ -15,14 +14,29 @@ class BaseForm(ABC):
 
     _dials = [0.5 for _ in range(8)]
 
+    # Wall time, in seconds, of the most recent _instrumented_step. Read by the benchmark harness.
+    last_step_dt: float = 0.0
+
+    # (0, 1]. Lowered by the frame scheduler while frames overrun; forms may trade detail for time when it is.
+    quality: float = 1.0
+
+    _framebuffer: Optional[FrameBuffer] = None
+
     def __init__(self, dimensions: Tuple[int, int]):
         (self.matrix_width, self.matrix_height) = dimensions
 
-    def _instrumented_step(self, dt: float) -> Union[Image.Image, np.ndarray]:
-        a = time.time()
+    @property
+    def framebuffer(self) -> FrameBuffer:
+        # Created on first use, as not every form calls BaseForm.__init__
+        if self._framebuffer is None:
+            self._framebuffer = FrameBuffer((self.matrix_width, self.matrix_height))
+        return self._framebuffer
+
+    def _instrumented_step(self, dt: float) -> Frame:
+        a = time.perf_counter()
         res = self.step(dt)
-        dt = time.time() - a
-        log.debug(f"Step dt: {dt}")
+        self.last_step_dt = time.perf_counter() - a
+        log.debug(f"Step dt: {self.last_step_dt}")
         return res
 
     @classmethod
@@ -30,7 +44,7 @@ class BaseForm(ABC):
         return cls._dials[index]
 
     @abstractmethod
-    def step(self, dt: float) -> Union[Image.Image, np.ndarray]:
+    def step(self, dt: float) -> Frame:
         pass
 
     def midi_handler(self, value: Dict):
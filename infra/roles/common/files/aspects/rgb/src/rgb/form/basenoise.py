@@ -6,15 +6,15 @@ import logging
 import os
 import time
 from dataclasses import dataclass
-from typing import Dict, Tuple, Union
+from typing import Dict, Tuple
 
 import numpy as np
-from noise import pnoise3, snoise3
-from PIL import Image
 from rgb.form.keyawareform import KeyAwareForm
 from rgb.constants import NUM_NOTES, MIDI_DIAL_MAX
 from rgb.form.baseform import BaseForm
-from rgb.utilities import hsv_to_pixel, dial
+from rgb.framebuffer import Frame
+from rgb.form.noisefield import pnoise3_array, snoise3_array
+from rgb.utilities import hsv_to_pixels, dial
 
 log = logging.getLogger(__name__)
 log.setLevel(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
@@ -22,7 +22,8 @@ log.setLevel(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
 
 class BaseNoise(BaseForm):
 
-    NOISE_FUNCTIONS = [pnoise3, snoise3]
+    # Whole-frame equivalents of [pnoise3, snoise3]; see noisefield.py
+    NOISE_FUNCTIONS = [pnoise3_array, snoise3_array]
 
     def __init__(self, dimensions: Tuple[int, int]):
         super().__init__(dimensions)
@@ -31,6 +32,13 @@ class BaseNoise(BaseForm):
 
         self.t_start = time.time()
 
+        # Pixel offsets from the center of the matrix, computed once. Rows are y, columns are x.
+        half_width = self.matrix_width // 2
+        half_height = self.matrix_height // 2
+        self.grid_y, self.grid_x = np.mgrid[
+            -half_height : self.matrix_height - half_height, -half_width : self.matrix_width - half_width
+        ]
+
     @property
     def scale(self):
         return (BaseForm.dials(0)) ** 3  # [0, 1.0] 🏒🏒
@@ -47,77 +55,74 @@ class BaseNoise(BaseForm):
     def timescale(self):
         return BaseForm.dials(3)  # [0, 1.0] linear
 
-    def select_noise(self, x, y, z) -> float:
+    def select_noise(self, x, y, z) -> np.ndarray:
+        # x, y may be scalars or arrays
         return self.NOISE_FUNCTIONS[self.noise_function_index](
-            y * self.scale, x * self.scale, z * self.timescale, octaves=self.octaves, persistence=self.persistence
+            np.multiply(y, self.scale),
+            np.multiply(x, self.scale),
+            z * self.timescale,
+            octaves=self.octaves,
+            persistence=self.persistence,
         )
 
     @staticmethod
-    def normalize_noise(noise: float) -> float:
+    def normalize_noise(noise: np.ndarray) -> np.ndarray:
         return (noise + 1.0) / 2
 
-    def noise_to_pixel(self, v: float):
-        normed = BaseNoise.normalize_noise(v)
-        pix_value = normed * 255
-        return (np.uint8(pix_value), np.uint8(pix_value), np.uint8(pix_value))
+    def noise_to_pixels(self, v: np.ndarray) -> np.ndarray:
+        # (h, w) noise -> uint8 pixels, (h, w, 3) or, for greys, (h, w, 1) to broadcast across channels
+        pix_value = (BaseNoise.normalize_noise(v) * 255).astype(np.uint8)
+        return pix_value[:, :, np.newaxis]
 
-    def step(self, dt) -> Image.Image:
-        res = np.zeros((self.matrix_height, self.matrix_width, 3), dtype=np.uint8)
+    def step(self, dt) -> Frame:
         dt = time.time() - self.t_start
-        half_width = self.matrix_width // 2
-        half_height = self.matrix_height // 2
-        for i in range(self.matrix_height):
-            for j in range(self.matrix_width):
-                v = self.select_noise(x=j - half_width, y=i - half_height, z=dt)
-                res[i, j, :] = self.noise_to_pixel(v)
-
-        return Image.fromarray(res)  # .transpose(Image.FLIP_TOP_BOTTOM)
+        v = self.select_noise(x=self.grid_x, y=self.grid_y, z=dt)
+        self.framebuffer.array[...] = self.noise_to_pixels(v)
+        return self.framebuffer
 
 
 class WhispNoise(BaseNoise):
-    def noise_to_pixel(self, v: float):
+    def noise_to_pixels(self, v: np.ndarray) -> np.ndarray:
         normed = (v + 1.0) / 2
         exponented = normed ** 8
-        pix_value = max(1.0, exponented * 255.0)
-        return (np.uint8(pix_value), np.uint8(pix_value), np.uint8(pix_value))
+        pix_value = np.maximum(1.0, exponented * 255.0).astype(np.uint8)
+        return pix_value[:, :, np.newaxis]
 
 
 class HueNoise(BaseNoise):
-    def __init__(self, dimensions: Tuple[int, int]):
-        super().__init__(dimensions)
-        self.scale = 1 / 36.0  # 1/48, [0.1, 10]
-        self.octaves = 4  # 4, [1, 8]
-        self.persistence = 0.0001  # 0.25, [0, 5]
-        self.timescale = 0.25
+    # Fixed, rather than dial-driven, parameters
+    scale = 1 / 36.0  # 1/48, [0.1, 10]
+    octaves = 4  # 4, [1, 8]
+    persistence = 0.0001  # 0.25, [0, 5]
+    timescale = 0.25
 
-    def noise_to_pixel(self, v: float):
-        return hsv_to_pixel((v + 1.0) / 2, 1.0, 1.0)
+    def noise_to_pixels(self, v: np.ndarray) -> np.ndarray:
+        return hsv_to_pixels((v + 1.0) / 2, 1.0, 1.0)
 
 
 class NoiseKey(BaseNoise, KeyAwareForm):
-    def step(self, dt) -> Union[Image.Image, np.ndarray]:
+    def __init__(self, dimensions: Tuple[int, int]):
+        super().__init__(dimensions)
+        self.ys, self.xs = np.mgrid[0 : self.matrix_height, 0 : self.matrix_width]
+        # Each press's pixels are summed here, then averaged into the framebuffer
+        self.notespace = np.zeros((self.matrix_height, self.matrix_width, 3), dtype=np.float32)
+
+    def step(self, dt) -> Frame:
         time_elapsed = time.time() - self.t_start
-        notespace = np.zeros((len(self.presses()), self.matrix_height, self.matrix_width, 3), dtype=np.uint8)
-        xs = np.linspace(start=0, stop=self.matrix_width, num=NUM_NOTES + 1, endpoint=True, dtype=np.uint8)
-        for index, v in enumerate(self.presses().values()):
+        presses = list(self.presses().values())
+        if not presses:
+            return self.framebuffer.clear()
+        self.notespace.fill(0.0)
+        for v in presses:
             note_index = v.note % NUM_NOTES
-            hue = note_index / NUM_NOTES
-            lo = xs[note_index]
-            hi = xs[note_index + 1]
-            for i in range(self.matrix_height):
-                for j in range(self.matrix_width):
-                    noise_value = self.NOISE_FUNCTIONS[self.noise_function_index](
-                        i * self.scale,
-                        j * self.scale,
-                        time_elapsed * self.timescale,
-                        octaves=self.octaves,
-                        persistence=note_index / 12,
-                    )
-                    pixel = self.noise_to_pixel(noise_value)
-                    notespace[index, i, j, 0] = pixel[0]
-                    notespace[index, i, j, 1] = pixel[1]
-                    notespace[index, i, j, 2] = pixel[2]
-
-        res = np.mean(notespace, axis=0, dtype=np.uint8)
-
-        return res
+            noise_value = self.NOISE_FUNCTIONS[self.noise_function_index](
+                self.ys * self.scale,
+                self.xs * self.scale,
+                time_elapsed * self.timescale,
+                octaves=self.octaves,
+                persistence=note_index / 12,
+            )
+            self.notespace += self.noise_to_pixels(noise_value)
+        self.notespace /= len(presses)
+        np.copyto(self.framebuffer.array, self.notespace, casting="unsafe")
+        return self.framebuffer
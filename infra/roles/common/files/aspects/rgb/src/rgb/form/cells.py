@@ -1,31 +1,103 @@
 #!/usr/bin/env python
 
-from rgb.form.basenoise import BaseNoise
 import logging
 import os
+import re
 import time
-from dataclasses import dataclass
-from random import randrange
-from typing import Dict, List, Set, Tuple
+from typing import Set, Tuple
 
 import numpy as np
 
 from rgb.constants import NUM_NOTES
-from PIL import Image
 from rgb.form.baseform import BaseForm
 from rgb.form.keyawareform import KeyAwareForm, Press
-from rgb.messages import Dial
-from rgb.utilities import clamp, dial, hsv_to_pixel
+from rgb.framebuffer import Frame
+from rgb.utilities import hsv_to_pixels
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
 
+# Offsets into a wrap_pad()ed grid of the eight neighbours: edge-adjacent, then diagonal
+ADJACENT = ((0, 1), (2, 1), (1, 0), (1, 2))
+DIAGONAL = ((0, 0), (0, 2), (2, 0), (2, 2))
+
+
+def wrap_pad(a: np.ndarray, padded: np.ndarray) -> np.ndarray:
+    """
+    a into the interior of padded, two larger in each dimension, with a border copied from a's opposite edges, so that
+    shifted slices of padded are a's neighbours on a torus.
+    """
+    padded[1:-1, 1:-1] = a
+    padded[0, 1:-1] = a[-1]
+    padded[-1, 1:-1] = a[0]
+    padded[:, 0] = padded[:, -2]
+    padded[:, -1] = padded[:, 1]
+    return padded
+
+
+def neighbour_sum(padded: np.ndarray, offsets, out: np.ndarray) -> np.ndarray:
+    (h, w) = out.shape
+    ((y, x), *rest) = offsets
+    np.copyto(out, padded[y : y + h, x : x + w])
+    for (y, x) in rest:
+        out += padded[y : y + h, x : x + w]
+    return out
+
+
+def parse_rule(rule: str) -> np.ndarray:
+    """
+    A Life-like rule in B/S notation ("B3/S23" is Conway's Life) as a (2, 9) bool table: [alive, live neighbours] ->
+    alive next generation.
+    """
+    match = re.fullmatch(r"B([0-8]*)/S([0-8]*)", rule.upper())
+    if match is None:
+        raise ValueError(f"Expected a rule like B3/S23, got {rule}")
+    table = np.zeros((2, 9), dtype=bool)
+    table[0, [int(n) for n in match.group(1)]] = True
+    table[1, [int(n) for n in match.group(2)]] = True
+    return table
+
 
 class Cells(KeyAwareForm):
-    def __init__(self, dimensions: Tuple[int, int]):
+    """
+    A Life-like cellular automaton on a grid of cell_width pixel cells, wrapping at the edges. Each press seeds a patch
+    of random cells, at a spot chosen from its time, in its note's hue; live cells drift through hues as they age, and
+    dead ones fade.
+
+    Generations advance at generations_per_s (dial 0). A frame runs the generations it is due, for up to budget_fraction
+    of its dt (scaled by quality); generations that don't fit are dropped, so a slow panel runs the simulation slower
+    rather than falling behind.
+    """
+
+    SEED_RADIUS = 2
+    FADE_PER_GENERATION = 0.8
+
+    def __init__(
+        self,
+        dimensions: Tuple[int, int],
+        cell_width: int = 1,
+        rule: str = "B3/S23",
+        density: float = 0.25,
+        budget_fraction: float = 0.5,
+    ):
         super().__init__(dimensions)
-        self.cell_width = 8
-        self.z = 0
+        self.cell_width = cell_width
+        self.rule = parse_rule(rule)
+        self.budget_fraction = budget_fraction
+        self.generation_count = 0
+        self._pending = 0.0
+        self._seeded: Set[Press] = set()
+        self.hue = 0.0
+        self.allocate((self.practical_height, self.practical_width), density)
+
+    def allocate(self, shape: Tuple[int, int], density: float):
+        # The simulation's state and scratch buffers, of the practical (cell grid) shape
+        self.alive = (np.random.random(shape) < density).astype(np.uint8)
+        self.age = np.zeros(shape, dtype=np.float32)
+        self.trail = np.zeros(shape, dtype=np.float32)
+        self._padded = np.zeros((shape[0] + 2, shape[1] + 2), dtype=np.uint8)
+        self._counts = np.zeros(shape, dtype=np.uint8)
+        self._diagonal = np.zeros(shape, dtype=np.uint8)
 
     @property
     def practical_width(self) -> int:
@@ -35,30 +107,142 @@ class Cells(KeyAwareForm):
     def practical_height(self) -> int:
         return self.matrix_height // self.cell_width
 
-    def step(self, dt) -> Image.Image:
-
-        # intensities = np.zeros((self.practical_height, self.practical_width), dtype=float)
-        res = np.zeros((self.practical_height, self.practical_width, 3), dtype=np.uint8)
-        # for i in range(self.practical_height):
-        #     for j in range(self.practical_width):
-        #         # practical_center = (i * self.cell_width + self.cell_width // 2, j * self.cell_width + self.cell_width // 2)
-        #         # noise = self.select_noise(*practical_center, self.z)
-        #         noise = self.select_noise(i, j, self.z)
-        #         normalized_noise = self.normalize_noise(noise)
-        #         intensities[i,j] = normalized_noise
-        #         res[i,j,:] = hsv_to_pixel(0, 0, normalized_noise)
-
-        for v in self.presses().values():
-            x_index = hash(v.t) % self.practical_width
-            y_index = hash(v.t * 2) % self.practical_height
-            index = v.note % NUM_NOTES
-            hue = index / NUM_NOTES
-            pixel = hsv_to_pixel(hue, 1.0, 1.0)
-            res[y_index, x_index, :] = pixel
-        image_small = Image.fromarray(res)
-        resized = image_small.resize((self.matrix_width, self.matrix_height), resample=0)
-        return resized
+    @property
+    def generations_per_s(self) -> float:
+        return 1 + BaseForm.dials(0) * 59
+
+    def upscale_indices(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Nearest-neighbour source row and column for each matrix pixel, as PIL's resize(resample=0) picks them
+        rows = ((np.arange(self.matrix_height) + 0.5) * self.practical_height / self.matrix_height).astype(np.intp)
+        cols = ((np.arange(self.matrix_width) + 0.5) * self.practical_width / self.matrix_width).astype(np.intp)
+        return (rows[:, np.newaxis], cols[np.newaxis, :])
+
+    def seed_window(self, press: Press) -> Tuple[slice, slice]:
+        # The patch a press seeds, around a spot that follows from its time
+        x = hash(press.t) % self.practical_width
+        y = hash(press.t * 2) % self.practical_height
+        r = self.SEED_RADIUS
+        return (slice(max(0, y - r), y + r + 1), slice(max(0, x - r), x + r + 1))
+
+    def seed(self, press: Press):
+        window = self.seed_window(press)
+        patch = self.alive[window]
+        patch |= (np.random.random(patch.shape) < 0.5).astype(np.uint8)
+        self.age[window] = 0
+
+    def generation(self):
+        padded = wrap_pad(self.alive, self._padded)
+        neighbour_sum(padded, ADJACENT, self._counts)
+        self._counts += neighbour_sum(padded, DIAGONAL, self._diagonal)
+        was_dead = self.alive == 0
+        self.alive = self.rule[self.alive, self._counts].astype(np.uint8)
+        # Ages count generations alive, so start again from cells that were dead (and are now dead or just born)
+        self.age += 1
+        self.age[was_dead] = 0
+        self.trail *= self.FADE_PER_GENERATION
+        self.trail[self.alive == 1] = 1.0
+
+    def render(self) -> np.ndarray:
+        # (practical_height, practical_width, 3) uint8
+        hue = (self.hue + self.age * 0.01) % 1.0
+        return hsv_to_pixels(hue, 1.0, self.trail)
+
+    def step(self, dt) -> Frame:
+        self.prune_presses_dictionary()
+        presses = set(self.presses().values())
+        for press in presses - self._seeded:
+            self.hue = press.note_index / NUM_NOTES
+            self.seed(press)
+        self._seeded = presses
+
+        self._pending += dt * self.generations_per_s
+        deadline = time.perf_counter() + self.budget_fraction * dt * self.quality
+        ran = 0
+        while self._pending >= 1 and (ran == 0 or time.perf_counter() < deadline):
+            self.generation()
+            self._pending -= 1
+            ran += 1
+        self.generation_count += ran
+        # Whole generations that didn't fit are dropped
+        self._pending %= 1.0
+
+        res = self.render()
+        if self.cell_width == 1:
+            self.framebuffer.array[...] = res
+        else:
+            self.framebuffer.array[...] = res[self.upscale_indices()]
+        return self.framebuffer
 
 
 class CellsRun(Cells):
-    pass
+    """
+    Gray-Scott reaction-diffusion: reagent v grows in u where it already is, so presses (which add v) seed spots that
+    run into stripes, spots and mazes depending on feed (dial 0) and kill (dial 1). Colored by v, in the last press's
+    hue.
+    """
+
+    GENERATIONS_PER_S = 1200
+    DIFFUSION_U = 1.0
+    DIFFUSION_V = 0.5
+
+    def __init__(self, dimensions: Tuple[int, int], cell_width: int = 1, budget_fraction: float = 0.5):
+        super().__init__(dimensions, cell_width=cell_width, budget_fraction=budget_fraction)
+        for _ in range(3):
+            self.seed(Press(note=0, velocity=1.0, t=np.random.random()))
+
+    def allocate(self, shape: Tuple[int, int], density: float):
+        # Reagents u and v, and the scratch buffers of a generation; density (of Life's live cells) doesn't apply
+        self.u = np.ones(shape, dtype=np.float32)
+        self.v = np.zeros(shape, dtype=np.float32)
+        self._padded_f = np.zeros((shape[0] + 2, shape[1] + 2), dtype=np.float32)
+        self._lu = np.zeros(shape, dtype=np.float32)
+        self._lv = np.zeros(shape, dtype=np.float32)
+        self._uvv = np.zeros(shape, dtype=np.float32)
+
+    @property
+    def generations_per_s(self) -> float:
+        return CellsRun.GENERATIONS_PER_S
+
+    @property
+    def feed(self) -> float:
+        return 0.02 + BaseForm.dials(0) * 0.04
+
+    @property
+    def kill(self) -> float:
+        return 0.05 + BaseForm.dials(1) * 0.02
+
+    def seed(self, press: Press):
+        window = self.seed_window(press)
+        self.u[window] = 0.5
+        self.v[window] = 0.25 + 0.5 * np.random.random(self.v[window].shape)
+
+    def laplacian(self, a: np.ndarray, out: np.ndarray) -> np.ndarray:
+        # Nine-point: 0.2 per adjacent neighbour, 0.05 per diagonal, -1 for the cell
+        padded = wrap_pad(a, self._padded_f)
+        neighbour_sum(padded, ADJACENT, out)
+        out *= 0.2 / 0.05
+        out += neighbour_sum(padded, DIAGONAL, self._uvv)
+        out *= 0.05
+        out -= a
+        return out
+
+    def generation(self):
+        (u, v, uvv) = (self.u, self.v, self._uvv)
+        self.laplacian(u, self._lu)
+        self.laplacian(v, self._lv)
+        np.multiply(v, v, out=uvv)
+        uvv *= u
+        (feed, kill) = (self.feed, self.kill)
+        # u += Du * lap(u) - uvv + feed * (1 - u); v += Dv * lap(v) + uvv - (feed + kill) * v
+        self._lu *= CellsRun.DIFFUSION_U
+        self._lu -= uvv
+        self._lu += feed
+        u *= 1 - feed
+        u += self._lu
+        self._lv *= CellsRun.DIFFUSION_V
+        self._lv += uvv
+        v *= 1 - feed - kill
+        v += self._lv
+
+    def render(self) -> np.ndarray:
+        return hsv_to_pixels(self.hue, 1.0, np.clip(self.v * 3, 0.0, 1.0))
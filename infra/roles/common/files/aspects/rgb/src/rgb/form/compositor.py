@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+
+import logging
+import math
+import os
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+Color = Sequence[int]  # RGB or RGBA, [0,255]
+
+
+def split_color(color: Color) -> Tuple[np.ndarray, float]:
+    # -> (float32 RGB as (3, 1, 1), to broadcast against planes, alpha in [0,1]). RGB colors are opaque.
+    alpha = color[3] / 255 if len(color) == 4 else 1.0
+    return (np.asarray(color[:3], dtype=np.float32).reshape(3, 1, 1), alpha)
+
+
+def blend_coverage(frame: np.ndarray, coverage: np.ndarray, rgb: np.ndarray, additive: bool = False):
+    """
+    Blend rgb into a float32 frame (or region of one) where coverage is the per-pixel opacity in [0,1]. Layout is up to
+    the caller, as long as the three broadcast: (3, h, w) planes with (h, w) coverage and (3, 1, 1) rgb, or (h, w, 3)
+    pixels with (h, w, 1) coverage and (3,) rgb.
+    """
+    if additive:
+        frame += rgb * coverage
+        np.minimum(frame, 255, out=frame)
+    else:
+        delta = rgb - frame
+        delta *= coverage
+        frame += delta
+
+
+def blend_where(frame: np.ndarray, mask: np.ndarray, rgb: np.ndarray, alpha: float, additive: bool = False):
+    """
+    As blend_coverage over (3, h, w) planes, for a boolean (h, w) mask at a single opacity. Only the masked pixels are
+    touched, which is much cheaper for outlines and small shapes.
+    """
+    if np.count_nonzero(mask) > mask.size // 4:
+        # Gathering most of the region costs more than blending all of it
+        blend_coverage(frame, mask * np.float32(alpha), rgb, additive)
+        return
+    pixels = frame[:, mask]
+    rgb = rgb.reshape(3, 1)
+    if additive:
+        pixels += rgb * np.float32(alpha)
+        np.minimum(pixels, 255, out=pixels)
+    else:
+        pixels += (rgb - pixels) * np.float32(alpha)
+    frame[:, mask] = pixels
+
+
+class Compositor:
+    """
+    float32 framebuffer with vectorized drawing primitives, standing in for an RGBA ImageDraw over an RGB image.
+
+    The frame is stored as (3, h, w) planes: blending a color into (h, w, 3) pixels broadcasts over an innermost axis of
+    length 3, which NumPy handles an order of magnitude slower.
+
+    Shapes are drawn from distance fields rather than rasterized one by one: the distance (in pixels) from a center to
+    every pixel, or the polygon analogue, is cached per shape as a window into a (2h-1, 2w-1) field of offsets, so a
+    filled disk, outline, or a run of concentric rings is a comparison against that field.
+    """
+
+    BLEND_MODES = ("alpha", "additive")
+    # Each (2h-1, 2w-1) float32 field is ~260KiB at 256x64; one per held polygon press is plenty.
+    FIELD_CACHE_SIZE = 16
+    POLYGON_MASK_CACHE_SIZE = 64
+
+    def __init__(self, dimensions: Tuple[int, int], blend_mode: str = "alpha"):
+        if blend_mode not in Compositor.BLEND_MODES:
+            raise ValueError(f"Unknown blend mode {blend_mode}, expected one of {Compositor.BLEND_MODES}")
+        (self.width, self.height) = dimensions
+        self.blend_mode = blend_mode
+        self.frame = np.zeros((3, self.height, self.width), dtype=np.float32)
+        # Offsets from the center of the field, (2h-1, 2w-1)
+        self._dy, self._dx = np.mgrid[-(self.height - 1) : self.height, -(self.width - 1) : self.width].astype(
+            np.float32
+        )
+        self._radial: Optional[np.ndarray] = None
+        self._fields: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._polygon_masks: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+
+    @property
+    def additive(self) -> bool:
+        return self.blend_mode == "additive"
+
+    def clear(self):
+        self.frame.fill(0)
+
+    def to_array(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        # -> (h, w, 3) uint8, as the displays expect; written into out (e.g. a FrameBuffer's array) when given
+        if out is None:
+            return np.ascontiguousarray(np.moveaxis(self.frame, 0, -1), dtype=np.uint8)
+        np.copyto(out, np.moveaxis(self.frame, 0, -1), casting="unsafe")
+        return out
+
+    @staticmethod
+    def _lru(cache: OrderedDict, key: Hashable, size: int, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        value = compute()
+        cache[key] = value
+        if len(cache) > size:
+            cache.popitem(last=False)
+        return value
+
+    """
+    Blending
+    """
+
+    def blend(self, coverage: np.ndarray, color: Color, x0: int = 0, y0: int = 0):
+        """
+        Blend color where coverage (h, w, float [0,1]) has its top-left corner at (x0, y0). Clipped to the frame.
+        """
+        (h, w) = coverage.shape
+        fx0, fy0 = max(x0, 0), max(y0, 0)
+        fx1, fy1 = min(x0 + w, self.width), min(y0 + h, self.height)
+        if fx0 >= fx1 or fy0 >= fy1:
+            return
+        rgb, alpha = split_color(color)
+        clipped = coverage[fy0 - y0 : fy1 - y0, fx0 - x0 : fx1 - x0]
+        blend_coverage(self.frame[:, fy0:fy1, fx0:fx1], clipped * np.float32(alpha), rgb, self.additive)
+
+    def fill_columns(self, lo: int, hi: int, color: Color):
+        # Inclusive [lo, hi], like ImageDraw.rectangle
+        lo, hi = max(int(lo), 0), min(int(hi), self.width - 1)
+        if lo > hi:
+            return
+        rgb, alpha = split_color(color)
+        blend_coverage(self.frame[:, :, lo : hi + 1], np.float32(alpha), rgb, self.additive)
+
+    def column_falloff(self, lo: int, hi: int, color: Color, scales: np.ndarray):
+        """
+        A band [lo, hi] at full opacity, plus columns lo - i and hi + i at opacity scales[i] on either side. Equivalent to
+        drawing each of those as its own one-pixel-wide rectangle, as repeated blends of one color compose to
+        1 - prod(1 - alpha_i).
+        """
+        rgb, alpha = split_color(color)
+        transparency = np.ones(self.width, dtype=np.float32)
+        transparency[max(int(lo), 0) : max(int(hi) + 1, 0)] *= 1 - alpha
+        offsets = np.arange(len(scales))
+        per_column = (1 - alpha * np.asarray(scales, dtype=np.float32)).astype(np.float32)
+        for columns in (lo - offsets, hi + offsets):
+            valid = (0 <= columns) & (columns < self.width)
+            np.multiply.at(transparency, columns[valid], per_column[valid])
+        c0 = max(min(lo, lo - len(scales) + 1), 0)
+        c1 = min(max(hi + 1, hi + len(scales)), self.width)
+        if c0 >= c1:
+            return
+        blend_coverage(self.frame[:, :, c0:c1], 1 - transparency[c0:c1], rgb, self.additive)
+
+    """
+    Distance fields
+    """
+
+    def _window(self, field: np.ndarray, x: int, y: int) -> np.ndarray:
+        # The (h, w) view of an offset field centered on pixel (x, y)
+        return field[self.height - 1 - y : 2 * self.height - 1 - y, self.width - 1 - x : 2 * self.width - 1 - x]
+
+    def _in_frame(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def radial_field(self, x: int, y: int) -> np.ndarray:
+        """
+        Distance from (x, y) to each pixel.
+        """
+        if not self._in_frame(x, y):
+            ys, xs = np.mgrid[0 : self.height, 0 : self.width]
+            return np.hypot(xs - x, ys - y).astype(np.float32)
+        if self._radial is None:
+            self._radial = np.hypot(self._dx, self._dy)
+        return self._window(self._radial, x, y)
+
+    @staticmethod
+    def polygon_apothem_ratio(num_sides: int) -> float:
+        # Center-to-edge distance of a regular polygon, per unit circumradius
+        return math.cos(math.pi / num_sides)
+
+    @staticmethod
+    def polygon_normals(num_sides: int, rotation: float) -> np.ndarray:
+        """
+        Outward edge normals, (num_sides, 2), of ImageDraw.regular_polygon(..., num_sides, rotation), so that shapes keep
+        the orientation they had when drawn with PIL.
+        """
+        degrees = 360 / num_sides
+        angles = np.radians(270 + rotation + degrees * np.arange(num_sides))
+        return np.column_stack((np.cos(angles), -np.sin(angles))).astype(np.float32)
+
+    def polygon_field(self, x: int, y: int, num_sides: int, rotation: float) -> np.ndarray:
+        """
+        For each pixel, the apothem of the smallest regular polygon centered on (x, y) that contains it. The polygon with
+        circumradius r covers pixels where this is <= r * polygon_apothem_ratio(num_sides).
+        """
+        normals = Compositor.polygon_normals(num_sides, rotation)
+
+        def compute(dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+            field = np.full(dx.shape, -np.inf, dtype=np.float32)
+            for (nx, ny) in normals:
+                np.maximum(field, dx * nx + dy * ny, out=field)
+            return field
+
+        if not self._in_frame(x, y):
+            ys, xs = np.mgrid[0 : self.height, 0 : self.width]
+            return compute((xs - x).astype(np.float32), (ys - y).astype(np.float32))
+        key = (num_sides, rotation % 360)
+        field = Compositor._lru(self._fields, key, self.FIELD_CACHE_SIZE, lambda: compute(self._dx, self._dy))
+        return self._window(field, x, y)
+
+    def _bounds(self, x: int, y: int, extent: float) -> Tuple[int, int, int, int]:
+        # Frame-clipped (x0, y0, x1, y1), exclusive, of the square reaching extent pixels from (x, y)
+        extent = math.ceil(extent) + 1
+        return (
+            max(x - extent, 0),
+            max(y - extent, 0),
+            min(x + extent + 1, self.width),
+            min(y + extent + 1, self.height),
+        )
+
+    def _blend_field(self, field: np.ndarray, x: int, y: int, extent: float, rgb: np.ndarray, alpha: float, select):
+        """
+        Only the shape's bounding box is evaluated and blended. select maps field values to either a boolean mask, blended
+        at alpha, or per-pixel opacities in [0,1], which are scaled by it.
+        """
+        (x0, y0, x1, y1) = self._bounds(x, y, extent)
+        if x0 >= x1 or y0 >= y1:
+            return
+        coverage = select(field[y0:y1, x0:x1])
+        region = self.frame[:, y0:y1, x0:x1]
+        if coverage.dtype == bool:
+            blend_where(region, coverage, rgb, alpha, self.additive)
+        else:
+            blend_coverage(region, coverage * np.float32(alpha), rgb, self.additive)
+
+    def fill_circle(self, x: int, y: int, r: float, color: Color):
+        rgb, alpha = split_color(color)
+        self._blend_field(self.radial_field(x, y), x, y, r, rgb, alpha, lambda d: d <= r)
+
+    def outline_circle(self, x: int, y: int, r: float, color: Color, width: float = 1.0):
+        rgb, alpha = split_color(color)
+        select = lambda d: np.abs(d - r) <= width / 2
+        self._blend_field(self.radial_field(x, y), x, y, r + width, rgb, alpha, select)
+
+    def fill_regular_polygon(self, x: int, y: int, r: float, num_sides: int, rotation: float, color: Color):
+        """
+        As ImageDraw.regular_polygon((x, y, r), num_sides, rotation), r being the circumradius.
+        """
+        rgb, alpha = split_color(color)
+        threshold = r * Compositor.polygon_apothem_ratio(num_sides)
+        field = self.polygon_field(x, y, num_sides, rotation)
+        self._blend_field(field, x, y, r, rgb, alpha, lambda d: d <= threshold)
+
+    def outline_regular_polygon(
+        self, x: int, y: int, r: float, num_sides: int, rotation: float, color: Color, width: float = 1.0
+    ):
+        rgb, alpha = split_color(color)
+        threshold = r * Compositor.polygon_apothem_ratio(num_sides)
+        field = self.polygon_field(x, y, num_sides, rotation)
+        select = lambda d: np.abs(d - threshold) <= width / 2
+        self._blend_field(field, x, y, r + width, rgb, alpha, select)
+
+    def nested_regular_polygons(
+        self, x: int, y: int, radii: np.ndarray, alphas: np.ndarray, num_sides: int, rotation: float, color: Color
+    ):
+        """
+        Concentric polygons of one color: polygon i has circumradius radii[i] (ascending) and relative opacity
+        alphas[i]. A pixel is inside every polygon from the first radius that reaches it onward, so its combined opacity
+        is 1 - prod(1 - alpha_i) over that suffix, the same as drawing them one by one.
+        """
+        if len(radii) == 0:
+            return
+        rgb, alpha = split_color(color)
+        opacities = np.zeros(len(radii) + 1, dtype=np.float32)
+        opacities[:-1] = 1 - np.cumprod((1 - alpha * np.asarray(alphas, dtype=np.float32))[::-1])[::-1]
+        thresholds = np.asarray(radii, dtype=np.float32) * np.float32(Compositor.polygon_apothem_ratio(num_sides))
+        select = lambda d: opacities[np.searchsorted(thresholds, d, side="left")]
+        field = self.polygon_field(x, y, num_sides, rotation)
+        # alpha is already folded into opacities
+        self._blend_field(field, x, y, float(radii[-1]), rgb, 1.0, select)
+
+    """
+    Arbitrary polygons
+    """
+
+    def polygon_mask(self, coordinates: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """
+        Rasterized (h, w) boolean mask of a polygon, cached by its coordinates.
+        """
+
+        def compute() -> np.ndarray:
+            image = Image.new("1", (self.width, self.height), 0)
+            if len(coordinates) >= 2:
+                ImageDraw.Draw(image).polygon(list(coordinates), fill=1, outline=None)
+            return np.asarray(image, dtype=bool)
+
+        key = tuple(tuple(xy) for xy in coordinates)
+        return Compositor._lru(self._polygon_masks, key, self.POLYGON_MASK_CACHE_SIZE, compute)
+
+    def fill_polygon(self, coordinates: Sequence[Tuple[float, float]], color: Color):
+        rgb, alpha = split_color(color)
+        blend_where(self.frame, self.polygon_mask(coordinates), rgb, alpha, self.additive)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import logging
+import math
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from rgb.utilities import get_font
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+
+@lru_cache(maxsize=32)
+def cached_font(font_name: str, size: int) -> ImageFont.FreeTypeFont:
+    # Only consulted on an atlas miss, so a handful of live FreeType faces is plenty.
+    return get_font(font_name, size)
+
+
+@dataclass(frozen=True)
+class Glyph:
+    # float32 coverage in [0, 1], (h, w), as Compositor.blend takes it
+    coverage: np.ndarray
+    # Offset of the coverage's top-left corner from the anchor ("mm", the text's middle) point
+    offset_x: int
+    offset_y: int
+
+
+class GlyphAtlas:
+    """
+    Rasterizes each (text, font, size) once into float32 coverage and keeps it in an LRU bounded by total bytes.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._glyphs: "OrderedDict[Tuple[str, str, int], Glyph]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._glyphs)
+
+    @staticmethod
+    def rasterize(text: str, font_name: str, size: int) -> Glyph:
+        font = cached_font(font_name, size)
+        scratch = ImageDraw.Draw(Image.new("L", (1, 1)))
+        (left, top, right, bottom) = scratch.textbbox((0, 0), text, font=font, anchor="mm")
+        # Newer Pillow reports fractional boxes for centered anchors
+        (left, top, right, bottom) = (math.floor(left), math.floor(top), math.ceil(right), math.ceil(bottom))
+        image = Image.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(image).text((-left, -top), text, fill=255, font=font, anchor="mm")
+        coverage = np.asarray(image, dtype=np.float32) / np.float32(255)
+        return Glyph(coverage=coverage, offset_x=left, offset_y=top)
+
+    def get(self, text: str, font_name: str, size: int) -> Glyph:
+        key = (text, font_name, size)
+        glyph = self._glyphs.get(key)
+        if glyph is not None:
+            self.hits += 1
+            self._glyphs.move_to_end(key)
+            return glyph
+
+        self.misses += 1
+        glyph = GlyphAtlas.rasterize(text, font_name, size)
+        self._glyphs[key] = glyph
+        self.nbytes += glyph.coverage.nbytes
+        while self.nbytes > self.max_bytes and len(self._glyphs) > 1:
+            _, evicted = self._glyphs.popitem(last=False)
+            self.nbytes -= evicted.coverage.nbytes
+        log.debug(f"Rasterized {key}, atlas holds {len(self._glyphs)} glyphs in {self.nbytes} bytes")
+        return glyph
+
+    def clear(self):
+        self._glyphs.clear()
+        self.nbytes = 0
+
+
+# Shared by every text form, so switching between them keeps the atlas warm.
+ATLAS = GlyphAtlas()
@@ -7,7 +7,6 @@ from typing import Dict, List, Set, Tuple
 import math
 from random import randrange
 import time
-from PIL import Image
 from dataclasses import dataclass
 import colorsys
 import logging
@@ -17,35 +16,72 @@ import numpy as np
 
 
 from rgb.constants import PAD_INDICES, NUM_NOTES
-from rgb.utilities import clamp
+from rgb.utilities import clamp, hsv_to_pixels
 from rgb.form.baseform import BaseForm
+from rgb.framebuffer import Frame
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
 
 
-@dataclass
-class Elt:
-    def __init__(self, x: float, y: float, vx: float, vy: float, hue: float):
-        self.x: float = x
-        self.y: float = y
-        self.vx: float = vx
-        self.vy: float = vy
-        self.hue: float = hue
+class ParticleStore:
+    """
+    Struct-of-arrays particle storage. Live particles occupy indices [0, count); births append in batches and deaths
+    are swap-removed, so the live prefix stays dense and every per-frame update is a slice operation.
+    """
 
-    def __str__(self):
-        return json.dumps({key: getattr(self, key) for key in ["x", "y", "vx", "vy"]})
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.jitter = np.ones(capacity, dtype=np.float32)
+        # Color is fixed for a particle's life, so convert from hue once at birth rather than per render
+        self.rgb = np.zeros((capacity, 3), dtype=np.uint8)
 
-    def __hash__(self):
-        return hash((self.x, self.y, self.hue))
+    def __len__(self) -> int:
+        return self.count
 
-    def __eq__(self, other):
-        return hash(self) == hash(other)
+    def _fields(self):
+        return (self.x, self.y, self.vx, self.vy, self.jitter, self.rgb)
 
-    @property
-    def rgb(self) -> Tuple[np.uint8, np.uint8, np.uint8]:
-        rgb = colorsys.hsv_to_rgb(self.hue, 1.0, 1.0)
-        return (np.uint8(rgb[0] * 255), np.uint8(rgb[1] * 255), np.uint8(rgb[2] * 255))
+    def add(self, x: np.ndarray, y: np.ndarray, vx: np.ndarray, vy: np.ndarray, hue: np.ndarray, jitter: np.ndarray):
+        """
+        Append a batch of particles, broadcasting scalars against the longest argument. Births beyond capacity are dropped.
+        """
+        x, y, vx, vy, hue, jitter = np.broadcast_arrays(x, y, vx, vy, hue, jitter)
+        n = min(len(x), self.capacity - self.count)
+        if n <= 0:
+            return
+        lo, hi = self.count, self.count + n
+        self.x[lo:hi] = x[:n]
+        self.y[lo:hi] = y[:n]
+        self.vx[lo:hi] = vx[:n]
+        self.vy[lo:hi] = vy[:n]
+        self.jitter[lo:hi] = jitter[:n]
+        self.rgb[lo:hi] = hsv_to_pixels(hue[:n], 1.0, 1.0)
+        self.count = hi
+
+    def remove(self, dead: np.ndarray):
+        """
+        Remove the particles flagged in dead, a boolean mask over the live prefix, by moving survivors from the tail into
+        the holes. Costs O(deaths), not O(count).
+        """
+        dead_indices = np.flatnonzero(dead)
+        if dead_indices.size == 0:
+            return
+        new_count = self.count - dead_indices.size
+        holes = dead_indices[dead_indices < new_count]
+        tail = np.arange(new_count, self.count)
+        survivors = tail[~dead[new_count:]]
+        for field in self._fields():
+            field[holes] = field[survivors]
+        self.count = new_count
+
+    def clear(self):
+        self.count = 0
 
 
 class Gravity(KeyAwareForm):
@@ -56,14 +92,18 @@ class Gravity(KeyAwareForm):
     # Add randomness to prevent grouping along horizontals
     JITTERS = 32
 
-    def __init__(self, dimensions: Tuple[int, int], meters_per_pixel: float):
+    MAX_POPULATION = 32768
+
+    def __init__(self, dimensions: Tuple[int, int], meters_per_pixel: float, population: int = 484):
         super().__init__(dimensions)
         (self.matrix_width, self.matrix_height) = dimensions
         self.world_width = self.matrix_width * meters_per_pixel
         self.world_height = self.matrix_height * meters_per_pixel
-        self.population = 484
-        self.particles: Set[Elt] = set()
-        self.jitters = [random.uniform(0.85, 1.15) for _ in range(Gravity.JITTERS)]
+        self.population = min(population, Gravity.MAX_POPULATION)
+        self.particles = ParticleStore(Gravity.MAX_POPULATION)
+        self.jitters = np.array([random.uniform(0.85, 1.15) for _ in range(Gravity.JITTERS)], dtype=np.float32)
+        # Rows are rendered y-up
+        self.framebuffer.flipped = True
 
     @property
     def gravitational_constant(self) -> float:
@@ -91,16 +131,21 @@ class Gravity(KeyAwareForm):
 
         return clamp(BaseForm.dials(3), 0.0, 1.0) * Gravity.MAX_SHAPE
 
+    @property
+    def population_step(self) -> int:
+        # Pads move the population by an eighth, so both ends of [0, MAX_POPULATION] are reachable
+        return max(16, self.population // 8)
+
     def midi_handler(self, value: Dict):
         super().midi_handler(value)
         if value["type"] == "note_on" and value["note"] == PAD_INDICES[2]:
-            self.population = max(self.population - 16, 0)
+            self.population = max(self.population - self.population_step, 0)
         elif value["type"] == "note_on" and value["note"] == PAD_INDICES[3]:
-            self.population = min(self.population + 16, 512)
-        
+            self.population = min(self.population + self.population_step, Gravity.MAX_POPULATION)
+
     def button_0_handler(self, state: bool):
         if state:
-            self.population = min(self.population + 1, 512)
+            self.population = min(self.population + 1, Gravity.MAX_POPULATION)
 
     def button_1_handler(self, state: bool):
         if state:
@@ -111,90 +156,92 @@ class Gravity(KeyAwareForm):
         # E.g. 1:4 would be 0.25
         return self.matrix_height / float(self.world_height)
 
-    def _birth_particles(self):
+    def _births(self) -> int:
         room = self.population - len(self.particles)
         if room <= 0:
-            return
-        births = random.randint(0, room) // 10
-        for _ in range(int(births)):
-            self.particles.add(
-                Elt(
-                    x=self.world_width / 2,
-                    y=self.world_height,
-                    vx=random.uniform(-self.shape, self.shape),
-                    vy=0,
-                    hue=random.random(),
-                )
-            )
+            return 0
+        return random.randint(0, room) // 10
+
+    def _add_particles(self, n: int, x: float, hue):
+        self.particles.add(
+            x=np.full(n, x, dtype=np.float32),
+            y=self.world_height,
+            vx=np.random.uniform(-self.shape, self.shape, n),
+            vy=0,
+            hue=hue,
+            jitter=self.jitters[np.random.randint(0, Gravity.JITTERS, n)],
+        )
+
+    def _birth_particles(self):
+        births = self._births()
+        if births:
+            self._add_particles(births, x=self.world_width / 2, hue=np.random.random(births))
 
     def step(self, dt: float):
         super().step(dt)
         self._birth_particles()
 
-        for i, elt in enumerate(self.particles):
-            elt.x = elt.x + elt.vx
-
-            if elt.x > self.world_width:
-                elt.x = self.world_width - (elt.x - self.world_width)
-                elt.vx = -elt.vx
-            elif elt.x < 0:
-                elt.x = -elt.x
-                elt.vx = -elt.vx
+        p = self.particles
+        n = p.count
+        x, y, vx, vy = p.x[:n], p.y[:n], p.vx[:n], p.vy[:n]
 
-            # This one looks fluttery
-            # elt.vy = elt.vy + 0.5 * -9.8 * (dt ** 2) # -9.8 m/s^2
+        x += vx
+        # Reflect off the walls
+        over = x > self.world_width
+        x[over] = 2 * self.world_width - x[over]
+        under = x < 0
+        x[under] = -x[under]
+        vx[over | under] *= -1
 
-            # It approximates to this: with g = 0.08
-            elt.vy += dt * self.gravitational_constant
+        # This one looks fluttery
+        # elt.vy = elt.vy + 0.5 * -9.8 * (dt ** 2) # -9.8 m/s^2
 
-            # elt.vy = elt.vy + (-1.62 * dt) # Moon gravity
-            # elt.vy = elt.vy + (-0.08 * dt) # Moon gravity
-            elt.y = elt.y + (elt.vy * dt * self.jitters[i % Gravity.JITTERS])
-        self.particles = set(filter(lambda x: x.y >= 0, self.particles))
-        return self._render()
+        # It approximates to this: with g = 0.08
+        vy += dt * self.gravitational_constant
 
-    def _render(self) -> Image.Image:
-        img = np.zeros((self.matrix_height, self.matrix_width, 3), dtype=np.uint8)
-        for elt in self.particles:
+        # elt.vy = elt.vy + (-1.62 * dt) # Moon gravity
+        # elt.vy = elt.vy + (-0.08 * dt) # Moon gravity
+        y += vy * dt * p.jitter[:n]
 
-            render_y = round(self.matrix_scale * elt.y)
-            render_x = round(self.matrix_scale * elt.x)
+        p.remove(y < 0)
+        return self._render()
 
-            if 0 <= render_y < self.matrix_height and 0 <= render_x < self.matrix_width:
-                rgb = elt.rgb
-                img[render_y, render_x, 0] = rgb[0]
-                img[render_y, render_x, 1] = rgb[1]
-                img[render_y, render_x, 2] = rgb[2]
-            # Else, skip it
-        # Return the vertical flip, origin at the top.
-        return Image.fromarray(img).transpose(Image.FLIP_TOP_BOTTOM)
+    def _render(self) -> Frame:
+        img = self.framebuffer.clear().array
+        n = self.particles.count
+        render_x = np.rint(self.matrix_scale * self.particles.x[:n]).astype(np.int32)
+        render_y = np.rint(self.matrix_scale * self.particles.y[:n]).astype(np.int32)
+        # Else, skip it
+        visible = (0 <= render_y) & (render_y < self.matrix_height) & (0 <= render_x) & (render_x < self.matrix_width)
+        # y is up; the framebuffer is flipped, so displays show row 0 at the bottom.
+        img[render_y[visible], render_x[visible]] = self.particles.rgb[:n][visible]
+        return self.framebuffer
 
 
 class GravityKeys(Gravity):
-    def __init__(self, dimensions: Tuple[int, int], meters_per_pixel: float):
-        super().__init__(dimensions, meters_per_pixel)
+    def __init__(self, dimensions: Tuple[int, int], meters_per_pixel: float, population: int = 484):
+        super().__init__(dimensions, meters_per_pixel, population)
 
-    def particle_from_keypress(self, key: Press) -> Elt:
+    def nozzle(self, key: Press) -> Tuple[float, float]:
+        """
+        (launch x in meters, hue) of particles emitted for a held key.
+        """
         key_unit = key.note / NUM_NOTES
-        return Elt(
-            x=self.world_width / 2, y=self.world_height, vx=random.uniform(-self.shape, self.shape), vy=0, hue=key_unit
-        )
+        return (self.world_width / 2, key_unit)
 
     def _birth_particles(self):
-        room = self.population - len(self.particles)
-        if room <= 0:
+        births = self._births()
+        if not births:
             return
-        births = random.randint(0, room) // 10
         for key in self.presses().values():
-            for _ in range(int(births)):
-                self.particles.add(self.particle_from_keypress(key))
+            launch_x, hue = self.nozzle(key)
+            self._add_particles(births, x=launch_x, hue=hue)
 
 
 class GravityKeysMultiNozzle(GravityKeys):
-    def __init__(self, dimensions: Tuple[int, int], meters_per_pixel: float):
-        super().__init__(dimensions, meters_per_pixel)
+    def __init__(self, dimensions: Tuple[int, int], meters_per_pixel: float, population: int = 484):
+        super().__init__(dimensions, meters_per_pixel, population)
 
-    def particle_from_keypress(self, key: Press) -> Elt:
+    def nozzle(self, key: Press) -> Tuple[float, float]:
         key_unit = key.note_index / NUM_NOTES
-        launch_point = key_unit * self.world_width
-        return Elt(x=launch_point, y=self.world_height, vx=random.uniform(-self.shape, self.shape), vy=0, hue=key_unit)
+        return (key_unit * self.world_width, key_unit)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+"""
+Whole-frame Perlin "improved" and simplex noise over NumPy arrays.
+
+These are ports of pnoise3/snoise3 from the noise package (https://github.com/caseman/noise, _perlin.c and _simplex.c)
+using the same permutation and gradient tables and float32 arithmetic, so a frame evaluated here matches the
+per-pixel C calls to within float rounding. Arguments may be arrays of any (broadcastable) shape.
+"""
+
+import logging
+import os
+from typing import Union
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+ArrayLike = Union[float, np.ndarray]
+
+GRAD3 = np.array(
+    [
+        (1, 1, 0), (-1, 1, 0), (1, -1, 0), (-1, -1, 0),
+        (1, 0, 1), (-1, 0, 1), (1, 0, -1), (-1, 0, -1),
+        (0, 1, 1), (0, -1, 1), (0, 1, -1), (0, -1, -1),
+        (1, 0, -1), (-1, 0, -1), (0, -1, 1), (0, 1, 1),
+    ],
+    dtype=np.float32,
+)  # fmt: skip
+# Per-axis columns, so lookups index flat arrays rather than building (..., 3) temporaries
+GRAD3_X, GRAD3_Y, GRAD3_Z = (np.ascontiguousarray(GRAD3[:, axis]) for axis in range(3))
+
+_PERMUTATION = [
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225, 140, 36, 103, 30, 69, 142, 8, 99, 37, 240,
+    21, 10, 23, 190, 6, 148, 247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32, 57, 177, 33, 88,
+    237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175, 74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83,
+    111, 229, 122, 60, 211, 133, 230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54, 65, 25, 63, 161, 1, 216,
+    80, 73, 209, 76, 132, 187, 208, 89, 18, 169, 200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173, 186,
+    3, 64, 52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212, 207, 206, 59, 227, 47, 16, 58, 17,
+    182, 189, 28, 42, 223, 183, 170, 213, 119, 248, 152, 2, 44, 154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9, 129,
+    22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104, 218, 246, 97, 228, 251, 34, 242, 193, 238,
+    210, 144, 12, 191, 179, 162, 241, 81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157, 184,
+    84, 204, 176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93, 222, 114, 67, 29, 24, 72, 243, 141, 128, 195,
+    78, 66, 215, 61, 156, 180,
+]  # fmt: skip
+# Doubled so that PERM[a + b] never needs wrapping, as in the C source.
+PERM = np.array(_PERMUTATION * 2, dtype=np.int32)
+
+DEFAULT_REPEAT = 1024
+
+_F3 = np.float32(1.0 / 3.0)
+_G3 = np.float32(1.0 / 6.0)
+
+
+def _fade(t: np.ndarray) -> np.ndarray:
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def _lerp(t: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a + t * (b - a)
+
+
+def _grad(h: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    h = h & 15
+    return x * GRAD3_X[h] + y * GRAD3_Y[h] + z * GRAD3_Z[h]
+
+
+def _perlin_octave(x: np.ndarray, y: np.ndarray, z: np.ndarray, repeatx: int, repeaty: int, repeatz: int) -> np.ndarray:
+    i = np.floor(np.fmod(x, np.float32(repeatx))).astype(np.int32)
+    j = np.floor(np.fmod(y, np.float32(repeaty))).astype(np.int32)
+    k = np.floor(np.fmod(z, np.float32(repeatz))).astype(np.int32)
+    ii = np.fmod(i + 1, repeatx) & 255
+    jj = np.fmod(j + 1, repeaty) & 255
+    kk = np.fmod(k + 1, repeatz) & 255
+    i &= 255
+    j &= 255
+    k &= 255
+
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    z = z - np.floor(z)
+    fx = _fade(x)
+    fy = _fade(y)
+    fz = _fade(z)
+    x1 = x - 1
+    y1 = y - 1
+    z1 = z - 1
+
+    A = PERM[i]
+    AA = PERM[A + j]
+    AB = PERM[A + jj]
+    B = PERM[ii]
+    BA = PERM[B + j]
+    BB = PERM[B + jj]
+
+    return _lerp(
+        fz,
+        _lerp(
+            fy,
+            _lerp(fx, _grad(PERM[AA + k], x, y, z), _grad(PERM[BA + k], x1, y, z)),
+            _lerp(fx, _grad(PERM[AB + k], x, y1, z), _grad(PERM[BB + k], x1, y1, z)),
+        ),
+        _lerp(
+            fy,
+            _lerp(fx, _grad(PERM[AA + kk], x, y, z1), _grad(PERM[BA + kk], x1, y, z1)),
+            _lerp(fx, _grad(PERM[AB + kk], x, y1, z1), _grad(PERM[BB + kk], x1, y1, z1)),
+        ),
+    )
+
+
+def _simplex_octave(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    s = (x + y + z) * _F3
+    i = np.floor(x + s)
+    j = np.floor(y + s)
+    k = np.floor(z + s)
+    t = (i + j + k) * _G3
+
+    x0 = x - (i - t)
+    y0 = y - (j - t)
+    z0 = z - (k - t)
+
+    # Which of the six tetrahedra of the skewed cube we're in, following the nested ifs in _simplex.c:noise3
+    xy = x0 >= y0
+    yz = y0 >= z0
+    xz = x0 >= z0
+    xyz = xy & yz  # o1 (1,0,0), o2 (1,1,0)
+    xzy = xy & ~yz & xz  # o1 (1,0,0), o2 (1,0,1)
+    zxy = xy & ~yz & ~xz  # o1 (0,0,1), o2 (1,0,1)
+    zyx = ~xy & ~yz  # o1 (0,0,1), o2 (0,1,1)
+    yzx = ~xy & yz & ~xz  # o1 (0,1,0), o2 (0,1,1)
+    yxz = ~xy & yz & xz  # o1 (0,1,0), o2 (1,1,0)
+    i1 = (xyz | xzy).astype(np.int32)
+    j1 = (yzx | yxz).astype(np.int32)
+    k1 = (zxy | zyx).astype(np.int32)
+    i2 = (xyz | xzy | zxy | yxz).astype(np.int32)
+    j2 = (xyz | zyx | yzx | yxz).astype(np.int32)
+    k2 = (xzy | zxy | zyx | yzx).astype(np.int32)
+
+    I = i.astype(np.int32) & 255
+    J = j.astype(np.int32) & 255
+    K = k.astype(np.int32) & 255
+    offsets = (
+        (0, 0, 0, x0, y0, z0),
+        (i1, j1, k1, x0 - i1 + _G3, y0 - j1 + _G3, z0 - k1 + _G3),
+        (i2, j2, k2, x0 - i2 + 2 * _G3, y0 - j2 + 2 * _G3, z0 - k2 + 2 * _G3),
+        (1, 1, 1, x0 - 1 + 3 * _G3, y0 - 1 + 3 * _G3, z0 - 1 + 3 * _G3),
+    )
+    total = np.zeros(np.broadcast(x, y, z).shape, dtype=np.float32)
+    for (oi, oj, ok, px, py, pz) in offsets:
+        g = PERM[I + oi + PERM[J + oj + PERM[K + ok]]] % 12
+        f = 0.6 - px * px - py * py - pz * pz
+        contribution = f * f * f * f * (px * GRAD3_X[g] + py * GRAD3_Y[g] + pz * GRAD3_Z[g])
+        total += np.where(f > 0, contribution, 0)
+    return total * 32
+
+
+def _as_float32(x: ArrayLike) -> np.ndarray:
+    return np.asarray(x, dtype=np.float32)
+
+
+def pnoise3_array(
+    x: ArrayLike, y: ArrayLike, z: ArrayLike, octaves: int = 1, persistence: float = 0.5, lacunarity: float = 2.0
+) -> np.ndarray:
+    """
+    Vectorized noise.pnoise3, with the same defaults (repeat 1024, base 0).
+    """
+    if octaves < 1:
+        raise ValueError("Expected octaves value > 0")
+    x, y, z = _as_float32(x), _as_float32(y), _as_float32(z)
+    if octaves == 1:
+        return _perlin_octave(x, y, z, DEFAULT_REPEAT, DEFAULT_REPEAT, DEFAULT_REPEAT)
+
+    freq = np.float32(1.0)
+    amp = np.float32(1.0)
+    maximum = np.float32(0.0)
+    total = np.zeros(np.broadcast(x, y, z).shape, dtype=np.float32)
+    for _ in range(octaves):
+        repeat = int(DEFAULT_REPEAT * freq)
+        total += _perlin_octave(x * freq, y * freq, z * freq, repeat, repeat, repeat) * amp
+        maximum += amp
+        freq *= np.float32(lacunarity)
+        amp *= np.float32(persistence)
+    return total / maximum
+
+
+def snoise3_array(
+    x: ArrayLike, y: ArrayLike, z: ArrayLike, octaves: int = 1, persistence: float = 0.5, lacunarity: float = 2.0
+) -> np.ndarray:
+    """
+    Vectorized noise.snoise3.
+    """
+    if octaves < 1:
+        raise ValueError("Expected octaves value > 0")
+    x, y, z = _as_float32(x), _as_float32(y), _as_float32(z)
+    total = _simplex_octave(x, y, z)
+    freq = np.float32(1.0)
+    amp = np.float32(1.0)
+    maximum = np.float32(1.0)
+    for _ in range(1, octaves):
+        freq *= np.float32(lacunarity)
+        amp *= np.float32(persistence)
+        maximum += amp
+        total += _simplex_octave(x * freq, y * freq, z * freq) * amp
+    return total / maximum
+
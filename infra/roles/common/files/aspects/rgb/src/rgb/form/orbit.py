@@ -2,11 +2,10 @@
 
 import random
 import json
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 import math
 from random import randrange
 import time
-from PIL import Image
 from dataclasses import dataclass
 import colorsys
 import logging
@@ -17,6 +16,7 @@ import numpy as np
 
 
 from rgb.form.baseform import BaseForm
+from rgb.framebuffer import Frame
 from rgb.messages import Dial
 from rgb.utilities import clamp
 
@@ -70,8 +70,95 @@ class Body:
     def rgb(self) -> Tuple[np.uint8,np.uint8,np.uint8]:
         return (np.uint8(self.color[0]),np.uint8(self.color[1]),np.uint8(self.color[2]))
     
+ASTEROID_BELT_INNER_METERS = 1.65e11
+ASTEROID_BELT_OUTER_METERS = 2.35e11
+ASTEROID_COLOR = (96, 96, 96)
+
+
+def circular_orbit(name: str, color: Tuple[int, int, int], center: Body, radius: float, theta: float, mass: float) -> Body:
+    """
+    A body on a counter-clockwise circular orbit of center, the same sense as Earth and Mars above.
+    """
+    v = math.sqrt(GRAVITATIONAL_CONSTANT * center.mass / radius)
+    return Body(
+        name=name,
+        color=color,
+        x=center.x + radius * math.cos(theta),
+        y=center.y + radius * math.sin(theta),
+        vx=center.vx - v * math.sin(theta),
+        vy=center.vy + v * math.cos(theta),
+        mass=mass,
+    )
+
+
+class NBody:
+    """
+    Array-backed gravitational N-body system.
+
+    Bodies with mass attract every body; massless bodies (asteroids) are test particles that are attracted but exert no
+    force, so the pairwise computation is (all bodies x attractors) rather than all pairs.
+    """
+
+    INTEGRATORS = ("euler", "leapfrog", "verlet")
+
+    def __init__(self, bodies: List[Body], integrator: str = "verlet", softening_m: float = 1e6):
+        if integrator not in NBody.INTEGRATORS:
+            raise ValueError(f"Unknown integrator {integrator}, expected one of {NBody.INTEGRATORS}")
+        self.integrator = integrator
+        self.softening_squared = softening_m ** 2
+        self.position = np.array([(b.x, b.y) for b in bodies], dtype=np.float64)
+        self.velocity = np.array([(b.vx, b.vy) for b in bodies], dtype=np.float64)
+        self.mass = np.array([b.mass for b in bodies], dtype=np.float64)
+        self.rgb = np.array([b.rgb for b in bodies], dtype=np.uint8)
+
+        self.attractors = np.flatnonzero(self.mass > 0)
+        self.attractor_gm = GRAVITATIONAL_CONSTANT * self.mass[self.attractors]
+        # (n, m) mask of each attractor's interaction with itself
+        self.self_interaction = np.arange(len(bodies))[:, np.newaxis] == self.attractors[np.newaxis, :]
+        self._acceleration: Optional[np.ndarray] = None
+
+    def acceleration(self, position: np.ndarray) -> np.ndarray:
+        d = position[np.newaxis, self.attractors, :] - position[:, np.newaxis, :]  # (n, m, 2), toward the attractor
+        r_squared = np.einsum("ijk,ijk->ij", d, d) + self.softening_squared
+        magnitude = self.attractor_gm / (r_squared * np.sqrt(r_squared))
+        magnitude[self.self_interaction] = 0.0
+        return np.einsum("ijk,ij->ik", d, magnitude)
+
+    def advance(self, h: float):
+        if self.integrator == "euler":
+            # Semi-implicit Euler; the original Orbit update, but with all bodies seeing the same positions.
+            self.velocity += self.acceleration(self.position) * h
+            self.position += self.velocity * h
+        elif self.integrator == "leapfrog":
+            # Drift-kick-drift
+            self.position += self.velocity * (h / 2)
+            self.velocity += self.acceleration(self.position) * h
+            self.position += self.velocity * (h / 2)
+        else:
+            # Velocity Verlet (kick-drift-kick), reusing the previous step's closing acceleration
+            if self._acceleration is None:
+                self._acceleration = self.acceleration(self.position)
+            self.velocity += self._acceleration * (h / 2)
+            self.position += self.velocity * h
+            self._acceleration = self.acceleration(self.position)
+            self.velocity += self._acceleration * (h / 2)
+
+
 class Orbit(BaseForm):
-    def __init__(self, dimensions: Tuple[int, int], fast_forward_scale: float):
+
+    # Longest simulated interval per integration step. Earth's orbit is ~1460 steps at this size.
+    MAX_SUBSTEP_S = 60 * 60 * 6
+    # Bound on the work per frame; beyond this, steps get longer rather than more numerous.
+    MAX_SUBSTEPS = 64
+
+    def __init__(
+        self,
+        dimensions: Tuple[int, int],
+        fast_forward_scale: float,
+        integrator: str = "verlet",
+        asteroids: int = 0,
+        moon: bool = False,
+    ):
         self.fast_forward_scale = fast_forward_scale
         (self.matrix_width, self.matrix_height) = dimensions
         h_to_w_ratio = (self.matrix_height / self.matrix_width) # h:w ratio
@@ -80,14 +167,24 @@ class Orbit(BaseForm):
         sun = Body(name="Sun", color=(255,255,0), x=self.world_width / 2, y = self.world_height / 4, vx = 0, vy = 0, mass=SUN_MASS_KILOGRAMS)
         earth = Body(name="Earth", color=(64,64,255), x=self.world_width / 2, y=sun.y - EARTH_PERIHELION_METERS, vx=EARTH_PERIHELION_VELOCITY_MS, vy=0, mass = EARTH_MASS_KILOGRAMS)
         mars = Body(name="Mars", color=(255,64,0), x=self.world_width / 2, y=sun.y + MARS_PERIHELION_METERS, vx=-MARS_PERIHELION_VELOCITY_MS, vy=0, mass = MARS_MASS_KILOGRAMS)
-        # moon = Body(name="Moon", color=(180,180,180), x=self.world_width / 2, y = earth.y + MOON_PERIGEE_METERS, vx = earth.vx + MOON_PERIGEE_VELOCITY_MS, vy = 0, mass=MOON_MASS_KILOGRAMS)
-        self.bodies: Set[Body] = {
-            earth,
-            mars,
-            # moon,
-            sun,
-        }
-                 
+        # Asteroids first, so the planets are drawn over them.
+        self.bodies: List[Body] = [
+            circular_orbit(
+                name=f"Asteroid {i}",
+                color=ASTEROID_COLOR,
+                center=sun,
+                radius=random.uniform(ASTEROID_BELT_INNER_METERS, ASTEROID_BELT_OUTER_METERS),
+                theta=random.uniform(0, 2 * math.pi),
+                mass=0.0,
+            )
+            for i in range(asteroids)
+        ]
+        if moon:
+            self.bodies.append(Body(name="Moon", color=(180,180,180), x=earth.x, y = earth.y - MOON_PERIGEE_METERS, vx = earth.vx + MOON_PERIGEE_VELOCITY_MS, vy = 0, mass=MOON_MASS_KILOGRAMS))
+        self.bodies.extend([earth, mars, sun])
+        self.system = NBody(self.bodies, integrator=integrator)
+        self._logged_substep_cap = False
+
         self.handlers = {
             "Dial": {
                 0: lambda state: self.adjust_ffw(state),
@@ -112,45 +209,25 @@ class Orbit(BaseForm):
         # E.g. 1:4 would be 0.25
         return self.matrix_height / float(self.world_height)
 
-    def _render(self) -> Image.Image:
-        img = np.zeros((self.matrix_height, self.matrix_width, 3), dtype=np.uint8)
-        for a in self.bodies:
-            
-            render_x = round(self.matrix_scale * a.x)
-            render_y = round(self.matrix_scale * a.y)
-            if 0 <= render_y < self.matrix_height and \
-                0 <= render_x < self.matrix_width:
-                rgb = a.rgb
-                img[render_y,render_x,0] = rgb[0]
-                img[render_y,render_x,1] = rgb[1]
-                img[render_y,render_x,2] = rgb[2]
-            # Else, skip it
-        
-        # Return the vertical flip, origin at the top.
-        return Image.fromarray(img) #.transpose(Image.FLIP_TOP_BOTTOM)
-
-    def step(self, dt) -> Image.Image:
-        for a in self.bodies:
-            # log.debug(a)
-            fxs = []
-            fys = []
-            for b in self.bodies:
-                if a == b:
-                    continue
-                distance_squared = (a.x - b.x) ** 2 + (a.y - b.y) ** 2
-                f = GRAVITATIONAL_CONSTANT * a.mass * b.mass / distance_squared
-                theta = math.atan2(b.y - a.y, b.x - a.x)
-                fxs.append(math.cos(theta) * f)
-                fys.append(math.sin(theta) * f)
-            fx = sum(fxs)
-            fy = sum(fys)
-            ax = fx / a.mass
-            ay = fy / a.mass
-            actual_elapsed_time = dt * self.fast_forward_scale
-            a.vx += ax * actual_elapsed_time
-            a.vy += ay * actual_elapsed_time
-            a.x += a.vx * actual_elapsed_time
-            a.y += a.vy * actual_elapsed_time
+    def _render(self) -> Frame:
+        img = self.framebuffer.clear().array
+        render = np.rint(self.matrix_scale * self.system.position).astype(np.int64)
+        render_x, render_y = render[:, 0], render[:, 1]
+        # Else, skip it
+        visible = (0 <= render_y) & (render_y < self.matrix_height) & (0 <= render_x) & (render_x < self.matrix_width)
+        img[render_y[visible], render_x[visible]] = self.system.rgb[visible]
+
+        return self.framebuffer
+
+    def step(self, dt) -> Frame:
+        actual_elapsed_time = dt * self.fast_forward_scale
+        substeps = min(Orbit.MAX_SUBSTEPS, max(1, math.ceil(actual_elapsed_time / Orbit.MAX_SUBSTEP_S)))
+        if actual_elapsed_time > Orbit.MAX_SUBSTEPS * Orbit.MAX_SUBSTEP_S and not self._logged_substep_cap:
+            log.debug(f"Substeps capped at {Orbit.MAX_SUBSTEPS}, so each is longer than {Orbit.MAX_SUBSTEP_S}s")
+            self._logged_substep_cap = True
+        h = actual_elapsed_time / substeps
+        for _ in range(substeps):
+            self.system.advance(h)
 
         return self._render()
 
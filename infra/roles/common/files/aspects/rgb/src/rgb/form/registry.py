@@ -0,0 +1,134 @@
+import importlib
+import logging
+import os
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from rgb.form.baseform import BaseForm
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+FormFactory = Callable[[], BaseForm]
+
+
+class LazyForm:
+    """
+    A factory for the form class at path (e.g. "rgb.form.voronoi_diagram.VoronoiDiagram"), importing its module only
+    when first called, so that startup doesn't pay for the modules (and their dependencies, such as scipy) of forms
+    not yet shown.
+    """
+
+    def __init__(self, path: str, *args, **kwargs):
+        (self.module, _, self.__name__) = path.rpartition(".")
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self) -> BaseForm:
+        return getattr(importlib.import_module(self.module), self.__name__)(*self.args, **self.kwargs)
+
+    def __repr__(self) -> str:
+        return f"LazyForm({self.module}.{self.__name__})"
+
+
+def factory_name(factory: FormFactory) -> str:
+    # functools.partial(SomeForm, dimensions) -> "SomeForm"
+    return getattr(getattr(factory, "func", factory), "__name__", repr(factory))
+
+
+class FormRegistry:
+    """
+    The forms a ControlLoop cycles through, as factories: each is constructed the first time it's selected, so startup
+    only pays for the first.
+
+    Constructed forms are kept, most recently used last, up to max_live of them and (if memory_budget_bytes is given)
+    as much memory as they allocated while being constructed; beyond that, the least recently used are cleaned up and
+    dropped, to be constructed afresh if selected again. The form just selected is never dropped. Measuring memory
+    traces allocations during construction, so is only done with a budget.
+    """
+
+    def __init__(
+        self,
+        factories: Sequence[FormFactory],
+        max_live: Optional[int] = 4,
+        memory_budget_bytes: Optional[int] = None,
+    ):
+        if not factories:
+            raise ValueError("FormRegistry needs at least one form.")
+        self.factories = list(factories)
+        self.max_live = max_live
+        self.memory_budget_bytes = memory_budget_bytes
+        self.live: "OrderedDict[int, BaseForm]" = OrderedDict()
+        self.live_bytes: Dict[int, int] = {}
+        # Seconds each form took to construct, most recently, by index
+        self.construction_s: Dict[int, float] = {}
+        self.constructions = 0
+        self.evictions = 0
+
+    @staticmethod
+    def factory(factories: Sequence[FormFactory]) -> "FormRegistry":
+        # Limits from FORM_CACHE_SIZE (forms) and FORM_MEMORY_BUDGET_MB
+        budget_mb = os.environ.get("FORM_MEMORY_BUDGET_MB")
+        return FormRegistry(
+            factories,
+            max_live=int(os.environ.get("FORM_CACHE_SIZE", 4)),
+            memory_budget_bytes=int(float(budget_mb) * 1e6) if budget_mb else None,
+        )
+
+    @staticmethod
+    def of(forms: Iterable[BaseForm]) -> "FormRegistry":
+        # Already constructed forms, all kept
+        return FormRegistry([lambda form=form: form for form in forms], max_live=None)
+
+    def __len__(self) -> int:
+        return len(self.factories)
+
+    def name(self, index: int) -> str:
+        form = self.live.get(index)
+        return type(form).__name__ if form is not None else factory_name(self.factories[index])
+
+    def _construct(self, index: int) -> BaseForm:
+        measure = self.memory_budget_bytes is not None
+        started_tracing = measure and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0] if measure else 0
+        t = time.perf_counter()
+        try:
+            form = self.factories[index]()
+        finally:
+            elapsed = time.perf_counter() - t
+            allocated = tracemalloc.get_traced_memory()[0] - before if measure else 0
+            if started_tracing:
+                tracemalloc.stop()
+        self.construction_s[index] = elapsed
+        self.live_bytes[index] = max(0, allocated)
+        self.constructions += 1
+        log.info(
+            f"Constructed {type(form).__name__} in {elapsed * 1000:.0f}ms"
+            + (f", {allocated / 1e6:.1f}MB" if measure else "")
+        )
+        return form
+
+    def get(self, index: int) -> BaseForm:
+        form = self.live.get(index)
+        if form is None:
+            form = self.live[index] = self._construct(index)
+        self.live.move_to_end(index)
+        self._evict()
+        return form
+
+    def _over_budget(self) -> bool:
+        if self.max_live is not None and len(self.live) > self.max_live:
+            return True
+        return self.memory_budget_bytes is not None and sum(self.live_bytes.values()) > self.memory_budget_bytes
+
+    def _evict(self):
+        while len(self.live) > 1 and self._over_budget():
+            (index, form) = self.live.popitem(last=False)
+            self.live_bytes.pop(index, None)
+            form.cleanup()
+            self.evictions += 1
+            log.debug(f"Dropped {type(form).__name__} from the live forms")
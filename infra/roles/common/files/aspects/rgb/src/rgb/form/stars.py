@@ -1,73 +1,53 @@
 #!/usr/bin/env python
 
-import random
-import json
-from typing import List, Set, Tuple
-import math
-from random import randrange
-import time
+from typing import Tuple
+
 import numpy as np
-from dataclasses import dataclass
-import colorsys
-from typing import Dict
-from PIL import Image
 from rgb.form.baseform import BaseForm
+from rgb.utilities import hsv_to_rgb_array
 
 
-@dataclass
-class Elt:
-    def __init__(self):
-        self.x: float = random.random()
-        self.y: float = random.random()
-        self.hue: float = random.random()
-        self.born: float = time.time()
-        self.lifespan: float = 10 * random.random()
-    
-    def __str__(self):
-        return json.dumps({key: getattr(self, key) for key in ["x","y","hue","born","lifespan","age", "alive", "luminance"]})
-
-    def __hash__(self):
-        return hash((self.x, self.y, self.hue))
-    
-    def __eq__(self, other):
-        return hash(self) == hash(other)
+class Stars(BaseForm):
+    """
+    population stars, each brightening from black to full over its lifespan and then replaced by a new one somewhere
+    else. Kept as arrays indexed by star, so a step is a handful of vector operations however many there are.
+    """
 
-    @property
-    def age(self) -> float:
-        return time.time() - self.born
-    
-    @property
-    def alive(self) -> bool:
-        return self.age <= self.lifespan
+    MAX_LIFESPAN_S = 10.0
 
-    @property
-    def luminance(self):
-        return self.age / self.lifespan
-        #sqr = self.age ** 2
-        #t = self.age / self.lifespan
-        #res = sqr / (2.0 * (sqr - t) + 1.0)
-        #return min(1.0, res * 2)
-        
-    
-class Stars(BaseForm):
-    def __init__(self, dimensions: Tuple[int, int]):
+    def __init__(self, dimensions: Tuple[int, int], population: int = 256):
         super().__init__(dimensions)
-        self.population = 256
-        self.elts: Set[Elt] = {Elt() for _ in range(self.population)}
-        
+        self.population = population
+        # Seconds since the form started, advanced by each step's dt
+        self.t = 0.0
+        self.x = np.zeros(population)
+        self.y = np.zeros(population)
+        self.born = np.zeros(population)
+        self.lifespan = np.ones(population)
+        # Full-brightness color, fixed for a star's life
+        self.rgb = np.zeros((population, 3))
+        self._spawn(np.arange(population))
+
+    def _spawn(self, indices: np.ndarray):
+        n = len(indices)
+        self.x[indices] = np.random.random(n)
+        self.y[indices] = np.random.random(n)
+        self.born[indices] = self.t
+        # (0, MAX_LIFESPAN_S], never zero, as luminance divides by it
+        self.lifespan[indices] = Stars.MAX_LIFESPAN_S * (1.0 - np.random.random(n))
+        self.rgb[indices] = hsv_to_rgb_array(np.random.random(n), 1.0, 1.0, dtype=np.float64)
+
     def step(self, dt: float):
-        self.elts = set(filter(lambda x: x.alive, self.elts))
-        self.elts.update([Elt() for _ in range(self.population - len(self.elts))])
-        return self._render()      
-        
+        self.t += dt
+        self._spawn(np.flatnonzero(self.t - self.born > self.lifespan))
+        return self._render()
+
     def _render(self):
-        img = np.zeros((self.matrix_height, self.matrix_width, 3), dtype=np.uint8)
-        for elt in self.elts:
-            if elt.alive:
-                rgb = colorsys.hsv_to_rgb(elt.hue, 1.0, elt.luminance) 
-                render_y = round(self.matrix_height * elt.y)
-                render_x = round(self.matrix_width * elt.x)
-                if 0 <= render_y < self.matrix_height and \
-                    0 <= render_x < self.matrix_width:
-                    img[render_y,render_x,:] = (np.uint8(255 * rgb[0]), np.uint8(255 * rgb[1]), np.uint8(255 * rgb[2]))
-        return Image.fromarray(img)
\ No newline at end of file
+        img = self.framebuffer.clear().array
+        luminance = (self.t - self.born) / self.lifespan
+        xs = np.rint(self.matrix_width * self.x).astype(np.intp)
+        ys = np.rint(self.matrix_height * self.y).astype(np.intp)
+        # Stars that round to the far edge are off the panel
+        visible = (xs < self.matrix_width) & (ys < self.matrix_height)
+        img[ys[visible], xs[visible]] = (255 * luminance[visible, np.newaxis] * self.rgb[visible]).astype(np.uint8)
+        return self.framebuffer
@@ -5,16 +5,20 @@ import logging
 import os
 import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, Tuple, Union
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
 from rgb.constants import NUM_NOTES, NUM_PIANO_KEYBOARD_KEYS
 from rgb.form.baseform import BaseForm
+from rgb.form.compositor import Compositor
+from rgb.form.glyphatlas import ATLAS, GlyphAtlas
 from rgb.form.keyawareform import KeyAwareForm, Press
-from rgb.form.transitions import transition_ease_out_exponential
+from rgb.form.transitions import transition_ease_out_exponential, transition_ease_out_exponential_array
+from rgb.framebuffer import Frame
 from rgb.parameter_tuner import ParameterTuner
-from rgb.utilities import get_dictionary, get_font, modulate_alpha
+from rgb.utilities import get_dictionary, hsv_to_rgb_array
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
@@ -37,16 +41,82 @@ def compute_envelope(dt: float, dt_released: Optional[float], attack_time_s: flo
         return decay * x
 
 
+def compute_envelopes(
+    dt: np.ndarray, dt_released: np.ndarray, attack_time_s: float, release_time_s: float
+) -> np.ndarray:
+    # compute_envelope over arrays, dt_released being nan for presses that are still held
+    x = transition_ease_out_exponential_array(dt / attack_time_s, exponent=6) if attack_time_s != 0 else 1.0
+    if release_time_s != 0:
+        decay = 1 - transition_ease_out_exponential_array(np.nan_to_num(dt_released) / release_time_s, exponent=5)
+    else:
+        decay = 0.0
+    return np.where(np.isnan(dt_released), 1.0, decay) * x
+
+
+@dataclass(frozen=True)
+class PressBatch:
+    """
+    Presses as parallel arrays, with the same note and t attributes as a Press, so that hue calculations written against
+    a Press evaluate every press of a frame at once.
+    """
+
+    presses: Tuple[Press, ...]
+    note: np.ndarray
+    t: np.ndarray
+    # nan while held
+    t_released: np.ndarray
+
+    @staticmethod
+    def of(presses: Iterable[Press]) -> "PressBatch":
+        presses = tuple(presses)
+        return PressBatch(
+            presses=presses,
+            note=np.array([p.note for p in presses], dtype=np.int64),
+            t=np.array([p.t for p in presses], dtype=np.float64),
+            t_released=np.array([np.nan if p._t_released is None else p._t_released for p in presses], dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.presses)
+
+
+def with_alpha(rgb: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    # (n, 3) float [0,1] RGB and (n,) [0,1] alpha -> (n, 4) [0,255], truncating like int(255 * x)
+    rgba = np.empty((len(rgb), 4), dtype=np.int64)
+    rgba[:, :3] = 255 * np.asarray(rgb, dtype=np.float64)
+    rgba[:, 3] = 255 * np.broadcast_to(alpha, (len(rgb),))
+    return rgba
+
+
+@lru_cache(maxsize=32)
+def wave_profile(max_wave_width: int, num: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (offsets, scales) of num wave rings spread over max_wave_width. These only depend on the dials, so are shared by
+    every press and frame until a dial moves.
+    """
+    offsets = np.linspace(start=0, stop=max_wave_width, num=num, endpoint=False)
+    scales = ParameterTuner.exponential_scale(offsets / max(max_wave_width, 1), 0.5, 1.0, 0.0)
+    offsets.setflags(write=False)
+    scales.setflags(write=False)
+    return (offsets, scales)
+
+
 class SimpleSustainObject(KeyAwareForm):
 
     # Hues stepped from 0-1 in 12 steps, providing clear (255,127,0)-typed colors
     PIECEWISE_HUES = np.linspace(0, 1, num=NUM_NOTES, endpoint=False)
+    # ... and their RGB, [0,1], as colorsys computes them
+    PIECEWISE_RGB = np.array([colorsys.hsv_to_rgb(hue, 1.0, 1.0) for hue in PIECEWISE_HUES])
 
     MAX_ATTACK_TIME_S = 0.5
     MAX_RELEASE_TIME_S = 3.0
 
     def __init__(self, dimensions: Tuple[int, int]):
         super().__init__(dimensions)
+        self.compositor = Compositor(dimensions)
+        # Timestamp of the frame being drawn, shared by every shape in it
+        self.frame_time = time.time()
+        self._frame_colors: Dict[Press, Tuple[int, int, int, int]] = {}
 
     """
     Size / Growth
@@ -109,21 +179,35 @@ class SimpleSustainObject(KeyAwareForm):
         note_index = (p.note + int(self.base_hue * NUM_NOTES)) % NUM_NOTES
         return SimpleSustainObject.PIECEWISE_HUES[note_index]
 
-    def calculate_color(self, p: Press) -> Tuple[int, int, int, int]:
+    @staticmethod
+    def hues_to_rgb(hues: np.ndarray) -> np.ndarray:
+        # Fully saturated, full value RGB, [0,1]. PIECEWISE_HUES (the default) are looked up in PIECEWISE_RGB.
+        indices = np.minimum(np.searchsorted(SimpleSustainObject.PIECEWISE_HUES, hues), NUM_NOTES - 1)
+        if np.array_equal(SimpleSustainObject.PIECEWISE_HUES[indices], hues):
+            return SimpleSustainObject.PIECEWISE_RGB[indices]
+        return hsv_to_rgb_array(hues, 1.0, 1.0, dtype=np.float64)
+
+    def calculate_colors(self, batch: PressBatch, now: float) -> np.ndarray:
         """
-        Default color calculation. Returns an RGBA [0,255] value based on the note value.
+        Default color calculation, for every press at once. Returns (n, 4) RGBA [0,255] values based on the note value.
         """
-        dt = time.time() - p.t
-        dt_released = time.time() - p._t_released if p._t_released else None
-        alpha = compute_envelope(dt, dt_released, self.attack_time_s, self.release_time_s)
-        hue = self.calculate_hue(p)
-        rgb = colorsys.hsv_to_rgb(hue, 1.0, 1.0)
-        return (
-            int(255 * rgb[0]),
-            int(255 * rgb[1]),
-            int(255 * rgb[2]),
-            int(255 * alpha),
-        )
+        alpha = compute_envelopes(now - batch.t, now - batch.t_released, self.attack_time_s, self.release_time_s)
+        hues = np.broadcast_to(self.calculate_hue(batch), (len(batch),))
+        return with_alpha(SimpleSustainObject.hues_to_rgb(hues), alpha)
+
+    def evaluate_colors(self, presses: Iterable[Press], now: float):
+        batch = PressBatch.of(presses)
+        colors = self.calculate_colors(batch, now) if len(batch) else []
+        self._frame_colors = {p: tuple(int(c) for c in color) for p, color in zip(batch.presses, colors)}
+
+    def calculate_color(self, p: Press) -> Tuple[int, ...]:
+        """
+        RGBA [0,255] of a press in the current frame, as evaluated for every press by evaluate_colors.
+        """
+        color = self._frame_colors.get(p)
+        if color is None:
+            color = tuple(int(c) for c in self.calculate_colors(PressBatch.of((p,)), time.time())[0])
+        return color
 
     """
     Position
@@ -142,23 +226,21 @@ class SimpleSustainObject(KeyAwareForm):
             int(fractional_y * self.matrix_height),
         )
 
-    def step(self, dt: float) -> Union[Image.Image, np.ndarray]:
+    def step(self, dt: float) -> Frame:
         super().step(dt)  # Ignore super's return value, it's not relevant.
-        img = Image.new("RGB", (self.matrix_width, self.matrix_height), (0, 0, 0))
-
-        # For whatever reason, to do transparent shapes, we use RGBA draw_context over RGB image
-        # https://stackoverflow.com/a/21768191
-        draw_context = ImageDraw.Draw(img, "RGBA")
-        now = time.time()
-        for press in self.presses().values():
-            r = self.calculate_radius(press, current_time=now)
-            self.draw_shape(draw_context, press, r)
-        del draw_context
-
-        return img
+        self.frame_time = time.time()
+        presses = tuple(self.presses().values())
+        # Envelopes, hues and colors for all presses in one pass, before any are drawn
+        self.evaluate_colors(presses, self.frame_time)
+        self.compositor.clear()
+        for press in presses:
+            r = self.calculate_radius(press, current_time=self.frame_time)
+            self.draw_shape(self.compositor, press, r)
+        self.compositor.to_array(out=self.framebuffer.array)
+        return self.framebuffer
 
     @abstractmethod
-    def draw_shape(self, draw_context, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         pass
 
 
@@ -168,11 +250,11 @@ class VerticalNotes(SimpleSustainObject):
         # 0 until 1 before matrix_width, num keys + 1 steps (because we index [i,i+1])
         self.x_coords = np.linspace(0, self.matrix_width, NUM_NOTES + 1, dtype=np.uint8)
 
-    def draw_shape(self, draw_context: ImageDraw.ImageDraw, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         color = self.calculate_color(press)
-        lo = self.x_coords[press.note % NUM_NOTES]
-        hi = self.x_coords[press.note % NUM_NOTES + 1] - 1
-        draw_context.rectangle((lo, 0, hi, self.matrix_height), fill=color)
+        lo = int(self.x_coords[press.note % NUM_NOTES])
+        hi = int(self.x_coords[press.note % NUM_NOTES + 1]) - 1
+        compositor.fill_columns(lo, hi, color)
 
 
 class WaveSustainObject(SimpleSustainObject, ABC):
@@ -192,9 +274,8 @@ class WaveSustainObject(SimpleSustainObject, ABC):
         # Wave Release time is a fraction of the shape's attack time
         return BaseForm.dials(5) * self.release_time_s
 
-    def wave_scale(self, i, dt: float, dt_released: Optional[float]):
-        compute_envelope(dt, dt_released, self.wave_attack_time, self.wave_release_time)
-        return ParameterTuner.exponential_scale(i / self.max_wave_width, 0.5, 1.0, 0.0)
+    def wave_profile(self, num: int) -> Tuple[np.ndarray, np.ndarray]:
+        return wave_profile(self.max_wave_width, num)
 
 
 class RandomWaveShape(WaveSustainObject):
@@ -211,23 +292,17 @@ class RandomWaveShape(WaveSustainObject):
             shifted = (d - cutoff) / (1 - cutoff)  # Convert [0.55, 1.0] -> [0.0, 1.0]
             return ParameterTuner.linear_scale(shifted, 1.0, 4.0)
 
-    def draw_shape(self, draw_context: ImageDraw.ImageDraw, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         (x, y) = self.calculate_xy_position(press)
         color = self.calculate_color(press)
         num_sides = int(((press.t * 100) % 5) + 3)
         rotation = ((press.t * 1000) % 1000) * 360
 
-        dt = time.time() - press.t
-        dt_released = time.time() - press._t_released if press._t_released else None
-
-        for i in np.linspace(
-            start=0, stop=self.max_wave_width, num=int(self.max_wave_width / self.wave_step), endpoint=False
-        ):
-            # Don't worry, this works. Tuple4 is acceptable.
-            scale = self.wave_scale(i=i, dt=dt, dt_released=dt_released)
-            draw_context.regular_polygon(
-                (x, y, r + i), num_sides, rotation=rotation, fill=modulate_alpha(color, scale), outline=None
-            )
+        # Fewer, coarser rings at reduced quality
+        (offsets, scales) = self.wave_profile(int(self.max_wave_width / self.wave_step * self.quality))
+        if len(offsets) == 0:
+            return
+        compositor.nested_regular_polygons(x, y, r + offsets, scales, num_sides, rotation, color)
 
 
 class RandomWaveShapeReverseSlow(RandomWaveShape):
@@ -242,32 +317,14 @@ class VerticalWaves(WaveSustainObject):
         # 0 until 1 before matrix_width, num keys + 1 steps (because we index [i,i+1]
         self.x_coords = np.linspace(0, self.matrix_width, NUM_NOTES + 1, dtype=np.uint8)
 
-    def draw_shape(self, draw_context: ImageDraw.ImageDraw, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         color = self.calculate_color(press)
-        lo = self.x_coords[press.note % NUM_NOTES]
-        hi = self.x_coords[press.note % NUM_NOTES + 1] - 1
-        # draw_context.rectangle((lo, 0, hi, self.matrix_height), fill=color)
+        lo = int(self.x_coords[press.note % NUM_NOTES])
+        hi = int(self.x_coords[press.note % NUM_NOTES + 1]) - 1
 
-        dt = time.time() - press.t
-        dt_released = time.time() - press._t_released if press._t_released else None
-
-        draw_context.rectangle(
-            (lo, 0, hi, self.matrix_height),
-            fill=color,  # Don't worry, this works. Tuple4 is acceptable.
-        )
-        for i in range(self.max_wave_width):
-            scale = self.wave_scale(i, dt=dt, dt_released=dt_released)
-
-            if 0 <= lo - i < self.matrix_width:
-                draw_context.rectangle(
-                    (lo - i, 0, lo - i, self.matrix_height),
-                    fill=modulate_alpha(color, scale),  # Don't worry, this works. Tuple4 is acceptable.
-                )
-            if 0 <= hi + i < self.matrix_width:
-                draw_context.rectangle(
-                    (hi + i, 0, hi + i, self.matrix_height),
-                    fill=modulate_alpha(color, scale),  # Don't worry, this works. Tuple4 is acceptable.
-                )
+        # The band, plus one column either side of it per wave offset, fading out
+        (_, scales) = self.wave_profile(self.max_wave_width)
+        compositor.column_falloff(lo, hi, color, scales)
 
 
 class RandomVerticalWaveReverseSlow(VerticalWaves):
@@ -277,9 +334,11 @@ class RandomVerticalWaveReverseSlow(VerticalWaves):
 
 
 class RandomVerticalWaveReverseSlowDarkerLows(RandomVerticalWaveReverseSlow):
-    def calculate_color(self, p: Press) -> Tuple[int, int, int, int]:
-        c = super().calculate_color(p)
-        return modulate_alpha(c, ParameterTuner.linear_scale(p.note / float(NUM_NOTES), BaseForm.dials(7), 1.0))
+    def calculate_colors(self, batch: PressBatch, now: float) -> np.ndarray:
+        colors = super().calculate_colors(batch, now)
+        factor = ParameterTuner.linear_scale(batch.note / float(NUM_NOTES), BaseForm.dials(7), 1.0)
+        colors[:, 3] = np.clip((factor * colors[:, 3]).astype(np.int64), 0, 255)
+        return colors
 
 
 class RandomVerticalWaveReverseSlowDarkerLowsRed(RandomVerticalWaveReverseSlowDarkerLows):
@@ -300,38 +359,38 @@ class VerticalKeys(SimpleSustainObject):
         # 0 until 1 before matrix_width, num keys + 1 steps (because we index [i,i+1]
         self.x_coords = np.linspace(0, self.matrix_width, NUM_PIANO_KEYBOARD_KEYS + 1, dtype=np.uint8)
 
-    def draw_shape(self, draw_context: ImageDraw.ImageDraw, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         color = self.calculate_color(press)
-        lo = self.x_coords[press.note]
+        lo = int(self.x_coords[press.note])
         # If co-vertical, the -1 produces an x less than lo, thus the column can be though of as a single [lo,lo]
 
-        hi = max(lo, self.x_coords[press.note + 1] - 1)
-        draw_context.rectangle((lo, 0, hi, self.matrix_height), fill=color)
+        hi = max(lo, int(self.x_coords[press.note + 1]) - 1)
+        compositor.fill_columns(lo, hi, color)
 
 
 class RandomOutlineCircle(SimpleSustainObject):
-    def draw_shape(self, draw_context: ImageDraw.ImageDraw, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         (x, y) = self.calculate_xy_position(press)
         color = self.calculate_color(press)
-        draw_context.ellipse((x - r, y - r, x + r, y + r), fill=None, outline=color)
+        compositor.outline_circle(x, y, r, color)
 
 
 class RandomOutlineShape(SimpleSustainObject):
-    def draw_shape(self, draw_context: ImageDraw.ImageDraw, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         (x, y) = self.calculate_xy_position(press)
         color = self.calculate_color(press)
         num_sides = int(((press.t * 100) % 5) + 3)
         rotation = ((press.t * 1000) % 1000) * 360
-        draw_context.regular_polygon((x, y, r), num_sides, rotation=rotation, fill=None, outline=color)
+        compositor.outline_regular_polygon(x, y, r, num_sides, rotation, color)
 
 
 class RandomSolidShape(SimpleSustainObject):
-    def draw_shape(self, draw_context: ImageDraw.ImageDraw, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         (x, y) = self.calculate_xy_position(press)
         color = self.calculate_color(press)
         num_sides = int(((press.t * 100) % 5) + 3)
         rotation = ((press.t * 1000) % 1000) * 360
-        draw_context.regular_polygon((x, y, r), num_sides, rotation=rotation, fill=color, outline=None)
+        compositor.fill_regular_polygon(x, y, r, num_sides, rotation, color)
 
 
 class RandomSolidShapeSlowSpectrum(RandomSolidShape):
@@ -348,18 +407,10 @@ class RandomText(SimpleSustainObject):
     def calculate_radius(self, p: Press, current_time: float) -> float:
         return int(super().calculate_radius(p, current_time))
 
-    def font_cache(self, size: int):
-        if size in self._fonts:
-            return self._fonts[size]
-        else:
-            log.info(f"Adding {size} to font_cache, size {len(self._fonts)}")
-            self._fonts[size] = get_font(self.font_name, int(size))
-            return self._fonts[size]
-
     def __init__(self, dimensions: Tuple[int, int]):
         super().__init__(dimensions)
         self.font_name = "DejaVuSans.ttf"
-        self._fonts: Dict[int, ImageFont.FreeTypeFont] = dict()
+        self.atlas: GlyphAtlas = ATLAS
 
     def calculate_hue(self, p: Press) -> float:
         return self.base_hue  # Use base hue
@@ -367,12 +418,12 @@ class RandomText(SimpleSustainObject):
     def calculate_grow_velocity_per_s(self, p: Press) -> float:
         return 0.0  # Don't grow
 
-    def draw_shape(self, draw_context: ImageDraw.ImageDraw, press: Press, r: float):
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
+        # Text is composited from pre-rasterized glyph coverage rather than drawn through ImageDraw per press.
         (x, y) = self.calculate_xy_position(press)
-        elt = self.select_string(press)
+        glyph = self.atlas.get(self.select_string(press), self.font_name, int(r))
         color = self.calculate_color(press)
-        # TODO Alpha doesn't work here.
-        draw_context.text((x, y), text=elt, fill=color, anchor="mm", font=self.font_cache(int(r)))
+        compositor.blend(glyph.coverage, color, x + glyph.offset_x, y + glyph.offset_y)
 
 
 class RandomWord(RandomText):
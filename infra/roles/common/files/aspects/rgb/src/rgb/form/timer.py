@@ -12,6 +12,7 @@ import numpy as np
 
 from PIL import Image, ImageDraw, ImageFont
 from rgb.form.baseform import BaseForm
+from rgb.framebuffer import Frame
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
@@ -22,6 +23,8 @@ class Timer(BaseForm):
         (self.matrix_width, self.matrix_height) = dimensions
         self.t_stop: Optional[datetime.datetime] = None
         self.font = get_font("DejaVuSans.ttf", 14)
+        # Text is drawn upright with PIL, and shown flipped
+        self.framebuffer.flipped = True
         self.enable_visual = True
 
         self.handlers = {
@@ -49,7 +52,7 @@ class Timer(BaseForm):
     def render_dt(dt: datetime.timedelta) -> str:
         return str(f"{int(dt.seconds / 60)}:{dt.seconds % 60:02}")
 
-    def _render(self) -> Image.Image:
+    def _render(self) -> Frame:
         im = Image.new("RGB", (self.matrix_width, self.matrix_height))
         draw_context = ImageDraw.Draw(im)
         log.debug(f"t_stop {self.t_stop}")
@@ -69,7 +72,8 @@ class Timer(BaseForm):
                     anchor="mm",
                     font=self.font
                 )
-        return im.transpose(Image.FLIP_TOP_BOTTOM)
+        self.framebuffer.array[...] = np.asarray(im)
+        return self.framebuffer
 
     def step(self, dt: float):
         return self._render()
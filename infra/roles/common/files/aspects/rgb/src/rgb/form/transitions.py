@@ -1,3 +1,4 @@
+import numpy as np
 
 
 # TODO Incorporate
@@ -26,4 +27,14 @@ def transition_ease_out_exponential(x: float, exponent: float = 3) -> float:
     elif x < 1.0:
         return 1 - (1-x) ** exponent
     else:
-        return 1
\ No newline at end of file
+        return 1
+
+
+# Array variants, for evaluating every press of a frame at once. Times before 0 clamp rather than raise, as presses can
+# arrive between a frame's timestamp and its evaluation.
+def transition_ease_in_array(x: np.ndarray) -> np.ndarray:
+    return np.clip(x, 0.0, 1.0) ** 3
+
+
+def transition_ease_out_exponential_array(x: np.ndarray, exponent: float = 3) -> np.ndarray:
+    return 1 - (1 - np.clip(x, 0.0, 1.0)) ** exponent
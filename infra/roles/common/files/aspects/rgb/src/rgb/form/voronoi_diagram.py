@@ -1,17 +1,19 @@
-from functools import lru_cache
+from collections import OrderedDict
 import time
 from rgb.form.baseform import BaseForm
-from rgb.form.transitions import transition_ease_in
+from rgb.form.transitions import transition_ease_in_array
 from rgb.parameter_tuner import ParameterTuner
-from rgb.form.sustainobject import SimpleSustainObject
+from rgb.form.sustainobject import PressBatch, SimpleSustainObject, with_alpha
+from rgb.form.compositor import Compositor
 from rgb.form.keyawareform import Press
+from rgb.framebuffer import Frame
 import logging
 import os
-import colorsys
 from PIL import Image, ImageDraw, ImageFont
-from typing import Dict, Iterable, List, Set, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 from rgb.constants import NUM_NOTES, NUM_PIANO_KEYBOARD_KEYS, MIDI_DIAL_MAX
-from scipy.spatial import Voronoi, voronoi_plot_2d
+from rgb.utilities import hsv_to_rgb_array
+from scipy.spatial import Voronoi, cKDTree, voronoi_plot_2d
 from itertools import chain
 
 import numpy as np
@@ -30,24 +32,32 @@ def show_voronoi_diagram(v: Voronoi):
 
 
 class VoronoiDiagram(SimpleSustainObject):
+
+    # Distinct (presses, companion count, dimensions) tessellations kept. Entries are also dropped whenever the set of
+    # presses changes, so this only bounds the cost of sweeping dial 2 back and forth while holding a chord.
+    CACHE_SIZE = 16
+
     def get_base_point_array_list(self, a: np.ndarray) -> np.ndarray:
         return np.concatenate((self.base_points, a), axis=0) if a.size != 0 else self.base_points
 
-    @lru_cache
-    def get_polygons(self, a: Tuple[Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
-        base_points_to_ignore = len(self.base_points)
-
-        input_vertices = self.get_base_point_array_list(np.array(list(a)))
-        # Also include companion points to intoduce sparsity
+    def companion_points(self, presses: Iterable[Press]) -> List[Tuple[int, int]]:
+        # Companion points intoduce sparsity: they claim regions that are never filled.
         companion_points_units = list(
             chain.from_iterable(
-                [
-                    VoronoiDiagram.get_press_companion_points(p, count=self.num_companion_points)
-                    for p in self.presses().values()
-                ]
+                [VoronoiDiagram.get_press_companion_points(p, count=self.num_companion_points) for p in presses]
             )
         )
-        companion_points_coordinates = self.companion_points_to_coordinates(companion_points_units)
+        return self.companion_points_to_coordinates(companion_points_units)
+
+    def get_polygons(
+        self, a: Tuple[Tuple[int, int]], presses: Optional[Iterable[Press]] = None
+    ) -> List[List[Tuple[int, int]]]:
+        base_points_to_ignore = len(self.base_points)
+
+        input_vertices = self.get_base_point_array_list(np.array(list(a)))
+        companion_points_coordinates = self.companion_points(
+            presses if presses is not None else self.presses().values()
+        )
         concatenated = (
             np.concatenate((input_vertices, companion_points_coordinates), axis=0)
             if companion_points_coordinates
@@ -66,13 +76,43 @@ class VoronoiDiagram(SimpleSustainObject):
         self.voronoi = v
         return output_polygons
 
-    def __init__(self, dimensions: Tuple[int, int]):
+    def get_label_map(self, a: Tuple[Tuple[int, int]], presses: Iterable[Press]) -> np.ndarray:
+        """
+        (height, width) map of the index of the nearest seed for each pixel. Indices [0, len(a)) are the presses,
+        len(a) is any companion point.
+        """
+        companion_points_coordinates = self.companion_points(presses)
+        seeds = np.array(list(a) + companion_points_coordinates, dtype=np.float64)
+        _, nearest = cKDTree(seeds).query(self.pixel_coordinates)
+        return np.minimum(nearest, len(a)).reshape(self.matrix_height, self.matrix_width)
+
+    def cached(self, kind: str, presses: Tuple[Press, ...], compute):
+        key = (kind, presses, self.num_companion_points, self.matrix_width, self.matrix_height)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = compute()
+        self._cache[key] = value
+        if len(self._cache) > VoronoiDiagram.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return value
+
+    def invalidate_cache(self):
+        self._cache.clear()
+
+    def __init__(self, dimensions: Tuple[int, int], raster: bool = False):
         super().__init__(dimensions)
         w = self.matrix_width
         h = self.matrix_height
         # These points are outside the window of view, but evenly surround the space. Without them we get QH6214 qhull input error:
         self.base_points = np.array([(-10 * w, h / 2), (11 * w, h / 2), (w / 2, -10 * h), (w / 2, 11 * h)])
         self.polygon_coordinate_map: Dict[int, List[Tuple[int, int]]] = {}
+        self._cache: "OrderedDict[Tuple, Union[List, np.ndarray]]" = OrderedDict()
+
+        # Rasterized-region mode skips scipy Voronoi and polygon fills entirely, labelling pixels by nearest seed.
+        self.raster = raster
+        ys, xs = np.mgrid[0:h, 0:w]
+        self.pixel_coordinates = np.column_stack((xs.ravel(), ys.ravel())).astype(np.float64)
 
     @staticmethod
     def get_press_companion_points(p: Press, count: int) -> List[Tuple[float, float]]:
@@ -92,46 +132,67 @@ class VoronoiDiagram(SimpleSustainObject):
     def num_companion_points(self) -> int:
         return int(ParameterTuner.linear_scale(BaseForm.dials(2), minimum=0, maximum=6))
 
-    def step(self, dt: float) -> Union[Image.Image, np.ndarray]:
-        arr = tuple(self.calculate_xy_position(x) for x in self.presses().values())
-        polygon_results = self.get_polygons(arr)
+    def midi_handler(self, value: Dict):
+        super().midi_handler(value)
+        if value["type"] in ("note_on", "note_off"):
+            # Press identities include their timestamps, so no entry computed before this can be hit again.
+            self.invalidate_cache()
+
+    def cleanup(self):
+        super().cleanup()
+        self.invalidate_cache()
+
+    def step(self, dt: float) -> Frame:
+        presses = tuple(self.presses().values())
+        arr = tuple(self.calculate_xy_position(x) for x in presses)
+        if self.raster:
+            return self.step_raster(dt, presses, arr)
+        polygon_results = self.cached("polygons", presses, lambda: self.get_polygons(arr, presses))
         self.polygon_coordinate_map = {}
         for key, polygon in zip(self.presses().keys(), polygon_results):
             self.polygon_coordinate_map[key] = polygon
         return super().step(dt)
 
-    def draw_shape(self, draw_context, press: Press, r: float):
+    def step_raster(self, dt: float, presses: Tuple[Press, ...], arr: Tuple[Tuple[int, int]]) -> Frame:
+        self.prune_presses_dictionary()
+        if not presses:
+            return self.framebuffer.clear()
+        label_map = self.cached("labels", presses, lambda: self.get_label_map(arr, presses))
+        # Last palette entry is black, for companion regions. Alpha is applied over black, as the polygon fill does.
+        colors = self.calculate_colors(PressBatch.of(presses), time.time())
+        palette = np.zeros((len(presses) + 1, 3), dtype=np.float32)
+        palette[:-1] = colors[:, :3] * (colors[:, 3:] / 255)
+        np.take(palette.astype(np.uint8), label_map, axis=0, out=self.framebuffer.array)
+        return self.framebuffer
+
+    def draw_shape(self, compositor: Compositor, press: Press, r: float):
         coordinates = self.polygon_coordinate_map[press.note]
         color = self.calculate_color(press)
-        draw_context.polygon(coordinates, fill=color, outline=None)
+        compositor.fill_polygon(coordinates, color)
         # draw_context.rectangle((0,0,1,1), fill=self.calculate_color(press))
 
 
 class ValueVoronoiDiagram(VoronoiDiagram):
-    def calculate_color(self, p: Press):
-        dt = time.time() - p.t
-        x = transition_ease_in(dt / self.attack_time_s) if self.attack_time_s != 0 else 1.0
-        hue = (p.note % NUM_NOTES) / NUM_NOTES
-        rgb = colorsys.hsv_to_rgb(hue, 1.0, x)
-        return (int(255 * rgb[0]), int(255 * rgb[1]), int(255 * rgb[2]))
+    def calculate_colors(self, batch: PressBatch, now: float) -> np.ndarray:
+        dt = now - batch.t
+        x = transition_ease_in_array(dt / self.attack_time_s) if self.attack_time_s != 0 else 1.0
+        hue = (batch.note % NUM_NOTES) / NUM_NOTES
+        return with_alpha(hsv_to_rgb_array(hue, 1.0, x, dtype=np.float64), 1.0)
 
 
 class RedSaturationVoronoiDiagram(VoronoiDiagram):
-    def calculate_color(self, p: Press):
-        v = (p.note % NUM_NOTES) / NUM_NOTES
-        rgb = colorsys.hsv_to_rgb(1, v, 1.0)
-        return (int(255 * rgb[0]), int(255 * rgb[1]), int(255 * rgb[2]))
+    def calculate_colors(self, batch: PressBatch, now: float) -> np.ndarray:
+        v = (batch.note % NUM_NOTES) / NUM_NOTES
+        return with_alpha(hsv_to_rgb_array(1, v, 1.0, dtype=np.float64), 1.0)
 
 
 class RedValueVoronoiDiagram(VoronoiDiagram):
-    def calculate_color(self, p: Press):
-        v = (p.note % NUM_NOTES) / NUM_NOTES
-        rgb = colorsys.hsv_to_rgb(1, 1.0, v)
-        return (int(255 * rgb[0]), int(255 * rgb[1]), int(255 * rgb[2]))
+    def calculate_colors(self, batch: PressBatch, now: float) -> np.ndarray:
+        v = (batch.note % NUM_NOTES) / NUM_NOTES
+        return with_alpha(hsv_to_rgb_array(1, 1.0, v, dtype=np.float64), 1.0)
 
 
 class SparseRedValueVoronoiDiagram(VoronoiDiagram):
-    def calculate_color(self, p: Press):
-        v = (p.note % NUM_NOTES) / NUM_NOTES if p.note < NUM_PIANO_KEYBOARD_KEYS else 0.0
-        rgb = colorsys.hsv_to_rgb(1, 1.0, v)
-        return (int(255 * rgb[0]), int(255 * rgb[1]), int(255 * rgb[2]))
+    def calculate_colors(self, batch: PressBatch, now: float) -> np.ndarray:
+        v = np.where(batch.note < NUM_PIANO_KEYBOARD_KEYS, (batch.note % NUM_NOTES) / NUM_NOTES, 0.0)
+        return with_alpha(hsv_to_rgb_array(1, 1.0, v, dtype=np.float64), 1.0)
@@ -0,0 +1,65 @@
+import logging
+import os
+from typing import Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+
+class FrameBuffer:
+    """
+    A preallocated (height, width, 3) uint8 frame. Forms render into .array and return the FrameBuffer itself from
+    step(); displays read the array directly, so no frame is allocated, converted to a PIL Image or flipped per step.
+
+    flipped marks an array stored bottom row first (y up, as the simulations model it). Displays read the top-down
+    view, array[::-1], which costs no copy.
+    """
+
+    def __init__(self, dimensions: Tuple[int, int], flipped: bool = False):
+        (self.width, self.height) = dimensions
+        self.array = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self.flipped = flipped
+
+    def clear(self) -> "FrameBuffer":
+        self.array.fill(0)
+        return self
+
+    def view(self) -> np.ndarray:
+        # Top-down, as displays expect
+        return self.array[::-1] if self.flipped else self.array
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.array.shape
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        # So that np.asarray(), and anything else expecting the ndarray forms used to return, sees the top-down frame
+        view = self.view()
+        if dtype is not None and dtype != view.dtype:
+            return view.astype(dtype)
+        return view.copy() if copy else view
+
+    def image(self) -> Image.Image:
+        # For consumers that need PIL. This copies.
+        return Image.fromarray(np.ascontiguousarray(self.view()))
+
+
+Frame = Union[FrameBuffer, np.ndarray, Image.Image]
+
+
+def frame_array(frame: Frame) -> np.ndarray:
+    """
+    The top-down (height, width, 3) uint8 array for anything a form's step() may return; a view, rather than a copy,
+    for FrameBuffers and ndarrays.
+    """
+    if isinstance(frame, FrameBuffer):
+        return frame.view()
+    elif isinstance(frame, np.ndarray):
+        return frame
+    elif isinstance(frame, Image.Image):
+        return np.asarray(frame if frame.mode == "RGB" else frame.convert("RGB"))
+    else:
+        raise ValueError(f"Invalid type for {frame}")
@@ -0,0 +1,191 @@
+import datetime
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from rgb.events import Event
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+
+def read_time(event: Event) -> Optional[float]:
+    """
+    When the publisher read a MIDI event, in epoch seconds: publish_time of binary (rgb.wire) messages, or the
+    midi_read_time (naive UTC, ISO 8601) of JSON ones. None for events that carry neither.
+    """
+    if not isinstance(event, dict):
+        return None
+    if "publish_time" in event:
+        return event["publish_time"]
+    if "midi_read_time" in event:
+        try:
+            t = datetime.datetime.fromisoformat(event["midi_read_time"])
+        except (TypeError, ValueError):
+            return None
+        if t.tzinfo is None:
+            t = t.replace(tzinfo=datetime.timezone.utc)
+        return t.timestamp()
+    return None
+
+
+class LatencyHistogram:
+    """
+    Counts of durations in logarithmic buckets, BUCKETS_PER_DECADE per decade from MIN_S to MAX_S; durations outside
+    that range are counted in the first or last bucket. Percentiles are the upper edge of the bucket they fall in, so
+    within about 12% (at 20 per decade) of the true value.
+    """
+
+    MIN_S = 1e-5
+    MAX_S = 10.0
+    BUCKETS_PER_DECADE = 20
+
+    def __init__(self):
+        decades = np.log10(LatencyHistogram.MAX_S / LatencyHistogram.MIN_S)
+        self.edges = LatencyHistogram.MIN_S * np.logspace(
+            0, decades, int(round(decades * LatencyHistogram.BUCKETS_PER_DECADE)) + 1
+        )
+        self.counts = np.zeros(len(self.edges), dtype=np.int64)
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def record(self, seconds: float):
+        self.counts[min(int(np.searchsorted(self.edges, seconds)), len(self.edges) - 1)] += 1
+        self.count += 1
+        self.total_s += seconds
+        self.max_s = max(self.max_s, seconds)
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return float("nan")
+        rank = int(np.ceil(q / 100 * self.count))
+        return float(self.edges[np.searchsorted(np.cumsum(self.counts), max(rank, 1))])
+
+    @property
+    def mean_s(self) -> float:
+        return self.total_s / self.count if self.count else float("nan")
+
+    def __str__(self) -> str:
+        if self.count == 0:
+            return "-"
+        return (
+            f"p50 {self.percentile(50) * 1000:.1f}ms p95 {self.percentile(95) * 1000:.1f}ms "
+            f"p99 {self.percentile(99) * 1000:.1f}ms max {self.max_s * 1000:.1f}ms"
+        )
+
+
+@dataclass
+class Trace:
+    # Publisher's read time, epoch seconds; None if the event didn't carry one
+    read: Optional[float]
+    # Receipt on the MQTT thread, in both epoch seconds (to compare with read) and the tracer's clock
+    received_wall: float
+    received: float
+    dequeued: Optional[float] = None
+    rendered: Optional[float] = None
+
+
+class LatencyTracer:
+    """
+    Follows input events from the publisher to the output, and keeps a histogram of each leg:
+
+    transport: publisher read -> MQTT receipt. Spans hosts, so includes their clock offset; only for events that
+               carry a read time.
+    queue:     receipt -> drained by the render loop.
+    render:    drained -> the frame that first reflects it has been stepped.
+    display:   stepped -> that frame is on the output (for a ThreadedDisplay, when its worker has shown it).
+    total:     read (or receipt, without a read time) -> on the output.
+
+    Events coalesced away are never shown, so aren't traced past the queue. A budget_s of the total may be given; the
+    events over it are counted.
+
+    displayed() runs on the display's worker when it is a ThreadedDisplay, so recording, formatting and resetting the
+    histograms are done under a lock.
+    """
+
+    STAGES = ("transport", "queue", "render", "display", "total")
+
+    def __init__(
+        self,
+        budget_s: Optional[float] = None,
+        clock: Callable[[], float] = time.perf_counter,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self.budget_s = budget_s
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.lock = threading.Lock()
+        self.reset()
+
+    @staticmethod
+    def factory() -> Optional["LatencyTracer"]:
+        # With LATENCY_TRACE=1; LATENCY_BUDGET_MS sets the budget
+        if os.environ.get("LATENCY_TRACE") != "1":
+            return None
+        budget_ms = os.environ.get("LATENCY_BUDGET_MS")
+        return LatencyTracer(budget_s=float(budget_ms) / 1000 if budget_ms else None)
+
+    def _reset(self):
+        self.histograms: Dict[str, LatencyHistogram] = {stage: LatencyHistogram() for stage in LatencyTracer.STAGES}
+        self.over_budget = 0
+
+    def reset(self):
+        with self.lock:
+            self._reset()
+
+    def received(self, event: Event) -> Trace:
+        return Trace(read=read_time(event), received_wall=self.wall_clock(), received=self.clock())
+
+    def dequeued(self, traces: List[Trace]):
+        now = self.clock()
+        for trace in traces:
+            trace.dequeued = now
+
+    def rendered(self, traces: List[Trace]):
+        now = self.clock()
+        for trace in traces:
+            trace.rendered = now
+
+    def displayed(self, traces: List[Trace]):
+        now = self.clock()
+        with self.lock:
+            self._record(traces, now)
+
+    def _record(self, traces: List[Trace], now: float):
+        for trace in traces:
+            transport = None if trace.read is None else max(0.0, trace.received_wall - trace.read)
+            if transport is not None:
+                self.histograms["transport"].record(transport)
+            self.histograms["queue"].record(trace.dequeued - trace.received)
+            self.histograms["render"].record(trace.rendered - trace.dequeued)
+            self.histograms["display"].record(now - trace.rendered)
+            total = (transport or 0.0) + now - trace.received
+            self.histograms["total"].record(total)
+            if self.budget_s is not None and total > self.budget_s:
+                self.over_budget += 1
+
+    def _summary(self) -> str:
+        total = self.histograms["total"]
+        budget = (
+            f", {self.over_budget} over {self.budget_s * 1000:.0f}ms budget" if self.budget_s is not None else ""
+        )
+        stages = "; ".join(f"{stage} {self.histograms[stage]}" for stage in LatencyTracer.STAGES)
+        return f"{total.count} events{budget}; {stages}"
+
+    def __str__(self) -> str:
+        with self.lock:
+            return self._summary()
+
+    def report(self) -> str:
+        """
+        The summary so far, then reset, as one step: no event recorded in between is lost.
+        """
+        with self.lock:
+            summary = self._summary()
+            self._reset()
+        return summary
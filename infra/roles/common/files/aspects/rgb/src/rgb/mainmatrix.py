@@ -1,9 +1,10 @@
 import os
 
+from rgb.audio import AudioAnalysis, WavSource
 from rgb.controlloop import ControlLoop
-from rgb.display.hzelmatrix import HzelMatrix
-from rgb.form import gravity, sustainobject, voronoi_diagram
-from rgb.form.stars import Stars
+from rgb.form.registry import FormRegistry, LazyForm
+from rgb.latency import LatencyTracer
+from rgb.display.network import DEFAULT_PORT, UdpStreamDisplay
 
 if __name__ == "__main__":
     dimensions = (
@@ -11,48 +12,75 @@ if __name__ == "__main__":
         int(os.environ.get("MATRIX_HEIGHT", 64)),
     )
 
-    forms = (
-        sustainobject.RandomVerticalWaveReverseSlow(dimensions),
-        sustainobject.RandomVerticalWaveReverseSlowDarkerLows(dimensions),
-        sustainobject.RandomVerticalWaveReverseSlowDarkerLowsRed(dimensions),
-        # stripes.Stripes(dimensions),
-        sustainobject.VerticalWaves(dimensions),
-        sustainobject.VerticalNotes(dimensions),
-        sustainobject.VerticalNotesSlowSpectrum(dimensions),
-        sustainobject.VerticalKeys(dimensions),
-        sustainobject.RandomIcon(dimensions),
-        # gravity.Gravity(dimensions, 0.006),
-        gravity.GravityKeys(dimensions, 0.006),
-        gravity.GravityKeysMultiNozzle(dimensions, 0.006),
-        sustainobject.RandomWaveShape(dimensions),
-        sustainobject.RandomWaveShapeReverseSlow(dimensions),
-        sustainobject.RandomVerticalWaveReverseSlow(dimensions),
-        sustainobject.RandomSolidShape(dimensions),
-        sustainobject.RandomSolidShapeSlowSpectrum(dimensions),
-        sustainobject.RandomIcon(dimensions),
-        sustainobject.RandomWord(dimensions),
-        sustainobject.RandomJapaneseWord(dimensions),
-        sustainobject.TextStars(dimensions),
-        sustainobject.TextSparkles(dimensions),
-        voronoi_diagram.VoronoiDiagram(dimensions),
-        voronoi_diagram.ValueVoronoiDiagram(dimensions),
-        voronoi_diagram.RedSaturationVoronoiDiagram(dimensions),
-        voronoi_diagram.RedValueVoronoiDiagram(dimensions),
-        voronoi_diagram.SparseRedValueVoronoiDiagram(dimensions),
-        # sustainobject.RandomNumber(dimensions),
-        # randomobject.RandomOutlineShape(dimensions),
-        # randomobject.RandomOutlineCircle(dimensions),
-        # basenoise.WhispNoise(dimensions),
-        # basenoise.HueNoise(dimensions),
-        # basenoise.BaseNoise(dimensions),
-        # timer.Timer(dimensions),
-        # audio_spectrogram.AudioSpectrogram(dimensions),
-        # stars.Stars(dimensions),
-        # orbit.Orbit(dimensions, fast_forward_scale=60 * 60 * 24 * 30),
+    forms = FormRegistry.factory(
+        [
+            LazyForm("rgb.form.sustainobject.RandomVerticalWaveReverseSlow", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomVerticalWaveReverseSlowDarkerLows", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomVerticalWaveReverseSlowDarkerLowsRed", dimensions),
+            # LazyForm("rgb.form.stripes.Stripes", dimensions),
+            LazyForm("rgb.form.sustainobject.VerticalWaves", dimensions),
+            LazyForm("rgb.form.sustainobject.VerticalNotes", dimensions),
+            LazyForm("rgb.form.sustainobject.VerticalNotesSlowSpectrum", dimensions),
+            LazyForm("rgb.form.sustainobject.VerticalKeys", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomIcon", dimensions),
+            # LazyForm("rgb.form.gravity.Gravity", dimensions, 0.006),
+            LazyForm("rgb.form.gravity.GravityKeys", dimensions, 0.006),
+            LazyForm("rgb.form.gravity.GravityKeysMultiNozzle", dimensions, 0.006),
+            LazyForm("rgb.form.sustainobject.RandomWaveShape", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomWaveShapeReverseSlow", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomVerticalWaveReverseSlow", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomSolidShape", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomSolidShapeSlowSpectrum", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomIcon", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomWord", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomJapaneseWord", dimensions),
+            LazyForm("rgb.form.sustainobject.TextStars", dimensions),
+            LazyForm("rgb.form.sustainobject.TextSparkles", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.VoronoiDiagram", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.ValueVoronoiDiagram", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.RedSaturationVoronoiDiagram", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.RedValueVoronoiDiagram", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.SparseRedValueVoronoiDiagram", dimensions),
+            # LazyForm("rgb.form.sustainobject.RandomNumber", dimensions),
+            # LazyForm("rgb.form.randomobject.RandomOutlineShape", dimensions),
+            # LazyForm("rgb.form.randomobject.RandomOutlineCircle", dimensions),
+            LazyForm("rgb.form.basenoise.WhispNoise", dimensions),
+            LazyForm("rgb.form.basenoise.HueNoise", dimensions),
+            LazyForm("rgb.form.basenoise.BaseNoise", dimensions),
+            # LazyForm("rgb.form.timer.Timer", dimensions),
+            # LazyForm("rgb.form.audio_spectrogram.AudioSpectrogram", dimensions),
+            # LazyForm("rgb.form.audio_spectrogram.AudioWaterfall", dimensions),
+            # LazyForm("rgb.form.stars.Stars", dimensions),
+            # LazyForm("rgb.form.orbit.Orbit", dimensions, fast_forward_scale=60 * 60 * 24 * 30),
+        ]
     )
 
-    display = HzelMatrix(dimensions=dimensions)
+    stream_to = os.environ.get("STREAM_TO")
+    if stream_to:
+        # Render here, for a panel node running mainreceiver.py. host[:port]
+        (host, _, port) = stream_to.partition(":")
+        display = UdpStreamDisplay(
+            dimensions,
+            host,
+            int(port or DEFAULT_PORT),
+            compression=os.environ.get("STREAM_COMPRESSION", "delta"),
+        )
+    else:
+        # Imported here, so that a render-only machine needn't have the matrix library
+        from rgb.display.hzelmatrix import HzelMatrix
 
-    rgb2d = ControlLoop(display=display, forms=forms)
+        display = HzelMatrix(dimensions=dimensions)
+
+    rgb2d = ControlLoop(
+        display=display,
+        forms=forms,
+        pipelined=os.environ.get("PIPELINED_DISPLAY") == "1",
+        overrun_policy=os.environ.get("OVERRUN_POLICY", "drop"),
+        tracer=LatencyTracer.factory(),
+    )
     rgb2d.initialize_mqtt()
+    audio_wav = os.environ.get("AUDIO_WAV")
+    if audio_wav:
+        # Spectra and onset notes analyzed here, rather than received over MQTT
+        AudioAnalysis(WavSource(audio_wav, loop=True), put=rgb2d.put_event).start()
     rgb2d.blocking_loop()
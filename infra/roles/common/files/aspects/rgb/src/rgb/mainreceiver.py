@@ -0,0 +1,30 @@
+import logging
+import os
+
+from rgb.display.network import DEFAULT_PORT, FrameReceiver
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+if __name__ == "__main__":
+    # A thin panel node: shows frames rendered elsewhere (mainmatrix.py with STREAM_TO) and streamed over UDP.
+    # Only the library for the attached hardware need be installed, so displays are imported as needed.
+    if os.environ.get("RECEIVER_DISPLAY", "matrix") == "strip":
+        from rgb.display.ledstrip import LedStrip
+
+        dimensions = (int(os.environ.get("LED_COUNT", 100)), 1)
+        display = LedStrip(
+            dimensions=dimensions,
+            led_pin=int(os.environ.get("LED_PIN", 18)),
+            led_brightness=int(os.environ.get("RGB_STRIP_LED_BRIGHTNESS", 255)),
+            gamma=float(os.environ.get("RGB_STRIP_GAMMA", 1.0)),
+        )
+    else:
+        from rgb.display.hzelmatrix import HzelMatrix
+
+        dimensions = (int(os.environ.get("MATRIX_WIDTH", 32)), int(os.environ.get("MATRIX_HEIGHT", 64)))
+        display = HzelMatrix(dimensions=dimensions)
+
+    receiver = FrameReceiver(display, port=int(os.environ.get("STREAM_PORT", DEFAULT_PORT)))
+    log.info(f"Receiving {dimensions[0]}x{dimensions[1]} frames for {type(display).__name__}")
+    receiver.serve_forever()
@@ -1,6 +1,8 @@
 import os
 from rgb.display.ledstrip import LedStrip
+from rgb.audio import AudioAnalysis, WavSource
 from rgb.controlloop import ControlLoop
+from rgb.latency import LatencyTracer
 from rgb.form import (audio_spectrogram, gravity, orbit, sustainobject, stars, timer, basenoise)
 
 import logging
@@ -11,13 +13,24 @@ if __name__ == "__main__":
     dimensions = (int(os.environ.get("LED_COUNT", 100)), 1)
     led_pin = int(os.environ.get("LED_PIN", 18))
     led_brightness = int(os.environ.get("RGB_STRIP_LED_BRIGHTNESS", 255))
+    gamma = float(os.environ.get("RGB_STRIP_GAMMA", 1.0))
 
     log.info("Initializing LedStrip with led_pin {led_pin}, led brightness {led_brightness}, and dimensions {led_count}")
-    display = LedStrip(dimensions=dimensions, led_pin=led_pin, led_brightness=led_brightness, skip_first_n=0)
+    display = LedStrip(dimensions=dimensions, led_pin=led_pin, led_brightness=led_brightness, skip_first_n=0, gamma=gamma)
     
     forms = (
         sustainobject.VerticalKeys(dimensions),
     )
-    rgb1d = ControlLoop(display=display, forms=forms)
+    rgb1d = ControlLoop(
+        display=display,
+        forms=forms,
+        pipelined=os.environ.get("PIPELINED_DISPLAY") == "1",
+        overrun_policy=os.environ.get("OVERRUN_POLICY", "drop"),
+        tracer=LatencyTracer.factory(),
+    )
     rgb1d.initialize_mqtt()
+    audio_wav = os.environ.get("AUDIO_WAV")
+    if audio_wav:
+        # Spectra and onset notes analyzed here, rather than received over MQTT
+        AudioAnalysis(WavSource(audio_wav, loop=True), put=rgb1d.put_event).start()
     rgb1d.blocking_loop()
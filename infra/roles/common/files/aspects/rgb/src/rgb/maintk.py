@@ -1,13 +1,7 @@
 import os
 from rgb.controlloop import ControlLoop
-from rgb.form import gravity, sustainobject, voronoi_diagram
-from rgb.form.sustainobject import RandomIcon, RandomWaveShape, VerticalWaves, WaveSustainObject
-from rgb.utilities import loopwait
+from rgb.form.registry import FormRegistry, LazyForm
 from rgb.display.tkcanvas import TkCanvas
-import time
-
-hz = 60
-max_dt = 1 / hz
 
 events = {
     20: {"type": "note_on", "note": 42, "velocity": 105},
@@ -41,64 +35,48 @@ events = {
 
 event_mod = max(events.keys()) + 1
 
-# if __name__ == "__main__":
-#     matrix_width = int(os.environ.get("MATRIX_WIDTH", 32))
-#     matrix_height = int(os.environ.get("MATRIX_HEIGHT", 64))
-#     display = TkCanvas(dimensions=(matrix_width, matrix_height))
-#     # f = VerticalWaves((matrix_width, matrix_height))
-#     f = RandomWaveShape((matrix_width, matrix_height))
-#     i = 0
-#     t_last = time.time()
-#     # f.midi_handler({"type": "note_on", "note": 48, "velocity": 105 })
-#     while True:
-#         i += 1
-#         if i % event_mod in events:
-#             event = events[i % event_mod]
-#             f.midi_handler(event)
-#         t_last, total_elapsed_since_last_frame = loopwait(t_last=t_last, max_dt=max_dt)
-#         step = f.step(total_elapsed_since_last_frame)
-#         display.display(step)
-
 if __name__ == "__main__":
     dimensions = (
         int(os.environ.get("MATRIX_WIDTH", 32)),
         int(os.environ.get("MATRIX_HEIGHT", 64)),
     )
 
-    forms = (
-        
-        # stripes.Stripes(dimensions),
-        sustainobject.VerticalWaves(dimensions),
-        sustainobject.VerticalNotes(dimensions),
-        sustainobject.VerticalNotesSlowSpectrum(dimensions),
-        sustainobject.VerticalKeys(dimensions),
-        sustainobject.RandomIcon(dimensions),
-        # gravity.Gravity(dimensions, 0.006),
-        gravity.GravityKeys(dimensions, 0.006),
-        gravity.GravityKeysMultiNozzle(dimensions, 0.006),
-        sustainobject.RandomWaveShape(dimensions),
-        sustainobject.RandomSolidShape(dimensions),
-        sustainobject.RandomSolidShapeSlowSpectrum(dimensions),
-        sustainobject.RandomIcon(dimensions),
-        sustainobject.RandomWord(dimensions),
-        sustainobject.RandomJapaneseWord(dimensions),
-        sustainobject.TextStars(dimensions),
-        sustainobject.TextSparkles(dimensions),
-        voronoi_diagram.VoronoiDiagram(dimensions),
-        voronoi_diagram.ValueVoronoiDiagram(dimensions),
-        voronoi_diagram.RedSaturationVoronoiDiagram(dimensions),
-        voronoi_diagram.RedValueVoronoiDiagram(dimensions),
-        voronoi_diagram.SparseRedValueVoronoiDiagram(dimensions),
-        # sustainobject.RandomNumber(dimensions),
-        # randomobject.RandomOutlineShape(dimensions),
-        # randomobject.RandomOutlineCircle(dimensions),
-        # basenoise.WhispNoise(dimensions),
-        # basenoise.HueNoise(dimensions),
-        # basenoise.BaseNoise(dimensions),
-        # timer.Timer(dimensions),
-        # audio_spectrogram.AudioSpectrogram(dimensions),
-        # stars.Stars(dimensions),
-        # orbit.Orbit(dimensions, fast_forward_scale=60 * 60 * 24 * 30),
+    forms = FormRegistry.factory(
+        [
+            # LazyForm("rgb.form.stripes.Stripes", dimensions),
+            LazyForm("rgb.form.sustainobject.VerticalWaves", dimensions),
+            LazyForm("rgb.form.sustainobject.VerticalNotes", dimensions),
+            LazyForm("rgb.form.sustainobject.VerticalNotesSlowSpectrum", dimensions),
+            LazyForm("rgb.form.sustainobject.VerticalKeys", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomIcon", dimensions),
+            # LazyForm("rgb.form.gravity.Gravity", dimensions, 0.006),
+            LazyForm("rgb.form.gravity.GravityKeys", dimensions, 0.006),
+            LazyForm("rgb.form.gravity.GravityKeysMultiNozzle", dimensions, 0.006),
+            LazyForm("rgb.form.sustainobject.RandomWaveShape", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomSolidShape", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomSolidShapeSlowSpectrum", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomIcon", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomWord", dimensions),
+            LazyForm("rgb.form.sustainobject.RandomJapaneseWord", dimensions),
+            LazyForm("rgb.form.sustainobject.TextStars", dimensions),
+            LazyForm("rgb.form.sustainobject.TextSparkles", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.VoronoiDiagram", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.ValueVoronoiDiagram", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.RedSaturationVoronoiDiagram", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.RedValueVoronoiDiagram", dimensions),
+            LazyForm("rgb.form.voronoi_diagram.SparseRedValueVoronoiDiagram", dimensions),
+            # LazyForm("rgb.form.sustainobject.RandomNumber", dimensions),
+            # LazyForm("rgb.form.randomobject.RandomOutlineShape", dimensions),
+            # LazyForm("rgb.form.randomobject.RandomOutlineCircle", dimensions),
+            # LazyForm("rgb.form.basenoise.WhispNoise", dimensions),
+            # LazyForm("rgb.form.basenoise.HueNoise", dimensions),
+            # LazyForm("rgb.form.basenoise.BaseNoise", dimensions),
+            # LazyForm("rgb.form.timer.Timer", dimensions),
+            # LazyForm("rgb.form.audio_spectrogram.AudioSpectrogram", dimensions),
+            # LazyForm("rgb.form.audio_spectrogram.AudioWaterfall", dimensions),
+            # LazyForm("rgb.form.stars.Stars", dimensions),
+            # LazyForm("rgb.form.orbit.Orbit", dimensions, fast_forward_scale=60 * 60 * 24 * 30),
+        ]
     )
 
     display = TkCanvas(dimensions=(32, 64))
@@ -0,0 +1,179 @@
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Tuple
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+
+@dataclass(frozen=True)
+class Tick:
+    index: int
+    # Fixed-dt steps to advance the form by, in order. More than one only when catching up; display the last.
+    steps: Tuple[float, ...]
+    # How long after its deadline this tick was released
+    lateness_s: float
+    # Deadlines skipped since the previous tick
+    skipped: int
+    # [min_quality, 1.0], lowered by the "degrade" policy while frames overrun
+    quality: float
+
+    @property
+    def dt(self) -> float:
+        return sum(self.steps)
+
+
+@dataclass(frozen=True)
+class JitterStats:
+    frames: int
+    overruns: int
+    skipped: int
+    catch_up_steps: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.frames} frames, {self.overruns} overruns ({self.skipped} skipped, {self.catch_up_steps} caught up), "
+            f"lateness p50 {self.p50_ms:.2f}ms p95 {self.p95_ms:.2f}ms p99 {self.p99_ms:.2f}ms max {self.max_ms:.2f}ms"
+        )
+
+
+class FrameScheduler:
+    """
+    Paces a render loop to max_hz against absolute deadlines, t0 + k / max_hz, on a monotonic clock, so that neither
+    per-frame jitter nor wall clock adjustments accumulate (unlike sleeping for the remainder of each frame).
+
+    wait() sleeps until the next deadline, then busy-waits for the last spin_s of it, as sleep() alone routinely
+    oversleeps by a millisecond or more on the Pi. When the loop has fallen a whole period or more behind, the policy
+    decides what the returned Tick asks of it:
+
+    drop:     skip the missed deadlines, stepping once by the time that has passed.
+    catch_up: step once per missed deadline, with the fixed period as dt (up to max_catch_up_steps), displaying only the
+              last. Simulations stay deterministic.
+    degrade:  as drop, and lower Tick.quality (which forms may use to do less work) until frames are on time again.
+    """
+
+    POLICIES = ("drop", "catch_up", "degrade")
+
+    def __init__(
+        self,
+        max_hz: float,
+        policy: str = "drop",
+        spin_s: float = 0.001,
+        max_catch_up_steps: int = 4,
+        min_quality: float = 0.25,
+        history: int = 600,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if policy not in FrameScheduler.POLICIES:
+            raise ValueError(f"Unknown overrun policy {policy}, expected one of {FrameScheduler.POLICIES}")
+        self.policy = policy
+        self.spin_s = spin_s
+        self.max_catch_up_steps = max_catch_up_steps
+        self.min_quality = min_quality
+        self.clock = clock
+        self.sleep = sleep
+        self._max_hz = max_hz
+
+        self.quality = 1.0
+        self.frames = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.catch_up_steps = 0
+        self._lateness: Deque[float] = deque(maxlen=history)
+
+        # Deadline k is _t0 + k * period. None until the first wait().
+        self._t0 = None
+        self._k = 0
+
+    @property
+    def max_hz(self) -> float:
+        return self._max_hz
+
+    @max_hz.setter
+    def max_hz(self, value: float):
+        # Re-anchor the grid on the upcoming deadline, so the change applies from the next frame on
+        if self._t0 is not None:
+            self._t0 = self._deadline(self._k)
+            self._k = 0
+        self._max_hz = value
+
+    @property
+    def period(self) -> float:
+        return 1 / self._max_hz
+
+    def _deadline(self, k: int) -> float:
+        return self._t0 + k * self.period
+
+    def _wait_until(self, deadline: float):
+        remaining = deadline - self.clock()
+        if remaining > self.spin_s:
+            self.sleep(remaining - self.spin_s)
+        while self.clock() < deadline:
+            pass
+
+    def wait(self) -> Tick:
+        if self._t0 is None:
+            self._t0 = self.clock()
+            self._k = 0
+            return self._tick(steps=(self.period,), lateness_s=0.0, skipped=0)
+
+        self._k += 1
+        deadline = self._deadline(self._k)
+        self._wait_until(deadline)
+        lateness = self.clock() - deadline
+        missed = int(math.floor(lateness / self.period)) if lateness > 0 else 0
+        if missed == 0:
+            if self.policy == "degrade":
+                self.quality = min(1.0, self.quality + 0.05)
+            return self._tick(steps=(self.period,), lateness_s=lateness, skipped=0)
+
+        self.overruns += 1
+        # Next frame's deadline is the first one still in the future
+        self._k += missed
+        if self.policy == "catch_up":
+            substeps = min(missed + 1, self.max_catch_up_steps)
+            self.catch_up_steps += substeps - 1
+            self.skipped += missed + 1 - substeps
+            steps = (self.period,) * substeps
+        else:
+            self.skipped += missed
+            steps = ((missed + 1) * self.period,)
+            if self.policy == "degrade":
+                self.quality = max(self.min_quality, self.quality * 0.75)
+        log.debug(f"Frame {self._k} overran by {lateness * 1000:.1f}ms, {self.policy} {missed} frame(s)")
+        return self._tick(steps=steps, lateness_s=lateness, skipped=missed)
+
+    def _tick(self, steps: Tuple[float, ...], lateness_s: float, skipped: int) -> Tick:
+        self.frames += 1
+        self._lateness.append(lateness_s)
+        return Tick(index=self._k, steps=steps, lateness_s=lateness_s, skipped=skipped, quality=self.quality)
+
+    def stats(self) -> JitterStats:
+        """
+        Lateness percentiles are over the most recent history frames; counts are since construction.
+        """
+        lateness_ms = np.array(self._lateness, dtype=np.float64) * 1000 if self._lateness else np.zeros(1)
+        (p50, p95, p99) = np.percentile(lateness_ms, [50, 95, 99])
+        return JitterStats(
+            frames=self.frames,
+            overruns=self.overruns,
+            skipped=self.skipped,
+            catch_up_steps=self.catch_up_steps,
+            mean_ms=float(np.mean(lateness_ms)),
+            p50_ms=float(p50),
+            p95_ms=float(p95),
+            p99_ms=float(p99),
+            max_ms=float(np.max(lateness_ms)),
+        )
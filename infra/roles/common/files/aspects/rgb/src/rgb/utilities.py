@@ -1,8 +1,7 @@
 from dataclasses import dataclass
 from rgb.constants import PAD_INDICES, DIAL_INDICES
 import logging
-import time
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from PIL import ImageFont
 import numpy as np
 import colorsys
@@ -37,16 +36,45 @@ def hsv_to_pixel(h: float, s: float, v: float) -> Tuple[np.uint8, np.uint8, np.u
     return (np.uint8(rgb[0] * 255), np.uint8(rgb[1] * 255), np.uint8(rgb[2] * 255))
 
 
-def loopwait(t_last: float, max_dt: float):
-    # Respecting max_dt, wait for up to
-    now = time.time()
-    total_elapsed_since_last_frame = now - t_last
-    t_last, wait_time = now, max_dt - total_elapsed_since_last_frame
-    if wait_time < 0:
-        log.debug(f"Frame dt exceeded: {wait_time}")
-    else:
-        time.sleep(wait_time)
-    return now, total_elapsed_since_last_frame
+def hsv_to_rgb_array(h: np.ndarray, s: np.ndarray, v: np.ndarray, dtype=np.float32) -> np.ndarray:
+    """
+    Vectorized colorsys.hsv_to_rgb. Inputs broadcast together; returns float [0,1] RGB with a trailing axis of 3.
+    float64 reproduces colorsys exactly, float32 (for whole frames) to within rounding.
+    """
+    h, s, v = np.broadcast_arrays(*(np.asarray(c, dtype=dtype) for c in (h, s, v)))
+    i = (h * 6.0).astype(np.int32)  # Truncation, like colorsys' int()
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i % 6
+    choices = [(v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q)]
+    conditions = [i == n for n in range(6)]
+    return np.stack([np.select(conditions, [c[channel] for c in choices]) for channel in range(3)], axis=-1)
+
+
+def hsv_to_pixels(h: np.ndarray, s: np.ndarray, v: np.ndarray) -> np.ndarray:
+    # Array analogue of hsv_to_pixel, truncating to uint8 the same way.
+    return (hsv_to_rgb_array(h, s, v) * 255).astype(np.uint8)
+
+
+def gamma_lut(gamma: float = 1.0, brightness: float = 1.0) -> np.ndarray:
+    """
+    256-entry uint8 table mapping a channel value to round(255 * brightness * (value / 255) ** gamma).
+    """
+    x = np.arange(256, dtype=np.float64) / 255
+    return np.clip(np.round(255 * brightness * x**gamma), 0, 255).astype(np.uint8)
+
+
+def pack_colors(arr: np.ndarray, lut: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    (..., 3) uint8 RGB to (...) uint32 0x00RRGGBB, as rpi_ws281x's Color() packs it, optionally passing each channel
+    through a gamma_lut() first.
+    """
+    if lut is not None:
+        arr = lut[arr]
+    arr = arr.astype(np.uint32, copy=False)
+    return (arr[..., 0] << 16) | (arr[..., 1] << 8) | arr[..., 2]
 
 
 RESOURCE_PATHS = ["src/rgb/resources/", "rgb/resources/"]
@@ -0,0 +1,121 @@
+"""
+Compact binary encoding of MIDI and clicker messages, an alternative to JSON for publishers on the binary topics
+(by default the JSON topic with BINARY_TOPIC_SUFFIX appended).
+
+Every message is a little-endian struct starting with a kind byte and ending with t_us, the publisher's wall clock in
+integer microseconds since the epoch (wall rather than monotonic time, as publishers run on other hosts):
+
+    note_on, note_off:  kind (B) channel (B) note (B) velocity (B) t_us (Q)
+    control_change:     kind (B) channel (B) control (B) value (B) t_us (Q)
+    pitchwheel:         kind (B) channel (B) pitch (h) t_us (Q)
+    Button, Switch:     kind (B) index (B) state (B) pad (x) t_us (Q)
+    Dial:               kind (B) index (B) pad (xx) state (f) t_us (Q)
+    Spectrum:           kind (B) index (B) count (H) t_us (Q), then count float32
+"""
+
+import logging
+import os
+import struct
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from rgb.events import Event
+from rgb.messages import Button, Dial, Spectrum, Switch
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.environ.get("PYTHON_LOG_LEVEL", "INFO"))
+
+BINARY_TOPIC_SUFFIX = "/bin"
+
+NOTE_ON = 1
+NOTE_OFF = 2
+CONTROL_CHANGE = 3
+PITCHWHEEL = 4
+BUTTON = 16
+SWITCH = 17
+DIAL = 18
+SPECTRUM = 19
+
+MIDI_KINDS = {"note_on": NOTE_ON, "note_off": NOTE_OFF, "control_change": CONTROL_CHANGE, "pitchwheel": PITCHWHEEL}
+MIDI_TYPES = {kind: message_type for message_type, kind in MIDI_KINDS.items()}
+
+# The two data bytes following channel, named per message type
+MIDI_FIELDS = {NOTE_ON: ("note", "velocity"), NOTE_OFF: ("note", "velocity"), CONTROL_CHANGE: ("control", "value")}
+
+MIDI = struct.Struct("<BBBBQ")
+PITCH = struct.Struct("<BBhQ")
+TOGGLE = struct.Struct("<BBBxQ")
+DIAL_STRUCT = struct.Struct("<BBxxfQ")
+SPECTRUM_HEADER = struct.Struct("<BBHQ")
+SPECTRUM_VALUE = np.dtype("<f4")
+
+
+def now_us() -> int:
+    return time.time_ns() // 1000
+
+
+def encode(event: Event, t_us: Optional[int] = None) -> bytes:
+    t_us = now_us() if t_us is None else t_us
+    if isinstance(event, dict):
+        kind = MIDI_KINDS.get(event.get("type"))
+        if kind is None:
+            raise ValueError(f"No binary encoding for MIDI {event.get('type')}")
+        channel = event.get("channel", 0)
+        if kind == PITCHWHEEL:
+            return PITCH.pack(kind, channel, event["pitch"], t_us)
+        (a, b) = MIDI_FIELDS[kind]
+        return MIDI.pack(kind, channel, event[a], event[b], t_us)
+    elif isinstance(event, (Button, Switch)):
+        return TOGGLE.pack(BUTTON if isinstance(event, Button) else SWITCH, event.index, bool(event.state), t_us)
+    elif isinstance(event, Dial):
+        return DIAL_STRUCT.pack(DIAL, event.index, event.state, t_us)
+    elif isinstance(event, Spectrum):
+        values = np.asarray(event.state, dtype=SPECTRUM_VALUE)
+        return SPECTRUM_HEADER.pack(SPECTRUM, event.index, len(values), t_us) + values.tobytes()
+    raise ValueError(f"No binary encoding for {event}")
+
+
+def decode(payload: bytes) -> Event:
+    """
+    The same dict or NamedTuple the JSON path produces. MIDI dicts also carry publish_time, in epoch seconds.
+    """
+    if not payload:
+        raise ValueError("Empty payload")
+    kind = payload[0]
+    try:
+        if kind in MIDI_FIELDS:
+            (_, channel, a, b, t_us) = MIDI.unpack(payload)
+            (name_a, name_b) = MIDI_FIELDS[kind]
+            return {
+                "type": MIDI_TYPES[kind],
+                "time": 0,
+                "channel": channel,
+                name_a: a,
+                name_b: b,
+                "publish_time": t_us / 1e6,
+            }
+        elif kind == PITCHWHEEL:
+            (_, channel, pitch, t_us) = PITCH.unpack(payload)
+            return {"type": "pitchwheel", "time": 0, "channel": channel, "pitch": pitch, "publish_time": t_us / 1e6}
+        elif kind in (BUTTON, SWITCH):
+            (_, index, state, _) = TOGGLE.unpack(payload)
+            return (Button if kind == BUTTON else Switch)(index=index, state=bool(state))
+        elif kind == DIAL:
+            (_, index, state, _) = DIAL_STRUCT.unpack(payload)
+            return Dial(index=index, state=state)
+        elif kind == SPECTRUM:
+            (_, index, count, _) = SPECTRUM_HEADER.unpack_from(payload)
+            if len(payload) != SPECTRUM_HEADER.size + count * SPECTRUM_VALUE.itemsize:
+                raise ValueError(f"Spectrum of {count} values in {len(payload)} bytes")
+            values = np.frombuffer(payload, dtype=SPECTRUM_VALUE, offset=SPECTRUM_HEADER.size)
+            return Spectrum(index=index, state=values.tolist())
+    except struct.error as e:
+        raise ValueError(f"Malformed message of kind {kind}: {e}")
+    raise ValueError(f"Unknown message kind {kind}")
+
+
+def latency_s(event: Dict) -> Optional[float]:
+    # From publish to now, for messages that carry a publish time
+    publish_time = event.get("publish_time")
+    return None if publish_time is None else time.time() - publish_time
@@ -0,0 +1,15 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from rgb.form.baseform import BaseForm
+
+
+@pytest.fixture
+def dials():
+    # BaseForm._dials is class-level, so a test that turns them would otherwise leak into the next
+    saved = list(BaseForm._dials)
+    yield BaseForm._dials
+    BaseForm._dials[:] = saved
@@ -7,6 +7,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import pytest
 from rgb.form.baseform import BaseForm
+from rgb.form.basenoise import BaseNoise, HueNoise, WhispNoise
 from rgb.form.gravity import Gravity, GravityKeys, GravityKeysMultiNozzle
 from rgb.form.orbit import Orbit
 from rgb.form.sustainobject import (
@@ -119,8 +120,16 @@ def test_sustainobject(form):
 
 
 @pytest.mark.parametrize("form", [Orbit])
-def test_orbit(form):
-    f = form((matrix_width, matrix_height), fast_forward_scale=1.0)
+@pytest.mark.parametrize("integrator", ["euler", "leapfrog", "verlet"])
+@pytest.mark.parametrize("fast_forward_scale", [1.0, 60 * 60 * 24 * 365])
+def test_orbit(form, integrator, fast_forward_scale):
+    f = form(
+        (matrix_width, matrix_height),
+        fast_forward_scale=fast_forward_scale,
+        integrator=integrator,
+        asteroids=100,
+        moon=True,
+    )
     drive_event_loop_through_form(f)
 
 
@@ -128,3 +137,9 @@ def test_orbit(form):
 def test_gravity(form):
     f = form((matrix_width, matrix_height), meters_per_pixel=0.006)
     drive_event_loop_through_form(f)
+
+
+@pytest.mark.parametrize("form", [BaseNoise, WhispNoise, HueNoise])
+def test_noise(form):
+    f = form((matrix_width, matrix_height))
+    drive_event_loop_through_form(f)
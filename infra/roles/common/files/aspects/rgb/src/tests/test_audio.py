@@ -0,0 +1,68 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wave
+
+import numpy as np
+import pytest
+from rgb.audio import AudioAnalysis, AudioAnalyzer, WavSource
+from rgb.controlloop import ControlLoop
+from rgb.display.headless import HeadlessDisplay
+from rgb.form.audio_spectrogram import AudioSpectrogram
+from rgb.messages import Spectrum
+
+SAMPLE_RATE = 22050
+HITS_S = [0.25, 0.75, 1.25, 1.75]
+
+
+@pytest.fixture
+def wav_path(tmp_path) -> str:
+    # A quiet 440 Hz tone, with a decaying 60 Hz thump and noise burst at each of HITS_S
+    rng = np.random.default_rng(0)
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    x = 0.3 * np.sin(2 * np.pi * 440 * t)
+    burst = np.arange(400) / SAMPLE_RATE
+    for hit in HITS_S:
+        i = int(hit * SAMPLE_RATE)
+        x[i : i + 400] += 0.9 * np.sin(2 * np.pi * 60 * burst) * np.exp(-burst * 50)
+        x[i : i + 400] += 0.5 * rng.standard_normal(400) * np.exp(-burst * 100)
+    samples = (np.clip(x, -1, 1) * 32767).astype("<i2")
+    path = str(tmp_path / "hits.wav")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(np.stack([samples, samples], axis=1).tobytes())
+    return path
+
+
+def test_spectrum_peaks_at_the_tone_and_hits_are_onsets_and_beats(wav_path):
+    source = WavSource(wav_path, realtime=False)
+    analyzer = AudioAnalyzer(source.sample_rate, hop_size=source.block_size)
+    notes = []
+    for block in source:
+        events = analyzer.process(block)
+        notes.extend((analyzer.t, e["note"]) for e in events if isinstance(e, dict) and e["type"] == "note_on")
+    spectrum = events[0]
+    assert isinstance(spectrum, Spectrum)
+    peak = np.argmax(spectrum.state)
+    assert analyzer.band_lo[peak] <= 440 * analyzer.fft_size / SAMPLE_RATE < analyzer.band_hi[peak]
+    for note in (analyzer.onset_note, analyzer.beat_note):
+        times = [t for (t, n) in notes if n == note]
+        assert len(times) == len(HITS_S)
+        assert np.allclose(times, HITS_S, atol=0.05)
+    # Every note_on was followed by its note_off
+    assert analyzer.pending_offs == []
+
+
+def test_analysis_feeds_the_control_loop(wav_path, dials):
+    loop = ControlLoop(display=HeadlessDisplay((8, 32)), forms=[AudioSpectrogram((8, 32))])
+    analysis = AudioAnalysis(WavSource(wav_path, realtime=False), put=loop.put_event).start()
+    analysis.join(timeout=10)
+    assert loop.events.events_received > 2 * SAMPLE_RATE // 512
+    (dials[0], dials[1]) = (0.0, 1.0)
+    loop.run_frame(1 / 60)
+    assert loop.form.state.max() > 0.5
+    assert loop.display.last_frame().any()
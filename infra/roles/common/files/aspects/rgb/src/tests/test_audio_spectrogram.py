@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import colorsys
+
+import numpy as np
+from rgb.form.audio_spectrogram import AudioSpectrogram, AudioWaterfall
+
+
+def test_stripes_match_per_band_colorsys(dials):
+    # Bands 0 through 15 over 64 rows, four rows each, band 15 at the top
+    dials[0], dials[1], dials[2] = 0.0, 16 / 150, 0.0
+    form = AudioSpectrogram((8, 64))
+    form.state_handler(np.linspace(0, 1, 150))
+    img = np.array(form.step(0.1))
+    for position in range(16):
+        band = 15 - position
+        hue = (position % 12) / 12
+        expected = [np.uint8(255 * c) for c in colorsys.hsv_to_rgb(hue, 1.0, float(form.state[band]))]
+        assert np.abs(img[4 * position : 4 * position + 4].astype(int) - expected).max() <= 1
+
+
+def test_spectrum_is_added_to_the_decayed_state(dials):
+    dials[2], dials[3] = 0.25, 0.0
+    form = AudioSpectrogram((8, 16))
+    form.state_handler(np.full(150, 0.5))
+    form.step(0.1)
+    assert np.allclose(form.state, 0.4)
+    dials[3] = 0.5
+    form.state_handler(np.full(150, 0.8))
+    assert np.allclose(form.state, 1.0)
+
+
+def test_waterfall_scrolls_newest_to_the_right(dials):
+    dials[0], dials[1], dials[2], dials[3] = 0.0, 1.0, 0.0, 0.0
+    form = AudioWaterfall((4, 16))
+    columns = []
+    for level in (0.2, 0.4, 0.6, 0.8, 1.0, 0.1):
+        form.state_handler(np.full(150, level))
+        frame = np.array(form.step(1 / 60))
+        columns.append(form.row_colors())
+        assert np.array_equal(frame[:, -1], columns[-1])
+    assert np.array_equal(frame, np.stack(columns[-4:], axis=1))
+
+
+def test_empty_spectrum_is_ignored(dials):
+    form = AudioSpectrogram((8, 16))
+    state = form.state.copy()
+    form.state_handler([])
+    assert np.array_equal(form.state, state)
+    form.step(1 / 60)
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from rgb.display.basedisplay import FrameDiff, Rect, changed_rect
+
+
+def test_changed_rect():
+    a = np.zeros((8, 16, 3), dtype=np.uint8)
+    b = a.copy()
+    assert changed_rect(a, b) is None
+    b[2, 5, 1] = 1
+    b[4, 9, 0] = 1
+    assert changed_rect(a, b) == Rect(5, 2, 10, 5)
+
+
+def test_double_buffered_dirty_regions():
+    diff = FrameDiff(buffers=2)
+    frames = [np.zeros((8, 16, 3), dtype=np.uint8) for _ in range(3)]
+    frames[1][0, 0] = 255
+    frames[2][0, 0] = 255
+    frames[2][7, 15] = 255
+    assert diff.dirty(frames[0]) == Rect(0, 0, 16, 8)
+    diff.commit(frames[0])
+    # The second canvas has never been drawn into
+    assert diff.dirty(frames[1]) == Rect(0, 0, 16, 8)
+    diff.commit(frames[1])
+    # Drawn into the first canvas, which still holds frames[0]
+    assert diff.dirty(frames[2]) == Rect(0, 0, 16, 8)
+    frames[2][0, 0] = 0
+    assert diff.dirty(frames[2]) == Rect(15, 7, 16, 8)
+    diff.commit(frames[2])
+    assert diff.dirty(frames[2].copy()) is None and diff.frames_skipped == 1
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from rgb.benchmark import FORM_FACTORIES, BenchmarkRun, benchmark_form, find_regressions
+
+
+@pytest.mark.parametrize("name", ["VerticalWaves", "GravityKeys", "Orbit", "Timer"])
+def test_benchmark_form(name):
+    result = benchmark_form(name, FORM_FACTORIES[name], (32, 64), frames=20)
+    assert result.error is None
+    assert result.frames == 20
+    assert 0 < result.p50_ms <= result.p95_ms <= result.p99_ms <= result.max_ms
+    assert result.peak_memory_bytes > 0
+
+
+def test_find_regressions():
+    fast = benchmark_form("Timer", FORM_FACTORIES["Timer"], (32, 64), frames=5)
+    slow = benchmark_form("Timer", FORM_FACTORIES["Timer"], (32, 64), frames=5)
+    slow.p95_ms = fast.p95_ms * 3
+    baseline = BenchmarkRun(created="", python="", machine="", max_hz=60, frames=5, results=[fast])
+    current = BenchmarkRun(created="", python="", machine="", max_hz=60, frames=5, results=[slow])
+    assert len(find_regressions(current, baseline, tolerance=0.5)) == 1
+    assert find_regressions(baseline, baseline, tolerance=0.5) == []
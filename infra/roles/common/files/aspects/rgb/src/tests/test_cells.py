@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+from scipy import ndimage
+from rgb.form.cells import Cells, CellsRun, parse_rule
+
+GLIDER = np.array([[0, 1, 0], [0, 0, 1], [1, 1, 1]], dtype=np.uint8)
+
+
+def test_parse_rule():
+    table = parse_rule("b36/s23")
+    assert list(np.flatnonzero(table[0])) == [3, 6]
+    assert list(np.flatnonzero(table[1])) == [2, 3]
+    with pytest.raises(ValueError):
+        parse_rule("23/3")
+
+
+def test_glider_wraps_around_the_torus():
+    form = Cells((8, 8), density=0.0)
+    form.alive[:3, :3] = GLIDER
+    # A glider moves one cell diagonally every four generations
+    for _ in range(4 * 8):
+        form.generation()
+    assert np.array_equal(form.alive[:3, :3], GLIDER)
+    assert form.alive.sum() == 5
+
+
+def test_gray_scott_laplacian_matches_convolution():
+    form = CellsRun((16, 8))
+    # Life's buffers aren't allocated for Gray-Scott
+    assert not hasattr(form, "alive")
+    a = np.random.random((8, 16)).astype(np.float32)
+    kernel = np.array([[0.05, 0.2, 0.05], [0.2, -1.0, 0.2], [0.05, 0.2, 0.05]], dtype=np.float32)
+    assert np.allclose(form.laplacian(a, np.empty_like(a)), ndimage.convolve(a, kernel, mode="wrap"), atol=1e-6)
+
+
+def test_generations_are_limited_by_the_budget():
+    form = CellsRun((32, 16), budget_fraction=0.0)
+    form.step(1 / 60)
+    # Always at least one, but no more once the budget is spent
+    assert form.generation_count == 1
+    form.budget_fraction = 10.0
+    form.step(1 / 60)
+    assert form.generation_count == 1 + CellsRun.GENERATIONS_PER_S // 60
+
+
+def test_press_seeds_cells():
+    form = CellsRun((32, 16))
+    form.v[...] = 0
+    form.midi_handler({"type": "note_on", "note": 62, "velocity": 100})
+    img = np.array(form.step(1 / 60))
+    assert form.hue == 2 / 12
+    assert img.any()
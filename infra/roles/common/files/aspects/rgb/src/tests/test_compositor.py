@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from rgb.form.compositor import Compositor
+
+
+def draw_with_pil(dimensions, draw):
+    img = Image.new("RGB", dimensions, (0, 0, 0))
+    draw(ImageDraw.Draw(img, "RGBA"))
+    return np.asarray(img).astype(int)
+
+
+@pytest.mark.parametrize("num_sides,rotation", [(3, 0), (4, 45), (5, 123.4), (7, 300)])
+def test_regular_polygon_matches_pil(num_sides, rotation):
+    compositor = Compositor((48, 40))
+    compositor.fill_regular_polygon(20, 18, 11, num_sides, rotation, (255, 0, 0, 255))
+    expected = draw_with_pil((48, 40), lambda d: d.regular_polygon((20, 18, 11), num_sides, rotation, fill=(255, 0, 0)))
+    # Rasterization may differ along the edges (within a diagonal pixel), but nowhere else
+    mismatched = compositor.to_array()[..., 0] != expected[..., 0]
+    edge_distance = compositor.polygon_field(20, 18, num_sides, rotation) - 11 * np.cos(np.pi / num_sides)
+    assert np.all(np.abs(edge_distance[mismatched]) <= np.sqrt(2))
+
+
+def test_nested_polygons_match_sequential_blends():
+    radii = np.array([4, 7, 10, 13])
+    alphas = np.array([1.0, 0.75, 0.5, 0.25])
+    nested = Compositor((32, 32))
+    nested.nested_regular_polygons(16, 16, radii, alphas, 5, 30, (0, 200, 100, 200))
+    sequential = Compositor((32, 32))
+    for r, a in zip(radii, alphas):
+        sequential.fill_regular_polygon(16, 16, r, 5, 30, (0, 200, 100, int(200 * a)))
+    assert np.abs(nested.frame - sequential.frame).max() < 1.5
+
+
+def test_column_falloff_matches_pil():
+    scales = np.linspace(1.0, 0.0, 6, endpoint=False)
+    color = (255, 127, 0, 180)
+    compositor = Compositor((32, 8))
+    compositor.column_falloff(3, 6, color, scales)
+
+    def draw(d):
+        d.rectangle((3, 0, 6, 8), fill=color)
+        for i, scale in enumerate(scales):
+            for x in (3 - i, 6 + i):
+                if 0 <= x < 32:
+                    d.rectangle((x, 0, x, 8), fill=color[:3] + (int(color[3] * scale),))
+
+    assert np.abs(compositor.to_array().astype(int) - draw_with_pil((32, 8), draw)).max() <= 2
+
+
+def test_additive_saturates():
+    compositor = Compositor((8, 8), blend_mode="additive")
+    compositor.fill_columns(0, 7, (200, 0, 0, 255))
+    compositor.fill_circle(4, 4, 2, (200, 100, 0, 255))
+    frame = compositor.to_array()
+    assert frame[4, 4, 0] == 255 and frame[4, 4, 1] == 100
+    assert frame[0, 0, 0] == 200 and frame[0, 0, 1] == 0
+    with pytest.raises(ValueError):
+        Compositor((8, 8), blend_mode="multiply")
@@ -0,0 +1,72 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+
+from rgb.controlloop import ControlLoop
+from rgb.display.headless import HeadlessDisplay
+from rgb.events import EventQueue, coalesce
+from rgb.form.baseform import BaseForm
+from rgb.form.sustainobject import VerticalNotes
+from rgb.messages import Button, Dial
+
+
+def cc(control: int, value: int) -> dict:
+    return {"type": "control_change", "control": control, "value": value, "channel": 0}
+
+
+def note(kind: str, n: int) -> dict:
+    return {"type": kind, "note": n, "velocity": 100, "channel": 0}
+
+
+def test_coalesce_keeps_latest_controls_and_every_note():
+    batch = [
+        cc(14, 1),
+        note("note_on", 40),
+        cc(14, 2),
+        {"type": "pitchwheel", "pitch": 10, "channel": 0},
+        cc(64, 127),
+        note("note_off", 40),
+        cc(64, 0),
+        Dial(index=0, state=0.1),
+        Button(index=1, state=True),
+        {"type": "pitchwheel", "pitch": 20, "channel": 0},
+        Dial(index=0, state=0.9),
+        Button(index=1, state=False),
+        cc(14, 3),
+    ]
+    assert coalesce(batch) == [
+        note("note_on", 40),
+        cc(64, 127),
+        note("note_off", 40),
+        cc(64, 0),
+        Button(index=1, state=True),
+        {"type": "pitchwheel", "pitch": 20, "channel": 0},
+        Dial(index=0, state=0.9),
+        Button(index=1, state=False),
+        cc(14, 3),
+    ]
+
+
+def test_queue_is_filled_from_another_thread():
+    queue = EventQueue()
+    writers = [threading.Thread(target=lambda: [queue.put(cc(14, v % 128)) for v in range(1000)]) for _ in range(4)]
+    for w in writers:
+        w.start()
+    drained = []
+    while any(w.is_alive() for w in writers) or len(queue):
+        drained.extend(queue.drain())
+    assert len(drained) == queue.events_received == 4000
+
+
+def test_control_loop_drains_a_sweep_in_one_frame(dials):
+    loop = ControlLoop(display=HeadlessDisplay((16, 8)), forms=[VerticalNotes((16, 8))])
+    for value in range(128):
+        loop.events.put(cc(14, value))
+    loop.events.put(note("note_on", 42))
+    loop.run_frame(1 / 60)
+    assert len(loop.events) == 0
+    assert BaseForm.dials(0) == 1.0
+    assert 42 in loop.form.presses()
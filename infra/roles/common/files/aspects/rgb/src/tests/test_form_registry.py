@@ -0,0 +1,80 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from functools import partial
+
+import numpy as np
+from rgb.controlloop import ControlLoop
+from rgb.display.headless import HeadlessDisplay
+from rgb.form.baseform import BaseForm
+from rgb.form.registry import FormRegistry, LazyForm, factory_name
+from rgb.form.sustainobject import VerticalNotes
+
+DIMENSIONS = (16, 8)
+
+
+class Blank(BaseForm):
+    constructed = 0
+
+    def __init__(self, dimensions, payload_bytes: int = 0):
+        super().__init__(dimensions)
+        Blank.constructed += 1
+        self.payload = np.ones(payload_bytes, dtype=np.uint8)
+        self.cleaned_up = False
+
+    def step(self, dt):
+        return self.framebuffer
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+def test_forms_are_constructed_when_selected():
+    Blank.constructed = 0
+    loop = ControlLoop(
+        display=HeadlessDisplay(DIMENSIONS), forms=FormRegistry([partial(Blank, DIMENSIONS) for _ in range(10)])
+    )
+    assert Blank.constructed == 0
+    loop.run_frame(1 / 60)
+    assert Blank.constructed == 1
+    loop.next_form(True)
+    loop.previous_form(True)
+    loop.run_frame(1 / 60)
+    assert Blank.constructed == 2
+    assert loop.forms.construction_s.keys() == {0, 1}
+
+
+def test_least_recently_used_forms_are_dropped():
+    registry = FormRegistry([partial(Blank, DIMENSIONS) for _ in range(4)], max_live=2)
+    first = registry.get(0)
+    registry.get(1)
+    registry.get(0)
+    second = registry.live[1]
+    registry.get(2)
+    assert list(registry.live) == [0, 2]
+    assert second.cleaned_up and not first.cleaned_up
+    assert registry.get(1) is not second
+
+
+def test_memory_budget_keeps_at_least_the_current_form():
+    registry = FormRegistry(
+        [partial(Blank, DIMENSIONS, payload_bytes=1_000_000) for _ in range(3)],
+        max_live=None,
+        memory_budget_bytes=2_500_000,
+    )
+    for index in range(3):
+        registry.get(index)
+    assert registry.live_bytes[2] >= 1_000_000
+    assert list(registry.live) == [1, 2]
+    registry.memory_budget_bytes = 1
+    registry.get(0)
+    assert list(registry.live) == [0]
+
+
+def test_lazy_form_imports_on_construction():
+    factory = LazyForm("rgb.form.sustainobject.VerticalNotes", DIMENSIONS)
+    assert factory_name(factory) == "VerticalNotes"
+    assert factory_name(partial(Blank, DIMENSIONS)) == "Blank"
+    assert isinstance(factory(), VerticalNotes)
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from PIL import Image
+from rgb.form.gravity import Gravity
+from rgb.form.sustainobject import VerticalNotes
+from rgb.framebuffer import FrameBuffer, frame_array
+
+
+def test_flipped_view_is_zero_copy():
+    fb = FrameBuffer((4, 3), flipped=True)
+    fb.array[0] = 255  # Bottom row
+    view = frame_array(fb)
+    assert np.shares_memory(view, fb.array)
+    assert view[2].all() and not view[:2].any()
+    assert np.array_equal(np.asarray(fb), view) and fb.shape == (3, 4, 3)
+
+
+def test_frame_array_accepts_every_frame_type():
+    arr = np.random.default_rng(0).integers(0, 256, size=(3, 4, 3), dtype=np.uint8)
+    assert frame_array(arr) is arr
+    assert np.array_equal(frame_array(Image.fromarray(arr)), arr)
+    assert np.array_equal(frame_array(Image.fromarray(arr).convert("RGBA")), arr)
+
+
+def test_forms_reuse_their_framebuffer():
+    for form in (Gravity((16, 8), meters_per_pixel=0.006), VerticalNotes((16, 8))):
+        form.midi_handler({"type": "note_on", "note": 42, "velocity": 100})
+        first = form.step(1 / 60)
+        assert isinstance(first, FrameBuffer)
+        assert form.step(1 / 60) is first
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from rgb.form.glyphatlas import GlyphAtlas
+
+
+def test_atlas_is_bounded():
+    atlas = GlyphAtlas(max_bytes=16 * 1024)
+    for size in range(8, 64):
+        atlas.get("★", "DejaVuSans.ttf", size)
+    assert atlas.nbytes <= 16 * 1024
+    assert 0 < len(atlas) < 56
+    atlas.get("★", "DejaVuSans.ttf", 63)
+    assert atlas.hits == 1
+
+
+
+def test_coverage_is_converted_once():
+    atlas = GlyphAtlas()
+    glyph = atlas.get("W", "DejaVuSans.ttf", 24)
+    assert glyph.coverage.dtype == np.float32
+    assert glyph.coverage.max() == 1.0
+    assert atlas.get("W", "DejaVuSans.ttf", 24).coverage is glyph.coverage
@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from rgb.form.gravity import Gravity, ParticleStore
+
+
+def test_swap_remove_keeps_survivors():
+    p = ParticleStore(capacity=8)
+    p.add(x=np.arange(6), y=0, vx=0, vy=0, hue=0.5, jitter=1)
+    p.remove(np.array([True, False, False, True, False, True]))
+    assert len(p) == 3
+    assert sorted(p.x[: len(p)]) == [1, 2, 4]
+
+
+def test_births_beyond_capacity_are_dropped():
+    p = ParticleStore(capacity=4)
+    p.add(x=np.zeros(10), y=0, vx=0, vy=0, hue=0.0, jitter=1)
+    assert len(p) == 4
+
+
+def test_large_population():
+    g = Gravity((64, 64), meters_per_pixel=0.006, population=Gravity.MAX_POPULATION)
+    for _ in range(120):
+        img = g.step(1 / 60)
+    assert len(g.particles) > 512
+    assert np.array(img).any()
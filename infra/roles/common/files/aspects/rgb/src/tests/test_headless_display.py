@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+from rgb.controlloop import ControlLoop
+from rgb.display.headless import HeadlessDisplay, read_recording
+from rgb.form import sustainobject
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self) -> float:
+        self.now += 0.02
+        return self.now
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((4, 8, 3), value, dtype=np.uint8)
+
+
+def test_ring_keeps_the_latest_frames():
+    display = HeadlessDisplay((8, 4), capacity=3, clock=FakeClock())
+    for i in range(5):
+        display.display(frame(i))
+    assert [f[0, 0, 0] for f in display.frames()] == [2, 3, 4]
+    assert display.timestamps() == pytest.approx([0.04, 0.06, 0.08])
+    assert display.last_frame()[0, 0, 0] == 4
+
+
+@pytest.mark.parametrize("extension", [".raw", ".npz", ".png"])
+def test_recording_round_trip(tmp_path, extension):
+    path = str(tmp_path / f"show{extension}")
+    with HeadlessDisplay((8, 4), capacity=2, record_to=path, clock=FakeClock()) as display:
+        for i in range(6):
+            display.display(frame(i * 10))
+    (timestamps, frames) = read_recording(path)
+    assert [f[0, 0, 0] for f in frames] == [0, 10, 20, 30, 40, 50]
+    assert timestamps == pytest.approx([0.0, 0.02, 0.04, 0.06, 0.08, 0.1])
+    assert not os.path.exists(f"{path}.partial")
+
+
+def test_unthrottled_control_loop():
+    with HeadlessDisplay((16, 8)) as display:
+        loop = ControlLoop(display=display, forms=[sustainobject.VerticalNotes((16, 8))])
+        loop.form.midi_handler({"type": "note_on", "note": 42, "velocity": 100})
+        loop.unthrottled_loop(30)
+        assert display.frames_displayed == 30 and display.last_frame().any()
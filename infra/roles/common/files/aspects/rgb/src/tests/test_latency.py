@@ -0,0 +1,125 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+
+import numpy as np
+import pytest
+
+from rgb import wire
+from rgb.controlloop import ControlLoop
+from rgb.display.basedisplay import BaseDisplay
+from rgb.display.headless import HeadlessDisplay
+from rgb.display.threaded import ThreadedDisplay
+from rgb.form.sustainobject import VerticalNotes
+from rgb.latency import LatencyHistogram, LatencyTracer, read_time
+
+
+class FakeClock:
+    def __init__(self, t: float = 0.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def test_histogram_percentiles_within_a_bucket():
+    histogram = LatencyHistogram()
+    samples = np.linspace(0.001, 0.1, 1000)
+    for s in samples:
+        histogram.record(s)
+    for q in (50, 95, 99):
+        exact = np.percentile(samples, q)
+        assert exact <= histogram.percentile(q) <= exact * 10 ** (1 / LatencyHistogram.BUCKETS_PER_DECADE) * 1.001
+    assert histogram.max_s == pytest.approx(0.1)
+    assert histogram.mean_s == pytest.approx(samples.mean())
+
+
+def test_read_time_of_json_and_binary_midi():
+    assert read_time({"type": "note_on", "midi_read_time": "2023-01-01T00:00:01.500000"}) == 1672531201.5
+    assert read_time(wire.decode(wire.encode({"type": "note_on", "note": 1, "velocity": 1}, t_us=2_500_000))) == 2.5
+    assert read_time({"type": "note_on"}) is None
+
+
+def test_tracer_records_each_stage():
+    clock, wall = FakeClock(100.0), FakeClock(1000.0)
+    tracer = LatencyTracer(budget_s=0.015, clock=clock, wall_clock=wall)
+    trace = tracer.received({"type": "note_on", "publish_time": 999.998})
+    clock.t += 0.004
+    tracer.dequeued([trace])
+    clock.t += 0.003
+    tracer.rendered([trace])
+    clock.t += 0.010
+    tracer.displayed([trace])
+
+    expected = {"transport": 0.002, "queue": 0.004, "render": 0.003, "display": 0.010, "total": 0.019}
+    for (stage, seconds) in expected.items():
+        assert tracer.histograms[stage].count == 1
+        assert tracer.histograms[stage].max_s == pytest.approx(seconds)
+    assert tracer.over_budget == 1
+    tracer.reset()
+    assert tracer.histograms["total"].count == 0
+
+
+def test_reports_lose_no_events_recorded_from_another_thread():
+    tracer = LatencyTracer()
+    traces = []
+    for _ in range(10):
+        trace = tracer.received({"type": "note_on"})
+        tracer.dequeued([trace])
+        tracer.rendered([trace])
+        traces.append(trace)
+
+    def worker():
+        for _ in range(500):
+            tracer.displayed(traces)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    reported = []
+    while thread.is_alive():
+        reported.append(tracer.report())
+    thread.join()
+    reported.append(tracer.report())
+    assert sum(int(summary.split()[0]) for summary in reported) == 500 * len(traces)
+
+
+def test_threaded_display_carries_callbacks_of_dropped_frames():
+    release = threading.Event()
+
+    class Slow(BaseDisplay):
+        def __init__(self):
+            super().__init__((4, 4))
+
+        def display(self, image):
+            release.wait()
+
+    displayed = []
+    with ThreadedDisplay(Slow(), buffers=2) as threaded:
+        # The first is taken by the worker; each later one replaces the one waiting behind it
+        for i in range(4):
+            threaded.display_then(np.zeros((4, 4, 3), dtype=np.uint8), lambda i=i: displayed.append(i))
+        release.set()
+        assert threaded.flush(timeout=5)
+    assert threaded.frames_dropped == 2
+    assert sorted(displayed) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_control_loop_traces_events_to_the_display(pipelined, dials):
+    tracer = LatencyTracer()
+    loop = ControlLoop(
+        display=HeadlessDisplay((16, 8)), forms=[VerticalNotes((16, 8))], pipelined=pipelined, tracer=tracer
+    )
+    for value in range(10):
+        loop.put_event({"type": "control_change", "control": 14, "value": value, "channel": 0})
+    loop.put_event({"type": "note_on", "note": 42, "velocity": 100, "channel": 0})
+    loop.run_frame(1 / 60)
+    if pipelined:
+        assert loop.display.flush(timeout=5)
+        loop.display.close()
+    # The superseded control changes aren't traced
+    assert tracer.histograms["total"].count == 2
+    assert tracer.histograms["transport"].count == 0
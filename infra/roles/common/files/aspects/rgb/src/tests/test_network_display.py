@@ -0,0 +1,100 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+from rgb.display.basedisplay import BaseDisplay
+from rgb.display.network import FrameReceiver, UdpStreamDisplay, decode_rle, encode_rle
+
+
+class RecordingDisplay(BaseDisplay):
+    def __init__(self, dimensions):
+        super().__init__(dimensions)
+        self.frames = []
+
+    def display(self, image):
+        self.frames.append(np.array(image))
+
+
+def frames(count: int, width: int = 32, height: int = 16):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    for i in range(count):
+        frame = frame.copy()
+        frame[i % height, : width // 2] = i  # A little motion over a static background
+        yield frame
+
+
+def test_rle_round_trip():
+    pixels = np.zeros((500, 3), dtype=np.uint8)
+    pixels[100:150] = (1, 2, 3)
+    pixels[-1] = 255
+    payload = encode_rle(pixels)
+    assert len(payload) == 4 * 5
+    assert np.array_equal(decode_rle(payload, 500), pixels)
+    with pytest.raises(ValueError):
+        decode_rle(payload, 499)
+
+
+@pytest.mark.parametrize("compression", ["raw", "rle", "delta"])
+def test_loopback(compression):
+    local = RecordingDisplay((32, 16))
+    receiver = FrameReceiver(local, host="127.0.0.1", port=0)
+    sender = UdpStreamDisplay((32, 16), "127.0.0.1", receiver.port, compression=compression, max_datagram_bytes=512)
+    try:
+        sent = list(frames(10))
+        for frame in sent:
+            sender.display(frame)
+            shown = len(local.frames)
+            while len(local.frames) == shown:
+                assert receiver.receive(timeout=1.0)
+        assert receiver.bands_discarded == 0
+        assert len(local.frames) == len(sent)
+        assert all(np.array_equal(a, b) for a, b in zip(local.frames, sent))
+        if compression == "delta":
+            assert sender.bytes_sent < 0.5 * 10 * 32 * 16 * 3
+    finally:
+        sender.close()
+        receiver.close()
+
+
+def test_lost_band_waits_for_keyframe():
+    local = RecordingDisplay((32, 16))
+    receiver = FrameReceiver(local, host="127.0.0.1", port=0)
+    sender = UdpStreamDisplay((32, 16), "127.0.0.1", receiver.port, keyframe_interval=4, max_datagram_bytes=512)
+    sent = list(frames(8))
+    for i, frame in enumerate(sent):
+        datagrams = sender.encode(frame, keyframe=i % 4 == 0)
+        sender.previous = frame
+        sender.sequence += 1
+        for j, datagram in enumerate(datagrams):
+            if i == 1 and j == 0:
+                continue  # Lost
+            receiver.handle(datagram)
+    # Deltas against the lost band are refused, leaving it stale, until the keyframe at frame 4
+    assert receiver.bands_discarded == 2
+    assert not np.array_equal(local.frames[3], sent[3])
+    assert all(np.array_equal(a, b) for a, b in zip(local.frames[4:], sent[4:]))
+    receiver.close()
+    sender.close()
+
+
+def test_loopback_to_a_strip():
+    # As LedStrip: one row, its length kept apart from height
+    strip = RecordingDisplay((40, 1))
+    strip.pixel_count = 40
+    receiver = FrameReceiver(strip, host="127.0.0.1", port=0)
+    sender = UdpStreamDisplay((40, 1), "127.0.0.1", receiver.port)
+    try:
+        sent = list(frames(3, width=40, height=1))
+        for frame in sent:
+            sender.display(frame)
+            assert receiver.receive(timeout=1.0)
+        assert receiver.bands_discarded == 0
+        assert all(np.array_equal(a, b) for a, b in zip(strip.frames, sent))
+        assert len(strip.frames) == len(sent)
+    finally:
+        sender.close()
+        receiver.close()
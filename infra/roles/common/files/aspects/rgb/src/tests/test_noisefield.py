@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+from noise import pnoise3, snoise3
+from rgb.form.basenoise import NoiseKey
+from rgb.form.noisefield import pnoise3_array, snoise3_array
+
+
+@pytest.mark.parametrize("array_function,scalar_function", [(pnoise3_array, pnoise3), (snoise3_array, snoise3)])
+@pytest.mark.parametrize("octaves", [1, 4, 9])
+@pytest.mark.parametrize("persistence", [0.0001, 0.25, 1.0])
+def test_matches_noise_package(array_function, scalar_function, octaves, persistence):
+    rng = np.random.default_rng(octaves)
+    xs = rng.uniform(-40, 40, 200)
+    ys = rng.uniform(-40, 40, 200)
+    z = 3.7
+    actual = array_function(xs, ys, z, octaves=octaves, persistence=persistence)
+    expected = [scalar_function(x, y, z, octaves=octaves, persistence=persistence) for x, y in zip(xs, ys)]
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+def test_grid_shape():
+    ys, xs = np.mgrid[0:64, 0:32]
+    assert pnoise3_array(ys * 0.1, xs * 0.1, 0.5, octaves=3).shape == (64, 32)
+
+
+def test_noise_key_averages_presses_into_its_framebuffer():
+    form = NoiseKey((16, 8))
+    assert form.step(1 / 60) is form.framebuffer
+    assert not np.array(form.framebuffer).any()
+    form.t_start -= 1.0
+    for note in (40, 47):
+        form.midi_handler({"type": "note_on", "note": note, "velocity": 100})
+    assert form.step(1 / 60) is form.framebuffer
+    # The average of two greys is grey
+    img = np.array(form.framebuffer)
+    assert (img[..., 0] == img[..., 2]).all()
+    assert img.any()
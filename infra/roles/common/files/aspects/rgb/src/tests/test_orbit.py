@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+from rgb.form.orbit import EARTH_PERIHELION_METERS, GRAVITATIONAL_CONSTANT, NBody, Orbit
+
+YEAR_S = 365.25 * 24 * 60 * 60
+DIMENSIONS = (32, 64)
+
+
+def energy(system: NBody) -> float:
+    # Of the attractors, with the engine's softened potential; massless bodies carry none
+    (a, m) = (system.attractors, system.mass[system.attractors])
+    kinetic = 0.5 * np.sum(m * np.sum(system.velocity[a] ** 2, axis=1))
+    d = system.position[a, np.newaxis, :] - system.position[np.newaxis, a, :]
+    r = np.sqrt(np.sum(d ** 2, axis=-1) + system.softening_squared)
+    pairs = np.triu(np.ones((len(a), len(a)), dtype=bool), k=1)
+    potential = -np.sum((GRAVITATIONAL_CONSTANT * m[:, np.newaxis] * m[np.newaxis, :] / r)[pairs])
+    return kinetic + potential
+
+
+def run(system: NBody, seconds: float, h: float = Orbit.MAX_SUBSTEP_S):
+    for _ in range(int(round(seconds / h))):
+        system.advance(h)
+
+
+@pytest.mark.parametrize("integrator", ["leapfrog", "verlet"])
+def test_energy_drift_is_bounded(integrator):
+    system = Orbit(DIMENSIONS, fast_forward_scale=1, integrator=integrator).system
+    e0 = energy(system)
+    run(system, 10 * YEAR_S)
+    assert abs(energy(system) - e0) / abs(e0) < 1e-6
+
+
+@pytest.mark.parametrize("integrator", NBody.INTEGRATORS)
+def test_earth_returns_after_a_year(integrator):
+    form = Orbit(DIMENSIONS, fast_forward_scale=1, integrator=integrator)
+    earth = [b.name for b in form.bodies].index("Earth")
+    start = form.system.position[earth].copy()
+    run(form.system, YEAR_S)
+    assert np.hypot(*(form.system.position[earth] - start)) < 0.01 * EARTH_PERIHELION_METERS
+
+
+def test_asteroids_do_not_move_the_attractors():
+    plain = Orbit(DIMENSIONS, fast_forward_scale=1).system
+    belt = Orbit(DIMENSIONS, fast_forward_scale=1, asteroids=200).system
+    assert len(belt.attractors) == len(plain.attractors)
+    run(plain, YEAR_S / 4)
+    run(belt, YEAR_S / 4)
+    assert np.array_equal(belt.position[belt.attractors], plain.position[plain.attractors])
+    assert np.array_equal(belt.velocity[belt.attractors], plain.velocity[plain.attractors])
@@ -0,0 +1,72 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from rgb.scheduler import FrameScheduler
+
+
+class FakeClock:
+    """
+    Time only moves when slept through, or when a frame's work is simulated with advance().
+    """
+
+    def __init__(self, oversleep_s: float = 0.0):
+        self.now = 100.0
+        self.oversleep_s = oversleep_s
+
+    def __call__(self) -> float:
+        # Each read of the clock costs a little, so busy-waits terminate
+        self.now += 1e-5
+        return self.now
+
+    def sleep(self, s: float):
+        self.now += s + self.oversleep_s
+
+    def advance(self, s: float):
+        self.now += s
+
+
+def scheduler(clock: FakeClock, **kwargs) -> FrameScheduler:
+    return FrameScheduler(60, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_deadlines_do_not_drift():
+    clock = FakeClock(oversleep_s=0.0007)
+    s = scheduler(clock)
+    start = s.wait()
+    for _ in range(600):
+        clock.advance(0.004)  # Work
+        tick = s.wait()
+        assert tick.steps == (1 / 60,)
+    # 600 frames later, to within the busy-wait's resolution, despite every sleep overshooting
+    assert clock.now - 100.0 == pytest.approx(600 / 60, abs=1e-3)
+    assert s.stats().overruns == 0 and s.stats().max_ms < 0.1
+    assert start.index == 0 and tick.index == 600
+
+
+@pytest.mark.parametrize("policy", FrameScheduler.POLICIES)
+def test_overrun_policies(policy):
+    clock = FakeClock()
+    s = scheduler(clock, policy=policy, max_catch_up_steps=3)
+    s.wait()
+    clock.advance(3.5 / 60)  # A frame that takes three and a half periods, missing the deadlines at 1 and 2
+    tick = s.wait()
+    assert tick.index == 3 and tick.skipped == 2
+    if policy == "catch_up":
+        assert tick.steps == pytest.approx((1 / 60,) * 3)
+    else:
+        assert tick.steps == pytest.approx((3 / 60,))
+    if policy == "degrade":
+        assert tick.quality < 1.0
+    else:
+        assert tick.quality == 1.0
+    # Back on the grid
+    assert s.wait().index == 4
+    assert s.stats().overruns == 1
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        FrameScheduler(60, policy="panic")
@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import colorsys
+
+import numpy as np
+from rgb.form.stars import Stars
+
+
+def test_render_matches_per_star_colorsys():
+    s = Stars((32, 16), population=8)
+    s.x[:] = (np.arange(8) * 4 + 1) / 32
+    s.y[:] = 0.25
+    s.lifespan[:] = np.linspace(2, 9, 8)
+    img = np.array(s.step(1.0))
+    for i in range(8):
+        (x, y) = (round(32 * s.x[i]), round(16 * s.y[i]))
+        luminance = (s.t - s.born[i]) / s.lifespan[i]
+        hue = colorsys.rgb_to_hsv(*s.rgb[i])[0]
+        expected = [np.uint8(255 * c) for c in colorsys.hsv_to_rgb(hue, 1.0, luminance)]
+        assert np.abs(img[y, x].astype(int) - expected).max() <= 1
+
+
+def test_dead_stars_respawn_in_place():
+    s = Stars((64, 64), population=4096)
+    s.lifespan[:100] = 0.5
+    s.step(1.0)
+    assert np.all(s.born[:100] == 1.0)
+    assert np.all(s.t - s.born <= s.lifespan)
+    assert len(s.x) == 4096
@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import colorsys
+
+import numpy as np
+from rgb.form.keyawareform import Press
+from rgb.form.sustainobject import PressBatch, RandomVerticalWaveReverseSlow, compute_envelope, compute_envelopes
+
+
+def test_envelopes_match_scalar():
+    dt = np.array([0.0, 0.01, 0.2, 0.4, 2.0])
+    dt_released = np.array([np.nan, 0.005, np.nan, 0.3, 1.0])
+    batched = compute_envelopes(dt, dt_released, 0.5, 0.4)
+    for i in range(len(dt)):
+        released = None if np.isnan(dt_released[i]) else dt_released[i]
+        assert batched[i] == compute_envelope(dt[i], released, 0.5, 0.4)
+
+
+def test_colors_are_evaluated_once_per_frame():
+    form = RandomVerticalWaveReverseSlow((32, 16))
+    presses = [Press(note=note, velocity=1.0, t=100.0) for note in (30, 47, 64)]
+    form.evaluate_colors(presses, now=100.1)
+    for p in presses:
+        hue = form.calculate_hue(p)
+        expected = tuple(int(255 * c) for c in colorsys.hsv_to_rgb(hue, 1.0, 1.0)) + (255,)
+        assert form.calculate_color(p) == expected
+    assert len(form.calculate_colors(PressBatch.of(presses), now=100.1)) == 3
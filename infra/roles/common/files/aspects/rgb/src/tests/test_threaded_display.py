@@ -0,0 +1,80 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import time
+
+import numpy as np
+import pytest
+from rgb.controlloop import ControlLoop
+from rgb.display.basedisplay import BaseDisplay
+from rgb.display.threaded import ThreadedDisplay
+from rgb.form import sustainobject
+
+
+class RecordingDisplay(BaseDisplay):
+    def __init__(self, dimensions, delay_s: float = 0.0):
+        super().__init__(dimensions)
+        self.delay_s = delay_s
+        self.frames = []
+        self.threads = set()
+
+    def display(self, image):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay_s)
+        self.frames.append(np.array(image))
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((4, 8, 3), value, dtype=np.uint8)
+
+
+def test_frames_are_shown_in_order_off_thread():
+    inner = RecordingDisplay((8, 4))
+    with ThreadedDisplay(inner, drop_stale=False) as display:
+        for i in range(10):
+            display.display(frame(i))
+        assert display.flush(timeout=5)
+    assert [f[0, 0, 0] for f in inner.frames] == list(range(10))
+    assert threading.get_ident() not in inner.threads
+
+
+def test_slow_display_drops_stale_frames():
+    inner = RecordingDisplay((8, 4), delay_s=0.02)
+    with ThreadedDisplay(inner) as display:
+        source = frame(0)
+        for i in range(20):
+            # Writing to the array after handing it over doesn't affect what's shown
+            source[:] = i
+            display.display(source)
+        assert display.flush(timeout=5)
+    shown = [f[0, 0, 0] for f in inner.frames]
+    assert display.frames_dropped > 0
+    assert shown == sorted(shown) and shown[-1] == 19
+    assert display.frames_displayed + display.frames_dropped == 20
+
+
+def test_display_errors_are_raised_on_the_caller():
+    class BrokenDisplay(RecordingDisplay):
+        def display(self, image):
+            raise OSError("panel unplugged")
+
+    with ThreadedDisplay(BrokenDisplay((8, 4))) as display:
+        display.display(frame(0))
+        display.flush(timeout=5)
+        with pytest.raises(OSError):
+            display.display(frame(1))
+
+
+def test_pipelined_control_loop():
+    inner = RecordingDisplay((16, 8))
+    loop = ControlLoop(display=inner, forms=[sustainobject.VerticalNotes((16, 8))], pipelined=True)
+    loop.form.midi_handler({"type": "note_on", "note": 42, "velocity": 100})
+    for _ in range(5):
+        loop.run_frame(1 / loop.max_hz)
+    assert loop.display.flush(timeout=5)
+    loop.display.close()
+    assert 1 <= len(inner.frames) <= 5
+    assert inner.frames[-1].shape == (8, 16, 3) and inner.frames[-1].any()
@@ -0,0 +1,68 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+
+import numpy as np
+import pytest
+from rgb.display.basedisplay import BaseDisplay
+from rgb.display.tiled import Tile, TiledDisplay
+
+
+class RecordingDisplay(BaseDisplay):
+    def __init__(self, dimensions):
+        super().__init__(dimensions)
+        self.frames = []
+        self.threads = set()
+
+    def display(self, image):
+        self.threads.add(threading.get_ident())
+        self.frames.append(np.array(image))
+
+
+def canvas(width: int, height: int) -> np.ndarray:
+    # Every pixel distinct: red is x, green is y
+    ys, xs = np.mgrid[0:height, 0:width]
+    return np.stack([xs, ys, np.full_like(xs, 7)], axis=-1).astype(np.uint8)
+
+
+def test_panels_and_strip_share_a_canvas():
+    left, right = RecordingDisplay((8, 4)), RecordingDisplay((8, 4))
+    strip = RecordingDisplay((10, 1))
+    tiles = [
+        Tile.region(left, 0, 0),
+        Tile.region(right, 8, 0, flip_x=True, flip_y=True),
+        Tile.serpentine(strip, 0, 4, 4, 2),
+    ]
+    frame = canvas(16, 6)
+    with TiledDisplay((16, 6), tiles) as display:
+        display.display(frame)
+        display.display(frame.copy())  # Unchanged: not sent again
+        assert display.flush(timeout=5)
+    assert [len(d.frames) for d in (left, right, strip)] == [1, 1, 1]
+    assert np.array_equal(left.frames[0], frame[0:4, 0:8])
+    assert np.array_equal(right.frames[0], frame[0:4, 8:16][::-1, ::-1])
+    shown = strip.frames[0].reshape(-1, 3)
+    assert [tuple(p[:2]) for p in shown[:8]] == [(0, 4), (1, 4), (2, 4), (3, 4), (3, 5), (2, 5), (1, 5), (0, 5)]
+    assert not shown[8:].any()
+    assert threading.get_ident() not in left.threads | right.threads | strip.threads
+
+
+def test_tiles_must_fit():
+    with pytest.raises(ValueError):
+        TiledDisplay((8, 4), [Tile.region(RecordingDisplay((8, 4)), 4, 0)], threaded=False)
+
+
+def test_strip_tile_is_one_row():
+    # As LedStrip: one row, its length kept apart from height
+    strip = RecordingDisplay((12, 1))
+    strip.pixel_count = 12
+    region = Tile.region(strip, 2, 3)
+    assert region.xs.shape == (1, 12)
+    assert Tile.serpentine(strip, 0, 0, 6, 2).xs.shape == (1, 12)
+    frame = canvas(16, 6)
+    with TiledDisplay((16, 6), [region], threaded=False) as display:
+        display.display(frame)
+    assert np.array_equal(strip.frames[0], frame[3:4, 2:14])
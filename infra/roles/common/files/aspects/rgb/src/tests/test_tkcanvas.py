@@ -0,0 +1,16 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from PIL import Image
+from rgb.display.tkcanvas import upscale
+
+
+def test_upscale_matches_nearest_resize():
+    arr = np.random.default_rng(0).integers(0, 256, size=(8, 4, 3), dtype=np.uint8)
+    expected = np.asarray(Image.fromarray(arr).resize((4 * 6, 8 * 6), resample=0))
+    out = np.empty((8 * 6, 4 * 6, 3), dtype=np.uint8)
+    assert upscale(arr[::-1], 6, out=out) is out
+    assert np.array_equal(out[::-1], expected)
@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from rgb.utilities import gamma_lut, pack_colors
+
+
+def test_pack_colors_matches_color():
+    arr = np.random.default_rng(0).integers(0, 256, size=(1, 1000, 3), dtype=np.uint8)
+    packed = pack_colors(arr.reshape(-1, 3))
+    # rpi_ws281x's Color(r, g, b)
+    expected = [(int(r) << 16) | (int(g) << 8) | int(b) for (r, g, b) in arr[0]]
+    assert packed.dtype == np.uint32 and packed.tolist() == expected
+
+
+def test_gamma_lut():
+    assert np.array_equal(gamma_lut(), np.arange(256))
+    lut = gamma_lut(2.2, brightness=0.5)
+    assert lut[0] == 0 and lut[255] == 128 and np.all(np.diff(lut.astype(int)) >= 0)
+    packed = pack_colors(np.array([[255, 0, 255]], dtype=np.uint8), lut)
+    assert packed.tolist() == [(128 << 16) | 128]
@@ -3,7 +3,6 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
-from rgb.utilities import loopwait
 from rgb.form.voronoi_diagram import *
 import time
 
@@ -19,4 +18,34 @@ def test_no_fail(points):
     f = VoronoiDiagram((w, h))
     polygons = f.get_polygons(tuple(points))
     assert len(polygons) == len(points)
-    
\ No newline at end of file
+    
+
+def press_events(notes):
+    return [{"type": "note_on", "note": n, "velocity": 100} for n in notes]
+
+
+def test_cache_is_bounded(dials):
+    f = VoronoiDiagram((w, h))
+    for event in press_events([40, 45, 50]):
+        f.midi_handler(event)
+    for i in range(100):
+        dials[2] = (i % 7) / 6
+        f.step(1 / 60)
+    assert 0 < len(f._cache) <= VoronoiDiagram.CACHE_SIZE
+    f.midi_handler({"type": "note_off", "note": 40, "velocity": 100})
+    assert len(f._cache) == 0
+
+
+@pytest.mark.parametrize("form", [VoronoiDiagram, ValueVoronoiDiagram, RedValueVoronoiDiagram])
+def test_raster(form):
+    f = form((w, h), raster=True)
+    assert f.step(1 / 60) is f.framebuffer
+    assert not np.array(f.framebuffer).any()
+    for event in press_events([40, 45]):
+        f.midi_handler(event)
+    img = np.array(f.step(1 / 60))
+    assert img.shape == (h, w, 3)
+    assert img.any()
+    presses = tuple(f.presses().values())
+    labels = f.get_label_map(tuple(f.calculate_xy_position(p) for p in presses), presses)
+    assert set(np.unique(labels)) <= {0, 1, 2}
@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from rgb import wire
+from rgb.messages import Button, Dial, Spectrum, Switch
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        {"type": "note_on", "time": 0, "channel": 3, "note": 60, "velocity": 100},
+        {"type": "note_off", "time": 0, "channel": 0, "note": 127, "velocity": 0},
+        {"type": "control_change", "time": 0, "channel": 15, "control": 64, "value": 127},
+        {"type": "pitchwheel", "time": 0, "channel": 1, "pitch": -8192},
+    ],
+)
+def test_midi_round_trip(message):
+    payload = wire.encode(message, t_us=1_700_000_000_123_456)
+    assert len(payload) == 12
+    decoded = wire.decode(payload)
+    assert decoded.pop("publish_time") == pytest.approx(1_700_000_000.123456)
+    assert decoded == message
+
+
+@pytest.mark.parametrize(
+    "message",
+    [Button(index=1, state=True), Switch(index=2, state=False), Dial(index=0, state=0.25)],
+)
+def test_control_round_trip(message):
+    decoded = wire.decode(wire.encode(message))
+    assert type(decoded) is type(message)
+    assert decoded == message
+
+
+def test_spectrum_is_packed_float32():
+    message = Spectrum(index=0, state=[0.0, 0.5, 1.0, 0.125])
+    payload = wire.encode(message)
+    assert len(payload) == wire.SPECTRUM_HEADER.size + 4 * 4
+    assert wire.decode(payload) == message
+
+
+def test_latency_uses_publish_time():
+    decoded = wire.decode(wire.encode({"type": "note_on", "channel": 0, "note": 1, "velocity": 1}))
+    assert 0 <= wire.latency_s(decoded) < 1
+    assert wire.latency_s({"type": "note_on"}) is None
+
+
+@pytest.mark.parametrize("payload", [b"", b"\x01\x00", bytes([99]) + bytes(11), wire.encode(Spectrum(0, [1.0]))[:-1]])
+def test_malformed_payloads_raise_value_error(payload):
+    with pytest.raises(ValueError):
+        wire.decode(payload)
+
+
+def test_unencodable_message():
+    with pytest.raises(ValueError):
+        wire.encode({"type": "sysex", "data": [1, 2]})